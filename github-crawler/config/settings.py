@@ -14,12 +14,31 @@ DATA_DIR.mkdir(exist_ok=True)
 
 # GitHub
 GITHUB_TOKEN: str = os.getenv("GITHUB_TOKEN", "")
+# استخر توکن‌ها (با کاما جدا شوند) — GITHUB_TOKEN هم به استخر اضافه می‌شود
+GITHUB_TOKENS: list[str] = list(dict.fromkeys(
+    t.strip()
+    for t in [GITHUB_TOKEN, *os.getenv("GITHUB_TOKENS", "").split(",")]
+    if t.strip()
+))
+if not GITHUB_TOKEN and GITHUB_TOKENS:
+    GITHUB_TOKEN = GITHUB_TOKENS[0]
 GITHUB_API_BASE: str = "https://api.github.com"
 GITHUB_HEADERS: dict = {
     "Authorization": f"Bearer {GITHUB_TOKEN}",
     "Accept": "application/vnd.github.v3+json",
     "X-GitHub-Api-Version": "2022-11-28",
 }
+# حداکثر درخواست‌های هم‌زمان (سقف واقعی بر اساس سهمیه باقی‌مانده کمتر می‌شود)
+GITHUB_MAX_CONCURRENCY: int = int(os.getenv("GITHUB_MAX_CONCURRENCY", "8"))
+
+# Pacer — سقف نرخ (درخواست در ثانیه) برای هر مقصد
+PACER_GITHUB_MAX_RPS: float = float(os.getenv("PACER_GITHUB_MAX_RPS", "10"))
+PACER_GITEA_RPS: float = float(os.getenv("PACER_GITEA_RPS", "5"))
+
+# کش پاسخ‌ها (درخواست شرطی با ETag)
+HTTP_CACHE_ENABLED: bool = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_CACHE_PATH: str = os.getenv("HTTP_CACHE_PATH", str(DATA_DIR / "http_cache.db"))
+HTTP_CACHE_MAX_MB: int = int(os.getenv("HTTP_CACHE_MAX_MB", "200"))
 
 # Gitea
 GITEA_URL: str = os.getenv("GITEA_URL", "http://localhost:3000")
@@ -43,26 +62,99 @@ SEARCH_LANGUAGE: str = os.getenv("SEARCH_LANGUAGE", "python")
 MIN_STARS: int = int(os.getenv("MIN_STARS", "10"))
 PROJECTS_PER_KEYWORD: int = int(os.getenv("PROJECTS_PER_KEYWORD", "20"))
 MAX_SCAN_PER_KEYWORD: int = int(os.getenv("MAX_SCAN_PER_KEYWORD", "150"))
+# کرول افزایشی: بعد از یک پیمایش کامل، فقط مخازن push‌شده بعد از واترمارک
+INCREMENTAL_CRAWL: bool = os.getenv("INCREMENTAL_CRAWL", "true").lower() == "true"
+# صف پایدار کرول: ادعای رهاشده (کرش worker) بعد از این چند دقیقه به صف برمی‌گردد
+FRONTIER_CLAIM_TIMEOUT_MIN: int = int(os.getenv("FRONTIER_CLAIM_TIMEOUT_MIN", "30"))
+# صفحات جستجوی پیمایش‌شده تا این چند ساعت دوباره درخواست نمی‌شوند (ادامه بعد از کرش)
+SEARCH_CHECKPOINT_TTL_HOURS: int = int(os.getenv("SEARCH_CHECKPOINT_TTL_HOURS", "24"))
+
+# فیلترهایی که در خود کوئری جستجو اعمال می‌شوند (قبل از اعتبارسنجی)
+SEARCH_EXCLUDE_FORKS: bool = os.getenv("SEARCH_EXCLUDE_FORKS", "true").lower() == "true"
+SEARCH_EXCLUDE_ARCHIVED: bool = os.getenv("SEARCH_EXCLUDE_ARCHIVED", "true").lower() == "true"
+SEARCH_MIN_SIZE_KB: int = int(os.getenv("SEARCH_MIN_SIZE_KB", "0"))         # 0 = بدون کف
+SEARCH_MAX_SIZE_KB: int = int(os.getenv("SEARCH_MAX_SIZE_KB", "0"))        # 0 = بدون سقف
+SEARCH_PUSHED_WITHIN_DAYS: int = int(os.getenv("SEARCH_PUSHED_WITHIN_DAYS", "0"))  # 0 = غیرفعال
+SEARCH_MIN_GOOD_FIRST_ISSUES: int = int(os.getenv("SEARCH_MIN_GOOD_FIRST_ISSUES", "0"))
+# گزارش صرفه‌جویی فیلترها — هر کلیدواژه یک جستجوی اضافه (per_page=1) خرج می‌کند
+SEARCH_REPORT_FILTER_SAVINGS: bool = os.getenv("SEARCH_REPORT_FILTER_SAVINGS", "false").lower() == "true"
 
 # شرایط اجباری
 MIN_ISSUES_REQUIRED: int = int(os.getenv("MIN_ISSUES_REQUIRED", "3"))
 MIN_PRS_REQUIRED: int = int(os.getenv("MIN_PRS_REQUIRED", "2"))
 MIN_CODE_FILES_REQUIRED: int = int(os.getenv("MIN_CODE_FILES_REQUIRED", "3"))
 
+# تعداد برش‌های جستجو که هم‌زمان پیمایش می‌شوند (عبور از سقف 1000 نتیجه)
+SEARCH_SLICE_CONCURRENCY: int = int(os.getenv("SEARCH_SLICE_CONCURRENCY", "3"))
+# تعداد کلیدواژه‌هایی که هم‌زمان کرول می‌شوند (سهمیه بر اساس فاصله تا هدف تقسیم می‌شود)
+KEYWORD_CONCURRENCY: int = int(os.getenv("KEYWORD_CONCURRENCY", "3"))
+
+# حالت اعتبارسنجی: graphql (یک کوئری برای چند مخزن) یا rest
+VALIDATION_MODE: str = os.getenv("VALIDATION_MODE", "graphql").lower()
+GRAPHQL_VALIDATION_BATCH: int = int(os.getenv("GRAPHQL_VALIDATION_BATCH", "10"))
+# تعداد دسته‌هایی که هم‌زمان اعتبارسنجی می‌شوند
+VALIDATION_WORKERS: int = int(os.getenv("VALIDATION_WORKERS", "4"))
+
 # حداکثر استخراج
 MAX_ISSUES_EXTRACT: int = int(os.getenv("MAX_ISSUES_EXTRACT", "50"))
 MAX_PRS_EXTRACT: int = int(os.getenv("MAX_PRS_EXTRACT", "30"))
 MAX_CODE_FILES_EXTRACT: int = int(os.getenv("MAX_CODE_FILES_EXTRACT", "25"))
 
+# حالت دریافت Issues/PRs: rest یا graphql (کوئری‌های دسته‌ای با کامنت/Review تو در تو)
+# در حالت graphql متن patch فایل‌های PR در دسترس نیست (فقط آمار تغییرات)
+EXTRACTION_MODE: str = os.getenv("EXTRACTION_MODE", "rest").lower()
+# کامنت‌ها در حالت rest: auto (دسته‌ای اگر صفحات /issues/comments کمتر از
+# درخواست‌های تکی باشد)، bulk (همیشه دسته‌ای) یا per_item (یک درخواست برای هر آیتم)
+COMMENT_FETCH_MODE: str = os.getenv("COMMENT_FETCH_MODE", "auto").lower()
+
 CODE_EXTENSIONS: tuple[str, ...] = tuple(
     ext.strip()
     for ext in os.getenv("CODE_EXTENSIONS", ".py,.js,.ts,.go,.rs,.java").split(",")
     if ext.strip()
 )
+# دریافت محتوای کد: tarball (یک دانلود جریانی برای کل مخزن)، contents (یک درخواست
+# برای هر فایل) یا git (کلون جزئی محلی — بدون مصرف سهمیه REST)
+CODE_EXTRACTION_MODE: str = os.getenv("CODE_EXTRACTION_MODE", "tarball").lower()
+# آدرس کلون در حالت git — خالی یعنی clone_url خود مخزن
+# placeholderها: {clone_url} {full_name} {owner} {name} (مثلاً file:///srv/mirrors/{full_name}.git)
+GIT_REMOTE_TEMPLATE: str = os.getenv("GIT_REMOTE_TEMPLATE", "")
+# پوشه موقت کلون‌ها (خالی = پوشه temp سیستم) — هر کلون بعد از استخراج پاک می‌شود
+GIT_SCRATCH_DIR: str = os.getenv("GIT_SCRATCH_DIR", "")
+# سقف فایل‌های کد هر مخزن در حالت git (بدون هزینه API، نمونه بزرگ‌تر)
+GIT_MAX_CODE_FILES: int = int(os.getenv("GIT_MAX_CODE_FILES", "200"))
+# مهلت هر فرمان git (ثانیه)
+GIT_TIMEOUT: int = int(os.getenv("GIT_TIMEOUT", "300"))
+
+# کش آرتیفکت‌های هر اجرا (درخت، README، فایل‌های PR) بین اعتبارسنج/استخراج/انتقال
+# سقف حافظه (مگابایت) — بیشتر از آن روی دیسک سرریز می‌شود
+ARTIFACT_CACHE_MEMORY_MB: int = int(os.getenv("ARTIFACT_CACHE_MEMORY_MB", "256"))
+# پوشه سرریز (خالی = temp سیستم) — در پایان اجرا پاک می‌شود
+ARTIFACT_CACHE_DIR: str = os.getenv("ARTIFACT_CACHE_DIR", "")
+# سقف خواندن tarball (مگابایت) — فایل‌های پیدانشده بعد از آن از /contents می‌آیند (0 = بدون سقف)
+CODE_TARBALL_MAX_MB: int = int(os.getenv("CODE_TARBALL_MAX_MB", "200"))
+# سقف دانلود خام README/فایل (کیلوبایت) — بزرگ‌ترها وسط دانلود قطع می‌شوند
+RAW_DOWNLOAD_MAX_KB: int = int(os.getenv("RAW_DOWNLOAD_MAX_KB", "1024"))
+# انواع داده‌ای که محتوایشان در انبار بلاب (sha گیت، بدون تکرار بین مخازن) ذخیره می‌شود
+BLOB_DATA_TYPES: tuple[str, ...] = tuple(
+    t.strip()
+    for t in os.getenv("BLOB_DATA_TYPES", "readme,code").split(",")
+    if t.strip()
+)
 
 # زمان‌بندی
 CRON_INTERVAL_HOURS: int = int(os.getenv("CRON_INTERVAL_HOURS", "6"))
 
+# بازبینی مخازن ردشده — فاصله بررسی مجدد بر اساس نزدیکی به آستانه‌ها
+REVALIDATE_MIN_DAYS: int = int(os.getenv("REVALIDATE_MIN_DAYS", "7"))
+REVALIDATE_MAX_DAYS: int = int(os.getenv("REVALIDATE_MAX_DAYS", "90"))
+# فقط وقتی سهم سهمیه باقی‌مانده بیشتر از این است
+REVALIDATE_MIN_QUOTA: float = float(os.getenv("REVALIDATE_MIN_QUOTA", "0.5"))
+REVALIDATE_BATCH: int = int(os.getenv("REVALIDATE_BATCH", "50"))
+
+# تازه‌سازی مخازن قبول‌شده قبلی — Issues/PRs از واترمارک، README/کد فقط با تغییر head
+REFRESH_INTERVAL_HOURS: int = int(os.getenv("REFRESH_INTERVAL_HOURS", "24"))
+REFRESH_BATCH: int = int(os.getenv("REFRESH_BATCH", "50"))
+
 # لاگ و دیتابیس
 LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE: str = os.getenv("LOG_FILE", str(DATA_DIR / "crawler.log"))
@@ -0,0 +1,177 @@
+"""
+کش آرتیفکت‌های یک اجرا (درخت، README، فایل‌های PR، ...)
+اعتبارسنج، استخراج‌کننده و انتقال‌دهنده یک نمونه مشترک دارند تا هر منبع
+در هر اجرا حداکثر یک بار دریافت شود؛ کلید (مخزن، منبع، ref/sha) است
+با عبور از سقف حافظه، قدیمی‌ترین آرتیفکت‌ها روی دیسک (پوشه موقت) می‌روند
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from config.settings import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MEMORY_MB
+from utils.logger import log
+
+_Key = tuple[str, str, str]
+
+# فایل‌های هر PR یک بار با این اندازه صفحه دریافت و بین استخراج و انتقال
+# مشترک می‌شوند (کلید: pr_files/<شماره>، ref: sha سر شاخه PR)
+PR_FILES_PER_PAGE = 30
+
+
+def pr_file_entries(files: list[dict]) -> list[dict]:
+    """شکل مشترک فایل‌های PR در کش — patch کامل، هر مصرف‌کننده خودش کوتاه می‌کند"""
+    return [
+        {
+            "filename": f.get("filename", ""),
+            "status": f.get("status", ""),
+            "additions": f.get("additions", 0),
+            "deletions": f.get("deletions", 0),
+            "patch": f.get("patch", ""),
+        }
+        for f in files
+    ]
+
+
+class ArtifactCache:
+    """LRU حافظه با سرریز روی دیسک — مقادیر JSON‌پذیر و None یعنی «نیست»"""
+
+    def __init__(
+        self,
+        max_memory_mb: int = ARTIFACT_CACHE_MEMORY_MB,
+        spill_dir: str = ARTIFACT_CACHE_DIR,
+    ):
+        self.max_bytes = max_memory_mb * 1024 * 1024
+        self._spill_root = spill_dir or None
+        self._spill_path: str | None = None
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[_Key, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: dict[_Key, str] = {}
+        # کلیدهای در حال دریافت — درخواست هم‌زمان همان منبع منتظر می‌ماند
+        self._inflight: dict[_Key, threading.Event] = {}
+        self.stats = {"hits": 0, "misses": 0, "spilled": 0, "disk_hits": 0}
+
+    # ──────────────────────────────────────────
+    # خواندن / نوشتن
+    # ──────────────────────────────────────────
+
+    def get(self, repo: str, resource: str, ref: str = "") -> Any | None:
+        key = (repo, resource, ref or "")
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return json.loads(blob)
+            path = self._disk.pop(key, None)
+            if path is None:
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+
+        # برگشت به حافظه — احتمالاً دوباره لازم می‌شود
+        with open(path, "rb") as f:
+            blob = f.read()
+        os.remove(path)
+        with self._lock:
+            self._store(key, blob)
+        return json.loads(blob)
+
+    def put(self, repo: str, resource: str, ref: str, value: Any) -> None:
+        if value is None:
+            return
+        blob = json.dumps(value, ensure_ascii=False).encode()
+        with self._lock:
+            self._store((repo, resource, ref or ""), blob)
+
+    def get_or_fetch(
+        self,
+        repo: str,
+        resource: str,
+        ref: str,
+        fetch: Callable[[], Any | None],
+    ) -> Any | None:
+        """
+        آرتیفکت از کش، وگرنه fetch() — نتیجه None کش نمی‌شود
+        درخواست هم‌زمان همان کلید منتظر دریافت اول می‌ماند
+        """
+        key = (repo, resource, ref or "")
+        value = self.get(*key)
+        if value is not None:
+            return value
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+                self.stats["misses"] += 1
+        if event is not None:
+            event.wait()
+            value = self.get(*key)
+            # دریافت اول چیزی نداشت (None کش نمی‌شود) — این یکی خودش می‌گیرد
+            return value if value is not None else fetch()
+
+        try:
+            value = fetch()
+            self.put(*key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    # ──────────────────────────────────────────
+    # حافظه و سرریز
+    # ──────────────────────────────────────────
+
+    def _store(self, key: _Key, blob: bytes) -> None:
+        """نوشتن در حافظه و سرریز قدیمی‌ترین‌ها (قفل دست فراخواننده است)"""
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+
+        while self._memory_bytes > self.max_bytes and self._memory:
+            old_key, old_blob = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_blob)
+            self._spill(old_key, old_blob)
+
+    def _spill(self, key: _Key, blob: bytes) -> None:
+        if self._spill_path is None:
+            self._spill_path = tempfile.mkdtemp(
+                prefix="artifacts-", dir=self._spill_root
+            )
+        name = hashlib.sha1("\0".join(key).encode()).hexdigest()
+        path = os.path.join(self._spill_path, f"{name}.json")
+        with open(path, "wb") as f:
+            f.write(blob)
+        self._disk[key] = path
+        self.stats["spilled"] += 1
+
+    def clear(self) -> None:
+        """پایان اجرا — حافظه و پوشه سرریز پاک می‌شوند"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk.clear()
+            self.stats = dict.fromkeys(self.stats, 0)
+            if self._spill_path:
+                shutil.rmtree(self._spill_path, ignore_errors=True)
+                self._spill_path = None
+
+    def summary(self) -> None:
+        s = self.stats
+        if not (s["hits"] or s["misses"]):
+            return
+        log.info(
+            f"   🧺 کش آرتیفکت: {s['hits']} استفاده مجدد | {s['misses']} دریافت | "
+            f"{s['spilled']} سرریز دیسک ({s['disk_hits']} خوانده) | "
+            f"{self._memory_bytes / 1024 / 1024:.1f}MB در حافظه"
+        )
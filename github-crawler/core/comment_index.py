@@ -0,0 +1,141 @@
+"""
+دریافت دسته‌ای کامنت‌های کل مخزن
+به جای یک درخواست برای هر Issue/PR، صفحات /issues/comments (و
+/pulls/comments برای کامنت‌های Review) یک بار پیمایش و بر اساس
+شماره Issue/PR گروه‌بندی می‌شوند
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from urllib.parse import parse_qs, urlparse
+
+from config.settings import COMMENT_FETCH_MODE
+from core.rate_limiter import GitHubRateLimiter
+from utils.logger import log
+
+_PER_PAGE = 100
+
+
+def _number(url: str) -> int | None:
+    """شماره Issue/PR از انتهای issue_url / pull_request_url"""
+    tail = (url or "").rstrip("/").rsplit("/", 1)[-1]
+    return int(tail) if tail.isdigit() else None
+
+
+def _last_page(resp) -> int:
+    """تعداد صفحات از Link: rel="last" (بدون آن، همین یک صفحه)"""
+    last = resp.links.get("last", {}).get("url")
+    if not last:
+        return 1
+    return int(parse_qs(urlparse(last).query).get("page", ["1"])[0])
+
+
+class RepoComments:
+    """کامنت‌های یک مخزن، گروه‌بندی‌شده بر اساس شماره Issue/PR"""
+
+    def __init__(
+        self,
+        rate_limiter: GitHubRateLimiter,
+        full_name: str,
+        since: str | None = None,
+        reviews: bool = False,
+    ):
+        self.api = rate_limiter
+        self.full_name = full_name
+        self.since = since
+        self.reviews = reviews
+        self.calls = 0
+        self._issue: dict[int, list[dict]] = defaultdict(list)
+        self._review: dict[int, list[dict]] = defaultdict(list)
+
+    def load(self, max_pages: int | None = None) -> bool:
+        """
+        دریافت همه صفحات — صفحه اول هر endpoint تعداد صفحات را می‌دهد و
+        بقیه هم‌زمان دریافت می‌شوند؛ اگر مجموع صفحات بیش از max_pages باشد
+        (گران‌تر از درخواست‌های تکی) یا صفحه‌ای ناموفق باشد، False
+        برمی‌گرداند تا مصرف‌کننده به درخواست‌های تکی برگردد (ایندکس ناقص نه)
+        """
+        endpoints = [("issues/comments", "issue_url", self._issue)]
+        if self.reviews:
+            endpoints.append(("pulls/comments", "pull_request_url", self._review))
+
+        params = {"sort": "created", "direction": "asc", "per_page": _PER_PAGE}
+        if self.since:
+            params["since"] = self.since
+
+        firsts = []
+        for path, _, _ in endpoints:
+            resp = self.api.get(
+                f"/repos/{self.full_name}/{path}", params={**params, "page": 1}
+            )
+            self.calls += 1
+            if resp.status_code != 200:
+                return False
+            firsts.append(resp)
+
+        pages = sum(_last_page(r) for r in firsts)
+        if max_pages is not None and pages > max_pages:
+            log.debug(
+                f"   💬 کامنت دسته‌ای نمی‌صرفد: {pages} صفحه > "
+                f"{max_pages} درخواست تکی ({self.full_name})"
+            )
+            return False
+
+        for (path, key, groups), first in zip(endpoints, firsts):
+            url = f"/repos/{self.full_name}/{path}"
+            rest = self.api.get_many([
+                (url, {**params, "page": page})
+                for page in range(2, _last_page(first) + 1)
+            ])
+            self.calls += len(rest)
+            failed = [r.status_code for r in rest if r.status_code != 200]
+            if failed:
+                log.debug(
+                    f"   💬 {len(failed)} صفحه کامنت ناموفق ({failed[0]}) — "
+                    f"بازگشت به درخواست تکی ({self.full_name})"
+                )
+                self._issue.clear()
+                self._review.clear()
+                return False
+            for resp in [first, *rest]:
+                for c in resp.json():
+                    number = _number(c.get(key, ""))
+                    if number is not None:
+                        groups[number].append(c)
+
+        log.debug(
+            f"   💬 کامنت‌های {self.full_name}: {self.calls} درخواست | "
+            f"{len(self._issue)} Issue/PR"
+            + (f" | {len(self._review)} PR با Review" if self.reviews else "")
+        )
+        return True
+
+    def for_issue(self, number: int, limit: int | None = None) -> list[dict]:
+        """کامنت‌های گفت‌وگوی یک Issue/PR به ترتیب ساخت"""
+        return self._issue.get(number, [])[:limit]
+
+    def for_review(self, number: int, limit: int | None = None) -> list[dict]:
+        """کامنت‌های Review (روی خطوط کد) یک PR"""
+        return self._review.get(number, [])[:limit]
+
+
+def load_repo_comments(
+    rate_limiter: GitHubRateLimiter,
+    full_name: str,
+    wanted: int,
+    since: str | None = None,
+    reviews: bool = False,
+    mode: str = COMMENT_FETCH_MODE,
+) -> RepoComments | None:
+    """
+    ایندکس کامنت‌های مخزن اگر دسته‌ای به‌صرفه باشد
+    wanted: تعداد درخواست‌های تکی جایگزین (Issue/PRهای دارای کامنت)
+    None یعنی مصرف‌کننده باید مثل قبل برای هر آیتم درخواست بفرستد
+    """
+    if mode == "per_item" or wanted <= 0:
+        return None
+    comments = RepoComments(rate_limiter, full_name, since=since, reviews=reviews)
+    if comments.load(max_pages=None if mode == "bulk" else wanted):
+        return comments
+    return None
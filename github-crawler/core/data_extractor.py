@@ -1,22 +1,38 @@
 """
 استخراج‌کننده کامل داده‌ها
 README, Issues, Pull Requests, Code
+Issues/PRs افزایشی: فقط آیتم‌های به‌روزشده بعد از واترمارک هر مخزن
 """
 
 from __future__ import annotations
 
 import json
-import time
+import sys
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
 from config.settings import (
     MAX_ISSUES_EXTRACT,
     MAX_PRS_EXTRACT,
     MAX_CODE_FILES_EXTRACT,
     CODE_EXTENSIONS,
+    EXTRACTION_MODE,
+    CODE_EXTRACTION_MODE,
+    CODE_TARBALL_MAX_MB,
+    GIT_MAX_CODE_FILES,
 )
+from core.artifact_cache import (
+    PR_FILES_PER_PAGE,
+    ArtifactCache,
+    pr_file_entries,
+)
+from core.comment_index import load_repo_comments
+from core.git_clone import GitCloneError, PartialClone, remote_head
+from core.graphql_bulk import GraphQLBulkFetcher
 from core.rate_limiter import GitHubRateLimiter
 from models.repository import RepositoryDB, RepositoryInfo
-from utils.helpers import decode_base64_content, truncate
+from utils.helpers import truncate
 from utils.logger import log
 
 
@@ -27,43 +43,166 @@ class DataExtractor:
         self,
         db: RepositoryDB | None = None,
         rate_limiter: GitHubRateLimiter | None = None,
+        mode: str = EXTRACTION_MODE,
+        artifacts: ArtifactCache | None = None,
     ):
         self.api = rate_limiter or GitHubRateLimiter()
         self.db = db or RepositoryDB()
+        self.mode = mode
+        self.bulk = GraphQLBulkFetcher(self.api)
+        # مشترک با اعتبارسنج/انتقال‌دهنده همین اجرا (README، درخت، فایل‌های PR)
+        self.artifacts = artifacts or ArtifactCache()
+
+    # ──────────────────────────────────────────
+    # تشخیص تغییر (کامیت سر شاخه و sha بلاب‌ها)
+    # ──────────────────────────────────────────
+
+    def _head_sha(self, repo: RepositoryInfo) -> str | None:
+        """
+        sha کامیت سر شاخه پیش‌فرض (یک بار در هر اجرا)
+        در حالت git با ls-remote بدون API؛ وگرنه /git/ref (304 از کش رایگان است)
+        """
+        def fetch() -> str | None:
+            if CODE_EXTRACTION_MODE == "git":
+                try:
+                    return remote_head(repo)
+                except GitCloneError as e:
+                    log.debug(f"   ⚠️ ls-remote ناموفق ({repo.full_name}): {e}")
+            resp = self.api.get(
+                f"/repos/{repo.full_name}/git/ref/heads/{repo.default_branch}"
+            )
+            if resp.status_code != 200:
+                return None
+            return resp.json().get("object", {}).get("sha")
+
+        return self.artifacts.get_or_fetch(
+            repo.full_name, "head", repo.default_branch, fetch
+        )
+
+    def _head_unchanged(
+        self, repo: RepositoryInfo, data_type: str, head: str | None
+    ) -> bool:
+        if head is None or head != self.db.get_extraction_head(repo.full_name, data_type):
+            return False
+        log.debug(f"   ⏭️ {data_type} بدون تغییر (head {head[:7]}): {repo.full_name}")
+        return True
 
     # ──────────────────────────────────────────
     # README
     # ──────────────────────────────────────────
 
     def extract_readme(self, repo: RepositoryInfo) -> str | None:
-        """استخراج و ذخیره README"""
+        """
+        استخراج و ذخیره README (دانلود خام جریانی، بدون base64)
+        اگر اعتبارسنج همین اجرا README را گرفته، از کش آرتیفکت
+        بدون تغییر (همان head یا همان sha در درخت) → None بدون دانلود
+        README بزرگ‌تر از RAW_DOWNLOAD_MAX_KB کوتاه‌شده ذخیره می‌شود
+        نام و مسیر از JSON /readme اعتبارسنج یا گره درخت
+        """
         log.debug(f"   📄 README: {repo.full_name}")
 
-        resp = self.api.get(f"/repos/{repo.full_name}/readme")
-        if resp.status_code != 200:
+        head = self._head_sha(repo)
+        if self._head_unchanged(repo, "readme", head):
             return None
 
-        data = resp.json()
-        content = decode_base64_content(data.get("content", ""))
+        stored_sha = self.db.get_stored_shas(repo.full_name, "readme").get("readme")
+        tree = None
+        if stored_sha and CODE_EXTRACTION_MODE != "git":
+            # استخراج کد همین درخت را لازم دارد — گرفتنش اینجا هزینه اضافه ندارد
+            tree = self.artifacts.get_or_fetch(
+                repo.full_name, "tree", repo.default_branch,
+                lambda: self._fetch_tree(repo),
+            )
+        if stored_sha and tree and any(
+            node.get("sha") == stored_sha
+            and node.get("path", "").rsplit("/", 1)[-1].lower().startswith("readme")
+            for node in tree
+        ):
+            # کامیت‌های جدید README را تغییر نداده‌اند
+            self._mark_head(repo, "readme", head)
+            return None
 
+        readme = self.artifacts.get_or_fetch(
+            repo.full_name, "readme", repo.default_branch,
+            lambda: self._download_readme(repo),
+        )
+        if readme is None:
+            return None
+        if readme["content"] is None:
+            # اعتبارسنج README بزرگ‌تر از سقف را بدون محتوا کش کرده
+            downloaded = self._download_readme(repo)
+            if downloaded is None:
+                return None
+            # اندازه، sha و مسیر کامل از JSON؛ محتوا (کوتاه‌شده) از دانلود خام
+            readme = {
+                **readme,
+                "content": downloaded["content"],
+                "truncated": downloaded["truncated"],
+            }
+        content, size = readme["content"], readme["size"]
+        truncated = readme.get("truncated", False)
+        node = None
+        if not readme.get("path"):
+            # دانلود خام نام فایل ندارد — از درخت (که استخراج کد هم لازم دارد)
+            if tree is None and CODE_EXTRACTION_MODE != "git":
+                tree = self.artifacts.get_or_fetch(
+                    repo.full_name, "tree", repo.default_branch,
+                    lambda: self._fetch_tree(repo),
+                )
+            node = self._readme_node(tree)
+        # بدنه کوتاه‌شده sha بلاب کامل را ندارد — از JSON یا درخت
+        sha = readme["sha"] or (node or {}).get("sha", "")
+        if truncated and node:
+            size = node.get("size", size)
+        self._mark_head(repo, "readme", head)
+
+        if sha and sha == stored_sha:
+            return None
         if content:
+            path = readme.get("path") or (node or {}).get("path", "")
             self.db.save_extracted_data(
                 repo_name=repo.full_name,
                 data_type="readme",
-                title=data.get("name", "README.md"),
+                item_key="readme",
+                title=readme.get("name") or path.rsplit("/", 1)[-1] or "README",
                 content=content,
                 metadata=json.dumps({
-                    "size": data.get("size", 0),
-                    "path": data.get("path", ""),
-                    "sha": data.get("sha", ""),
-                    "encoding": data.get("encoding", ""),
+                    "size": size,
+                    "path": path,
+                    "sha": sha,
+                    "encoding": "raw",
+                    "truncated": truncated,
                 }),
             )
-            log.debug(f"   ✅ README: {len(content)} chars")
+            log.debug(
+                f"   ✅ README: {len(content)} chars"
+                + (" (کوتاه‌شده)" if truncated else "")
+            )
 
-        time.sleep(0.3)
         return content
 
+    @staticmethod
+    def _readme_node(tree: list[dict] | None) -> dict | None:
+        """README ریشه مخزن در درخت (همان که /readme برمی‌گرداند)"""
+        for node in tree or []:
+            path = node.get("path", "")
+            if "/" not in path and path.lower().startswith("readme"):
+                return node
+        return None
+
+    def _mark_head(
+        self, repo: RepositoryInfo, data_type: str, head: str | None
+    ) -> None:
+        if head:
+            self.db.save_extraction_head(repo.full_name, data_type, head)
+
+    def _download_readme(self, repo: RepositoryInfo) -> dict | None:
+        raw = self.api.download_raw(f"/repos/{repo.full_name}/readme", truncate=True)
+        if raw is None:
+            return None
+        content, size, sha = raw
+        return {"content": content, "size": size, "sha": sha, "truncated": not sha}
+
     # ──────────────────────────────────────────
     # Issues
     # ──────────────────────────────────────────
@@ -71,101 +210,158 @@ class DataExtractor:
     def extract_issues(
         self, repo: RepositoryInfo, max_count: int | None = None
     ) -> list[dict]:
-        """استخراج Issues با جزئیات کامل (شامل کامنت‌ها)"""
+        """
+        استخراج Issues با جزئیات کامل (شامل کامنت‌ها)
+        بعد از اولین استخراج فقط Issueهای به‌روزشده از واترمارک (since=)
+        به ترتیب updated صعودی دریافت و روی نسخه قبلی upsert می‌شوند —
+        اگر max_count زودتر پر شود، بقیه در اجرای بعد از همان‌جا ادامه می‌یابد
+        """
         max_count = max_count or MAX_ISSUES_EXTRACT
-        log.debug(f"   🐛 Issues (max {max_count}): {repo.full_name}")
+        watermark = self.db.get_extraction_watermark(repo.full_name, "issue")
+        log.debug(
+            f"   🐛 Issues (max {max_count}): {repo.full_name}"
+            + (f" | since={watermark}" if watermark else "")
+        )
 
         issues: list[dict] = []
-        page = 1
-
-        while len(issues) < max_count:
-            resp = self.api.get(
+        stored = self._stored_updates(repo, "issue", watermark)
+
+        # بدون واترمارک: جدیدترین‌ها؛ با واترمارک: قدیمی‌ترین به‌روزشده‌ها اول
+        direction = "asc" if watermark else "desc"
+
+        if self.mode == "graphql":
+            # Issues + کامنت‌ها در کوئری‌های دسته‌ای
+            for page in self.bulk.issues(
+                repo.full_name, max_count,
+                direction=direction.upper(), since=watermark,
+            ):
+                for item in self._changed(page, "issue", stored):
+                    issues.append(self._save_issue(
+                        repo, item, self._format_comments(item["comment_list"])
+                    ))
+        else:
+            params = {"state": "all", "sort": "updated", "direction": direction}
+            if watermark:
+                params["since"] = watermark
+            selected: list[dict] = []
+            for items in self.api.paginate_pages(
                 f"/repos/{repo.full_name}/issues",
-                params={
-                    "state": "all",
-                    "sort": "updated",
-                    "direction": "desc",
-                    "per_page": 30,
-                    "page": page,
-                },
-            )
-            if resp.status_code != 200:
-                break
-
-            items = resp.json()
-            if not items:
-                break
-
-            for item in items:
-                if len(issues) >= max_count:
-                    break
+                params=params,
+                prefetch=True,
+            ):
                 # فیلتر PRها
-                if "pull_request" in item:
-                    continue
-
-                # دریافت کامنت‌های Issue
-                comments_text = ""
-                if item.get("comments", 0) > 0:
-                    comments_text = self._fetch_issue_comments(
-                        repo.full_name, item["number"]
-                    )
-
-                issue_data = {
-                    "number": item.get("number"),
-                    "title": item.get("title", ""),
-                    "state": item.get("state", ""),
-                    "body": item.get("body", "") or "",
-                    "labels": [lb.get("name", "") for lb in item.get("labels", [])],
-                    "created_at": item.get("created_at"),
-                    "updated_at": item.get("updated_at"),
-                    "comments_count": item.get("comments", 0),
-                    "comments_text": comments_text,
-                    "user": item.get("user", {}).get("login", ""),
-                }
-                issues.append(issue_data)
-
-                self.db.save_extracted_data(
-                    repo_name=repo.full_name,
-                    data_type="issue",
-                    title=f"#{issue_data['number']}: {issue_data['title']}",
-                    content=json.dumps({
-                        "body": issue_data["body"],
-                        "comments": comments_text,
-                    }, ensure_ascii=False),
-                    metadata=json.dumps({
-                        "state": issue_data["state"],
-                        "labels": issue_data["labels"],
-                        "comments_count": issue_data["comments_count"],
-                        "user": issue_data["user"],
-                        "created_at": issue_data["created_at"],
-                    }),
-                )
+                selected += [
+                    item for item in self._changed(items, "issue", stored)
+                    if "pull_request" not in item
+                ][: max_count - len(selected)]
+                if len(selected) >= max_count:
+                    break
 
-            page += 1
-            time.sleep(0.5)
+            # کامنت‌ها بعد از انتخاب همه Issueها — دسته‌ای یا تکی، هر کدام ارزان‌تر
+            comments_map = self._fetch_comments_for(repo.full_name, selected)
+            for item in selected:
+                issues.append(self._save_issue(
+                    repo, item, comments_map.get(item["number"], "")
+                ))
 
+        self._advance_watermark(repo, "issue", watermark, issues)
         log.debug(f"   ✅ {len(issues)} Issues ذخیره شد")
         return issues
 
+    def _save_issue(
+        self, repo: RepositoryInfo, item: dict, comments_text: str
+    ) -> dict:
+        """ذخیره یک Issue (شکل REST) در extracted_data"""
+        issue_data = {
+            "number": item.get("number"),
+            "title": item.get("title", ""),
+            "state": item.get("state", ""),
+            "body": item.get("body", "") or "",
+            "labels": [lb.get("name", "") for lb in item.get("labels", [])],
+            "created_at": item.get("created_at"),
+            "updated_at": item.get("updated_at"),
+            "comments_count": item.get("comments", 0),
+            "comments_text": comments_text,
+            "user": item.get("user", {}).get("login", ""),
+        }
+
+        self.db.save_extracted_data(
+            repo_name=repo.full_name,
+            data_type="issue",
+            item_key=f"issue:{issue_data['number']}",
+            title=f"#{issue_data['number']}: {issue_data['title']}",
+            content=json.dumps({
+                "body": issue_data["body"],
+                "comments": comments_text,
+            }, ensure_ascii=False),
+            metadata=json.dumps({
+                "state": issue_data["state"],
+                "labels": issue_data["labels"],
+                "comments_count": issue_data["comments_count"],
+                "user": issue_data["user"],
+                "created_at": issue_data["created_at"],
+                "updated_at": issue_data["updated_at"],
+            }),
+        )
+        return issue_data
+
     def _fetch_issue_comments(
         self, full_name: str, issue_number: int, max_comments: int = 10
     ) -> str:
         """دریافت کامنت‌های یک Issue"""
-        resp = self.api.get(
-            f"/repos/{full_name}/issues/{issue_number}/comments",
-            params={"per_page": max_comments},
-        )
-        if resp.status_code != 200:
-            return ""
+        return self._fetch_issue_comments_many(
+            full_name, [issue_number], max_comments
+        ).get(issue_number, "")
+
+    def _fetch_comments_for(
+        self, full_name: str, items: list[dict], max_comments: int = 10
+    ) -> dict[int, str]:
+        """
+        کامنت‌های Issueهای انتخاب‌شده — اگر صفحات /issues/comments کل مخزن
+        (از قدیمی‌ترین created_at این Issueها) کمتر از درخواست‌های تکی باشد،
+        یک بار دسته‌ای دریافت می‌شوند
+        """
+        numbers = [it["number"] for it in items if it.get("comments", 0) > 0]
+        if not numbers:
+            return {}
+
+        # کامنت هیچ Issueی قبل از ساخت خودش نیست
+        since = min(
+            it.get("created_at") or "" for it in items if it["number"] in numbers
+        ) or None
+        index = load_repo_comments(self.api, full_name, len(numbers), since=since)
+        if index is None:
+            return self._fetch_issue_comments_many(full_name, numbers, max_comments)
+        return {
+            n: self._format_comments(index.for_issue(n, max_comments))
+            for n in numbers
+        }
 
-        comments = resp.json()
+    def _fetch_issue_comments_many(
+        self, full_name: str, issue_numbers: list[int], max_comments: int = 10
+    ) -> dict[int, str]:
+        """دریافت هم‌زمان کامنت‌های چند Issue"""
+        responses = self.api.get_many([
+            (
+                f"/repos/{full_name}/issues/{number}/comments",
+                {"per_page": max_comments},
+            )
+            for number in issue_numbers
+        ])
+
+        result: dict[int, str] = {}
+        for number, resp in zip(issue_numbers, responses):
+            if resp.status_code == 200:
+                result[number] = self._format_comments(resp.json())
+        return result
+
+    @staticmethod
+    def _format_comments(comments: list[dict]) -> str:
         parts = []
         for c in comments:
             user = c.get("user", {}).get("login", "unknown")
             body = c.get("body", "")
             parts.append(f"[{user}]: {body}")
-
-        time.sleep(0.3)
         return "\n---\n".join(parts)
 
     # ──────────────────────────────────────────
@@ -175,105 +371,250 @@ class DataExtractor:
     def extract_pull_requests(
         self, repo: RepositoryInfo, max_count: int | None = None
     ) -> list[dict]:
-        """استخراج Pull Requests با diff summary"""
+        """
+        استخراج Pull Requests با diff summary
+        /pulls پارامتر since ندارد — صفحات updated نزولی تا رسیدن به
+        واترمارک مخزن پیمایش و قدیمی‌ترین‌ها ذخیره می‌شوند (_walk_pull_requests)
+        """
         max_count = max_count or MAX_PRS_EXTRACT
-        log.debug(f"   🔀 PRs (max {max_count}): {repo.full_name}")
+        watermark = self.db.get_extraction_watermark(repo.full_name, "pull_request")
+        log.debug(
+            f"   🔀 PRs (max {max_count}): {repo.full_name}"
+            + (f" | since={watermark}" if watermark else "")
+        )
 
         prs: list[dict] = []
-        page = 1
-
-        while len(prs) < max_count:
-            resp = self.api.get(
+        stored = self._stored_updates(repo, "pull_request", watermark)
+        # با واترمارک، فهرست تا خود واترمارک پیمایش می‌شود (نه تا max_count)
+        list_limit = sys.maxsize if watermark else max_count
+
+        if self.mode == "graphql":
+            # PRها + آمار فایل‌ها در کوئری‌های دسته‌ای (بدون patch)
+            pages = self.bulk.pull_requests(repo.full_name, list_limit, page_size=25)
+            selected, complete = self._walk_pull_requests(
+                pages, watermark, max_count, 25, stored
+            )
+            for item in selected:
+                prs.append(self._save_pull_request(repo, item, item["file_list"]))
+        else:
+            pages = self.api.paginate_pages(
                 f"/repos/{repo.full_name}/pulls",
-                params={
-                    "state": "all",
-                    "sort": "updated",
-                    "direction": "desc",
-                    "per_page": 30,
-                    "page": page,
-                },
+                params={"state": "all", "sort": "updated", "direction": "desc"},
+                max_items=None if watermark else max_count,
+                prefetch=True,
+                per_page=100,
+            )
+            selected, complete = self._walk_pull_requests(
+                pages, watermark, max_count, 100, stored
             )
-            if resp.status_code != 200:
-                break
 
-            items = resp.json()
-            if not items:
+            # دریافت هم‌زمان فایل‌های تغییر یافته (فقط PRهای انتخاب‌شده)
+            files_map = self._fetch_pr_files_many(repo.full_name, selected)
+            for item in selected:
+                prs.append(self._save_pull_request(
+                    repo, item, files_map.get(item["number"], [])
+                ))
+
+        if complete:
+            self._advance_watermark(repo, "pull_request", watermark, prs)
+        else:
+            log.warning(
+                f"   ⚠️ فهرست PRهای {repo.full_name} پیش از رسیدن به واترمارک "
+                f"قطع شد — واترمارک جلو نرفت"
+            )
+        log.debug(f"   ✅ {len(prs)} PRs ذخیره شد")
+        return prs
+
+    # ──────────────────────────────────────────
+    # واترمارک همگام‌سازی افزایشی
+    # ──────────────────────────────────────────
+
+    @staticmethod
+    def _since(items: list[dict], watermark: str | None) -> list[dict]:
+        """
+        آیتم‌های به‌روزشده از واترمارک (شامل خود آن، مثل since در REST)
+        ورودی به ترتیب updated نزولی است، پس بقیه صفحه هم قدیمی‌ترند
+        """
+        if not watermark:
+            return items
+        fresh = []
+        for item in items:
+            if (item.get("updated_at") or "") < watermark:
                 break
+            fresh.append(item)
+        return fresh
 
-            for item in items:
-                if len(prs) >= max_count:
-                    break
+    def _stored_updates(
+        self, repo: RepositoryInfo, data_type: str, watermark: str | None
+    ) -> dict[str, str]:
+        """item_key → updated_at نسخه ذخیره‌شده (فقط در پیمایش افزایشی)"""
+        if not watermark:
+            return {}
+        return self.db.get_stored_metadata(repo.full_name, data_type, "updated_at")
 
-                # دریافت اطلاعات فایل‌های تغییر یافته
-                changed_files = self._fetch_pr_files(
-                    repo.full_name, item["number"]
-                )
+    @staticmethod
+    def _changed(
+        items: list[dict], data_type: str, stored: dict[str, str] | None
+    ) -> list[dict]:
+        """
+        حذف آیتم‌هایی که همین نسخه (همان updated_at) قبلاً ذخیره شده است
+        since شامل خود واترمارک است — بدون این، آخرین آیتم هر اجرا در
+        تازه‌سازی بعدی دوباره پردازش می‌شد (کامنت‌ها / فایل‌های PR از نو)
+        """
+        if not stored:
+            return items
+        return [
+            item for item in items
+            if stored.get(f"{data_type}:{item.get('number')}") != item.get("updated_at")
+        ]
 
-                pr_data = {
-                    "number": item.get("number"),
-                    "title": item.get("title", ""),
-                    "state": item.get("state", ""),
-                    "body": item.get("body", "") or "",
-                    "merged": item.get("merged_at") is not None,
-                    "head_branch": item.get("head", {}).get("ref", ""),
-                    "base_branch": item.get("base", {}).get("ref", ""),
-                    "created_at": item.get("created_at"),
-                    "updated_at": item.get("updated_at"),
-                    "user": item.get("user", {}).get("login", ""),
-                    "changed_files": changed_files,
-                    "additions": item.get("additions", 0),
-                    "deletions": item.get("deletions", 0),
-                }
-                prs.append(pr_data)
-
-                self.db.save_extracted_data(
-                    repo_name=repo.full_name,
-                    data_type="pull_request",
-                    title=f"PR #{pr_data['number']}: {pr_data['title']}",
-                    content=json.dumps({
-                        "body": pr_data["body"],
-                        "changed_files": changed_files,
-                    }, ensure_ascii=False),
-                    metadata=json.dumps({
-                        "state": pr_data["state"],
-                        "merged": pr_data["merged"],
-                        "head": pr_data["head_branch"],
-                        "base": pr_data["base_branch"],
-                        "user": pr_data["user"],
-                        "additions": pr_data["additions"],
-                        "deletions": pr_data["deletions"],
-                    }),
-                )
+    def _walk_pull_requests(
+        self,
+        pages: Iterator[list[dict]],
+        watermark: str | None,
+        max_count: int,
+        page_size: int,
+        stored: dict[str, str] | None = None,
+    ) -> tuple[list[dict], bool]:
+        """
+        PRهای قابل ذخیره از صفحات updated نزولی + آیا پیمایش کامل بود
+        بدون واترمارک: جدیدترین max_count؛ با واترمارک: همه صفحات تا رسیدن
+        به واترمارک و سپس قدیمی‌ترین max_count (صعودی) — مثل since صعودی
+        Issueها، بین واترمارک و PRهای ذخیره‌شده شکافی نمی‌ماند
+        کامل = به واترمارک رسید یا صفحه آخر ناقص بود (نه قطع با خطا)
+        """
+        fresh: list[dict] = []
+        complete = not watermark
+        for page in pages:
+            kept = self._since(page, watermark)
+            fresh += self._changed(kept, "pull_request", stored)
+            if len(kept) < len(page):
+                complete = True
+                break
+            if len(page) < page_size:
+                complete = True
+            if not watermark and len(fresh) >= max_count:
+                break
 
-            page += 1
-            time.sleep(0.5)
+        if not watermark:
+            return fresh[:max_count], complete
+        if len(fresh) > max_count:
+            log.debug(
+                f"   ⏳ {len(fresh) - max_count} PR به‌روزشده دیگر — اجرای بعد"
+            )
+        return fresh[::-1][:max_count], complete
 
-        log.debug(f"   ✅ {len(prs)} PRs ذخیره شد")
-        return prs
+    def _advance_watermark(
+        self,
+        repo: RepositoryInfo,
+        data_type: str,
+        watermark: str | None,
+        saved: list[dict],
+    ) -> None:
+        """
+        واترمارک = جدیدترین updated_at ذخیره‌شده
+        پیمایش افزایشی صعودی است (Issueها با since، PRها با _walk_pull_requests)،
+        پس همه آیتم‌های بین واترمارک قبلی و جدید ذخیره شده‌اند؛ پیمایش
+        اول نزولی است و سقف max_count دامنه آن را تعیین می‌کند
+        """
+        newest = max(
+            [watermark or "", *(it.get("updated_at") or "" for it in saved)]
+        )
+        self.db.save_extraction_watermark(repo.full_name, data_type, newest or None)
+
+    def _save_pull_request(
+        self, repo: RepositoryInfo, item: dict, changed_files: list[dict]
+    ) -> dict:
+        """ذخیره یک PR (شکل REST) در extracted_data"""
+        pr_data = {
+            "number": item.get("number"),
+            "title": item.get("title", ""),
+            "state": item.get("state", ""),
+            "body": item.get("body", "") or "",
+            "merged": item.get("merged_at") is not None,
+            "head_branch": item.get("head", {}).get("ref", ""),
+            "base_branch": item.get("base", {}).get("ref", ""),
+            "created_at": item.get("created_at"),
+            "updated_at": item.get("updated_at"),
+            "user": item.get("user", {}).get("login", ""),
+            "changed_files": changed_files,
+            "additions": item.get("additions", 0),
+            "deletions": item.get("deletions", 0),
+        }
+
+        self.db.save_extracted_data(
+            repo_name=repo.full_name,
+            data_type="pull_request",
+            item_key=f"pull_request:{pr_data['number']}",
+            title=f"PR #{pr_data['number']}: {pr_data['title']}",
+            content=json.dumps({
+                "body": pr_data["body"],
+                "changed_files": changed_files,
+            }, ensure_ascii=False),
+            metadata=json.dumps({
+                "state": pr_data["state"],
+                "merged": pr_data["merged"],
+                "head": pr_data["head_branch"],
+                "base": pr_data["base_branch"],
+                "user": pr_data["user"],
+                "additions": pr_data["additions"],
+                "deletions": pr_data["deletions"],
+                "updated_at": pr_data["updated_at"],
+            }),
+        )
+        return pr_data
 
     def _fetch_pr_files(
-        self, full_name: str, pr_number: int, max_files: int = 20
+        self, full_name: str, pr: dict, max_files: int = 20
     ) -> list[dict]:
         """دریافت لیست فایل‌های تغییریافته در PR"""
-        resp = self.api.get(
-            f"/repos/{full_name}/pulls/{pr_number}/files",
-            params={"per_page": max_files},
-        )
-        if resp.status_code != 200:
-            return []
-
-        files = []
-        for f in resp.json():
-            files.append({
-                "filename": f.get("filename", ""),
-                "status": f.get("status", ""),
-                "additions": f.get("additions", 0),
-                "deletions": f.get("deletions", 0),
-                "patch": truncate(f.get("patch", ""), 3000),
-            })
+        return self._fetch_pr_files_many(
+            full_name, [pr], max_files
+        ).get(pr["number"], [])
+
+    def _fetch_pr_files_many(
+        self, full_name: str, prs: list[dict], max_files: int = 20
+    ) -> dict[int, list[dict]]:
+        """
+        دریافت هم‌زمان فایل‌های تغییریافته چند PR
+        کلید کش sha سر شاخه PR است — انتقال‌دهنده همین اجرا دوباره نمی‌گیرد
+        """
+        files_by_pr: dict[int, list[dict]] = {}
+        missing: list[dict] = []
+        for pr in prs:
+            files = self.artifacts.get(
+                full_name, f"pr_files/{pr['number']}", pr.get("head", {}).get("sha", "")
+            )
+            if files is None:
+                missing.append(pr)
+            else:
+                files_by_pr[pr["number"]] = files
+
+        responses = self.api.get_many([
+            (
+                f"/repos/{full_name}/pulls/{pr['number']}/files",
+                {"per_page": max(max_files, PR_FILES_PER_PAGE)},
+            )
+            for pr in missing
+        ]) if missing else []
 
-        time.sleep(0.3)
-        return files
+        for pr, resp in zip(missing, responses):
+            if resp.status_code != 200:
+                continue
+            files = pr_file_entries(resp.json())
+            self.artifacts.put(
+                full_name, f"pr_files/{pr['number']}",
+                pr.get("head", {}).get("sha", ""), files,
+            )
+            files_by_pr[pr["number"]] = files
+
+        return {
+            number: [
+                {**f, "patch": truncate(f["patch"] or "", 3000)}
+                for f in files[:max_files]
+            ]
+            for number, files in files_by_pr.items()
+        }
 
     # ──────────────────────────────────────────
     # Code Files
@@ -285,19 +626,109 @@ class DataExtractor:
         max_files: int | None = None,
         max_file_size: int = 80_000,
     ) -> list[dict]:
-        """استخراج فایل‌های کد مهم"""
+        """
+        استخراج فایل‌های کد مهم
+        انتخاب و رتبه‌بندی از روی درخت git؛ محتوا در حالت tarball با یک دانلود
+        جریانی، در حالت contents با یک درخواست برای هر فایل و در حالت git از
+        کلون جزئی محلی (بدون API — در صورت خطا بازگشت به tarball)
+        فقط فایل‌های جدید/تغییرکرده (sha متفاوت با ذخیره‌شده) دریافت می‌شوند؛
+        اگر کامیت سر شاخه از آخرین استخراج عوض نشده، هیچ درخواستی نمی‌رود
+        head فقط وقتی ثبت می‌شود که همه کاندیدها ذخیره یا (کوتاه) رد شده باشند
+        """
+        head = self._head_sha(repo)
+        if self._head_unchanged(repo, "code", head):
+            return []
+
+        if CODE_EXTRACTION_MODE == "git":
+            result = self._extract_code_git(
+                repo, max_files or GIT_MAX_CODE_FILES, max_file_size
+            )
+            if result is not None:
+                code_files, missing = result
+                self._finish_code_head(repo, head, missing)
+                return code_files
+
         max_files = max_files or MAX_CODE_FILES_EXTRACT
         log.debug(f"   💻 Code (max {max_files}): {repo.full_name}")
 
+        # درخت معمولاً از اعتبارسنجی همین اجرا در کش است
+        tree = self.artifacts.get_or_fetch(
+            repo.full_name, "tree", repo.default_branch,
+            lambda: self._fetch_tree(repo),
+        )
+        if tree is None:
+            return []
+
+        candidates = self._changed_code_files(
+            repo, tree, self._rank_code_files(tree, max_files, max_file_size)
+        )
+
+        leftover = candidates
+        code_files: list[dict] = []
+        missing: list[dict] = []
+        if CODE_EXTRACTION_MODE != "contents" and candidates:
+            code_files, leftover = self._extract_code_tarball(repo, candidates)
+        if leftover:
+            more, missing = self._extract_code_contents(repo, leftover)
+            code_files += more
+        self._finish_code_head(repo, head, missing)
+
+        log.debug(f"   ✅ {len(code_files)} code files ذخیره شد")
+        return code_files
+
+    def _finish_code_head(
+        self, repo: RepositoryInfo, head: str | None, missing: list[dict]
+    ) -> None:
+        """
+        ثبت head کد فقط بدون دانلود ناموفق — وگرنه اجرای بعد همین head را
+        دوباره بررسی می‌کند و فقط فایل‌های جامانده (sha متفاوت) را می‌گیرد
+        """
+        if missing:
+            log.debug(
+                f"   ⏳ {len(missing)} فایل کد دریافت نشد ({repo.full_name}) — "
+                f"head ثبت نشد"
+            )
+            return
+        self._mark_head(repo, "code", head)
+
+    def _changed_code_files(
+        self, repo: RepositoryInfo, tree: list[dict], candidates: list[dict]
+    ) -> list[dict]:
+        """
+        کاندیدهایی که sha درختشان با نسخه ذخیره‌شده فرق دارد (یا تازه‌اند)
+        فایل‌های ذخیره‌شده‌ای که دیگر در درخت نیستند حذف می‌شوند
+        """
+        stored = self.db.get_stored_shas(repo.full_name, "code")
+        if not stored:
+            return candidates
+
+        paths = {node.get("path") for node in tree}
+        gone = [key for key in stored if key.split(":", 1)[1] not in paths]
+        removed = self.db.delete_extracted_items(repo.full_name, gone)
+
+        changed = [
+            node for node in candidates
+            if stored.get(f"code:{node['path']}") != node.get("sha")
+        ]
+        log.debug(
+            f"   🔁 کد: {len(changed)} جدید/تغییرکرده | "
+            f"{len(candidates) - len(changed)} بدون تغییر | {removed} حذف‌شده"
+        )
+        return changed
+
+    def _fetch_tree(self, repo: RepositoryInfo) -> list[dict] | None:
         resp = self.api.get(
             f"/repos/{repo.full_name}/git/trees/{repo.default_branch}",
             params={"recursive": "1"},
         )
         if resp.status_code != 200:
-            return []
-
-        tree = resp.json().get("tree", [])
+            return None
+        return resp.json().get("tree", [])
 
+    def _rank_code_files(
+        self, tree: list[dict], max_files: int, max_file_size: int
+    ) -> list[dict]:
+        """انتخاب فایل‌های کد از درخت (API یا کلون محلی) به ترتیب اهمیت"""
         # فیلتر و اولویت‌بندی فایل‌ها
         candidates = [
             node for node in tree
@@ -316,46 +747,148 @@ class DataExtractor:
             n.get("path", "").count("/"),  # عمق کمتر اول
             abs(n.get("size", 0) - 5000),  # نزدیک به 5KB ترجیح
         ))
-        candidates = candidates[:max_files]
+        return candidates[:max_files]
+
+    def _extract_code_git(
+        self, repo: RepositoryInfo, max_files: int, max_file_size: int
+    ) -> tuple[list[dict], list[dict]] | None:
+        """
+        کلون جزئی در پوشه موقت، رتبه‌بندی روی درخت محلی و خواندن blobها
+        با یک cat-file --batch — None یعنی کلون نشد (مسیر API ادامه می‌دهد)
+        خروجی: (فایل‌های ذخیره‌شده، کاندیدهایی که blobشان خوانده نشد)
+        """
+        log.debug(f"   💻 Code از git (max {max_files}): {repo.full_name}")
+        code_files: list[dict] = []
+        try:
+            with PartialClone(repo, max_blob_size=max_file_size) as clone:
+                tree = clone.tree()
+                candidates = self._changed_code_files(
+                    repo, tree, self._rank_code_files(tree, max_files, max_file_size)
+                )
+                # فایل‌های یکسان در چند مسیر یک blob دارند — یک بار خوانده می‌شود
+                by_sha: dict[str, list[dict]] = {}
+                for node in candidates:
+                    by_sha.setdefault(node["sha"], []).append(node)
+                for sha, data in clone.read_blobs(list(by_sha)):
+                    content = data.decode("utf-8", errors="replace")
+                    for node in by_sha.pop(sha):
+                        file_info = self._save_code_file(repo, node, content)
+                        if file_info:
+                            code_files.append(file_info)
+        except GitCloneError as e:
+            log.warning(f"   ⚠️ کلون ناموفق ({repo.full_name}): {e} — بازگشت به API")
+            return None
+
+        log.debug(f"   ✅ {len(code_files)} code files از git ذخیره شد")
+        return code_files, [node for nodes in by_sha.values() for node in nodes]
 
+    def _extract_code_contents(
+        self, repo: RepositoryInfo, candidates: list[dict]
+    ) -> tuple[list[dict], list[dict]]:
+        """
+        یک دانلود خام /contents برای هر فایل (هم‌زمان)
+        خروجی: (فایل‌های ذخیره‌شده، کاندیدهایی که دانلودشان ناموفق بود)
+        """
         code_files: list[dict] = []
+        missing: list[dict] = []
 
-        for node in candidates:
-            file_resp = self.api.get(
+        def download(node: dict) -> tuple[str, int, str] | None:
+            # سقف هر فایل: اندازه درخت با کمی حاشیه (تغییر بین درخت و دانلود)
+            return self.api.download_raw(
                 f"/repos/{repo.full_name}/contents/{node['path']}",
                 params={"ref": repo.default_branch},
+                max_bytes=node.get("size", 0) * 2 + 1024,
             )
-            if file_resp.status_code != 200:
-                continue
 
-            file_data = file_resp.json()
-            content = decode_base64_content(file_data.get("content", ""))
+        workers = max(1, min(len(candidates), self.api.concurrency_limit()))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            downloads = list(pool.map(download, candidates))
 
-            if not content or len(content.strip()) < 50:
+        for node, raw in zip(candidates, downloads):
+            if raw is None:
+                missing.append(node)
                 continue
+            file_info = self._save_code_file(repo, node, raw[0])
+            if file_info:
+                code_files.append(file_info)
+
+        return code_files, missing
+
+    def _extract_code_tarball(
+        self, repo: RepositoryInfo, candidates: list[dict]
+    ) -> tuple[list[dict], list[dict]]:
+        """
+        یک درخواست /tarball برای کل مخزن — آرشیو جریانی خوانده می‌شود
+        (بدون نوشتن روی دیسک) و فایل‌های انتخاب‌شده همان لحظه ذخیره می‌شوند
+        خروجی: (فایل‌های ذخیره‌شده، کاندیدهایی که در آرشیو پیدا نشدند)
+        """
+        wanted = {node["path"]: node for node in candidates}
+        code_files: list[dict] = []
+        cap = CODE_TARBALL_MAX_MB * 1024 * 1024
+
+        try:
+            with self.api.stream(
+                f"/repos/{repo.full_name}/tarball/{repo.default_branch}"
+            ) as resp:
+                if resp.status_code != 200:
+                    log.debug(f"   ⚠️ tarball: {resp.status_code} — بازگشت به /contents")
+                    return [], candidates
+
+                with tarfile.open(fileobj=resp.raw, mode="r|gz") as tar:
+                    for member in tar:
+                        if not wanted:
+                            break  # بقیه آرشیو دانلود نمی‌شود
+                        if cap and resp.raw.tell() > cap:
+                            log.debug(
+                                f"   ⚠️ tarball از {CODE_TARBALL_MAX_MB}MB گذشت — "
+                                f"{len(wanted)} فایل از /contents"
+                            )
+                            break
+                        if not member.isfile():
+                            continue
+
+                        # مسیرها با پوشه owner-repo-sha/ شروع می‌شوند
+                        node = wanted.pop(member.name.split("/", 1)[-1], None)
+                        if node is None:
+                            continue
+
+                        data = tar.extractfile(member).read()
+                        file_info = self._save_code_file(
+                            repo, node, data.decode("utf-8", errors="replace")
+                        )
+                        if file_info:
+                            code_files.append(file_info)
+        except (tarfile.TarError, OSError) as e:
+            log.debug(f"   ⚠️ tarball خراب: {e} — بازگشت به /contents")
+
+        return code_files, list(wanted.values())
+
+    def _save_code_file(
+        self, repo: RepositoryInfo, node: dict, content: str
+    ) -> dict | None:
+        """ذخیره یک فایل کد (محتوای خیلی کوتاه رد می‌شود)"""
+        if not content or len(content.strip()) < 50:
+            return None
 
-            file_info = {
-                "path": node["path"],
-                "size": node.get("size", 0),
-                "content": content,
-            }
-            code_files.append(file_info)
-
-            self.db.save_extracted_data(
-                repo_name=repo.full_name,
-                data_type="code",
-                title=node["path"],
-                content=content,
-                metadata=json.dumps({
-                    "size": node.get("size", 0),
-                    "sha": node.get("sha", ""),
-                    "language": self._detect_language(node["path"]),
-                }),
-            )
-            time.sleep(0.3)
+        file_info = {
+            "path": node["path"],
+            "size": node.get("size", 0),
+            "content": content,
+        }
 
-        log.debug(f"   ✅ {len(code_files)} code files ذخیره شد")
-        return code_files
+        self.db.save_extracted_data(
+            repo_name=repo.full_name,
+            data_type="code",
+            item_key=f"code:{node['path']}",
+            title=node["path"],
+            content=content,
+            metadata=json.dumps({
+                "size": node.get("size", 0),
+                "sha": node.get("sha", ""),
+                "language": self._detect_language(node["path"]),
+            }),
+        )
+        return file_info
 
     @staticmethod
     def _is_generated_file(path: str) -> bool:
@@ -408,5 +941,8 @@ class DataExtractor:
             for k, v in result.items()
         }
         log.info(f"   📊 نتیجه: {summary}")
+        if self.mode == "graphql":
+            log.info(f"   🔷 امتیاز GraphQL مصرف‌شده: {self.api.graphql_points}")
 
+        self.db.mark_extracted(repo.full_name)
         return result
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+کلون جزئی محلی برای استخراج کد بدون سهمیه REST
+کلون کم‌عمق (depth 1) بدون checkout و با فیلتر blob:limit — فقط blobهای
+زیر سقف اندازه دانلود می‌شوند؛ درخت از ls-tree و محتوا از cat-file --batch
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Iterable, Iterator
+
+from config.settings import GIT_REMOTE_TEMPLATE, GIT_SCRATCH_DIR, GIT_TIMEOUT
+from models.repository import RepositoryInfo
+from utils.logger import log
+
+# git هرگز برای نام کاربری/رمز منتظر ورودی نماند
+_GIT_ENV = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+
+
+class GitCloneError(Exception):
+    pass
+
+
+def _run_git(args: list[str], cwd: str | None = None) -> str:
+    try:
+        proc = subprocess.run(
+            ["git", *args], cwd=cwd, env=_GIT_ENV,
+            capture_output=True, text=True, timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise GitCloneError(f"git {args[0]}: {e}") from e
+    if proc.returncode != 0:
+        reason = (proc.stderr.strip().splitlines() or [f"exit {proc.returncode}"])[0]
+        raise GitCloneError(f"git {args[0]}: {reason}")
+    return proc.stdout
+
+
+def remote_url(repo: RepositoryInfo, template: str = GIT_REMOTE_TEMPLATE) -> str:
+    """آدرس کلون از GIT_REMOTE_TEMPLATE (خالی = clone_url مخزن)"""
+    if not template:
+        return repo.clone_url
+    owner, _, name = repo.full_name.partition("/")
+    return template.format(
+        clone_url=repo.clone_url, full_name=repo.full_name,
+        owner=owner, name=name,
+    )
+
+
+def remote_head(
+    repo: RepositoryInfo, remote_template: str = GIT_REMOTE_TEMPLATE
+) -> str | None:
+    """sha کامیت سر شاخه پیش‌فرض با ls-remote — بدون کلون و بدون API"""
+    ref = f"refs/heads/{repo.default_branch}" if repo.default_branch else "HEAD"
+    out = _run_git(["ls-remote", remote_url(repo, remote_template), ref])
+    return out.split()[0] if out.strip() else None
+
+
+class PartialClone:
+    """
+    کلون موقت یک مخزن (context manager — پوشه در خروج پاک می‌شود)
+    blobهای بزرگ‌تر از max_blob_size اصلاً دانلود نمی‌شوند و در tree()
+    نمی‌آیند؛ هیچ فرمانی blob غایب را تنبل از سرور نمی‌خواهد
+    """
+
+    def __init__(
+        self,
+        repo: RepositoryInfo,
+        max_blob_size: int,
+        remote_template: str = GIT_REMOTE_TEMPLATE,
+        scratch_dir: str = GIT_SCRATCH_DIR,
+    ):
+        self.repo = repo
+        self.max_blob_size = max_blob_size
+        self.remote = remote_url(repo, remote_template)
+        self.scratch_dir = scratch_dir or None
+        self.path: str | None = None
+
+    def _git(self, *args: str) -> str:
+        return _run_git(list(args), cwd=self.path)
+
+    # ──────────────────────────────────────────
+    # کلون
+    # ──────────────────────────────────────────
+
+    def __enter__(self) -> PartialClone:
+        self.path = tempfile.mkdtemp(prefix="clone-", dir=self.scratch_dir)
+        args = [
+            "clone", "--quiet", "--no-checkout", "--depth", "1",
+            "--single-branch", "--no-tags",
+            f"--filter=blob:limit={self.max_blob_size}",
+        ]
+        if self.repo.default_branch:
+            args += ["--branch", self.repo.default_branch]
+        try:
+            self._git(*args, self.remote, self.path)
+        except GitCloneError:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.path:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+    # ──────────────────────────────────────────
+    # درخت و محتوا
+    # ──────────────────────────────────────────
+
+    def tree(self) -> list[dict]:
+        """
+        فایل‌های HEAD هم‌شکل خروجی /git/trees ({path, type, size, sha})
+        ls-tree -l برای اندازه، blobهای فیلترشده را از سرور می‌خواهد؛ پس
+        اندازه‌ها از اشیای موجود محلی (batch-check) خوانده می‌شوند
+        """
+        sizes: dict[str, int] = {}
+        for line in self._git(
+            "cat-file", "--batch-check", "--batch-all-objects", "--unordered"
+        ).splitlines():
+            sha, kind, size = line.split()
+            if kind == "blob":
+                sizes[sha] = int(size)
+
+        nodes = []
+        for line in self._git("ls-tree", "-r", "-z", "HEAD").split("\0"):
+            if not line:
+                continue
+            meta, path = line.split("\t", 1)
+            _, kind, sha = meta.split()
+            if kind != "blob" or sha not in sizes:
+                continue  # زیرماژول یا blob بزرگ‌تر از سقف
+            nodes.append({"path": path, "type": "blob", "size": sizes[sha], "sha": sha})
+        return nodes
+
+    def read_blobs(self, shas: Iterable[str]) -> Iterator[tuple[str, bytes]]:
+        """محتوای blobها با یک فرآیند cat-file --batch (به ترتیب ورودی)"""
+        shas = list(shas)
+        if not shas:
+            return
+        proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"], cwd=self.path, env=_GIT_ENV,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+        def feed() -> None:
+            # نوشتن در رشته جدا — بافر pipe خروجی پر نشود و بن‌بست نشود
+            try:
+                proc.stdin.write("".join(f"{sha}\n" for sha in shas).encode())
+                proc.stdin.close()
+            except OSError:
+                pass
+
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
+        try:
+            for _ in shas:
+                header = proc.stdout.readline().decode().split()
+                if len(header) != 3:
+                    # "<sha> missing" یا پایان زودهنگام
+                    if not header:
+                        break
+                    continue
+                sha, _, size = header
+                data = proc.stdout.read(int(size))
+                proc.stdout.read(1)  # خط جدید بعد از محتوا
+                yield sha, data
+        finally:
+            proc.stdout.close()
+            proc.kill()
+            proc.wait()
+            writer.join()
+            log.debug(f"   🗂️ cat-file: {len(shas)} blob از {self.repo.full_name}")
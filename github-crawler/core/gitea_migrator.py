@@ -4,7 +4,6 @@
 
 from __future__ import annotations
 
-import time
 import requests
 
 from config.settings import (
@@ -14,6 +13,7 @@ from config.settings import (
     GITEA_ORG,
     GITHUB_TOKEN,
 )
+from core.pacer import PacedSession
 from models.repository import RepositoryDB, RepositoryInfo
 from utils.logger import log
 
@@ -23,7 +23,7 @@ class GiteaMigrator:
 
     def __init__(self, db: RepositoryDB | None = None):
         self.db = db or RepositoryDB()
-        self._session = requests.Session()
+        self._session = PacedSession("gitea")
         self._session.headers.update(GITEA_HEADERS)
         self._current_user: str | None = None
         self._org: str = GITEA_ORG
@@ -211,8 +211,6 @@ class GiteaMigrator:
                 success += 1
             else:
                 failed += 1
-            if i < total:
-                time.sleep(5)
 
         result = {"success": success, "failed": failed, "total": total}
         log.info(f"📊 نتیجه: {result}")
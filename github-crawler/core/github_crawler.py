@@ -3,11 +3,18 @@
 - جستجوی صفحه‌بندی‌شده
 - اعتبارسنجی اجباری داده آموزشی
 - تعداد پروژه هر کلیدواژه قابل تنظیم
+- صف پایدار (crawl_frontier) — ادامه بعد از کرش و چند worker هم‌زمان
+- کلیدواژه‌های هم‌زمان با تقسیم وزن‌دار سهمیه (QuotaScheduler)
 """
 
 from __future__ import annotations
 
-import time
+import math
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
 
 from config.settings import (
     SEARCH_KEYWORDS,
@@ -15,9 +22,24 @@ from config.settings import (
     MIN_STARS,
     PROJECTS_PER_KEYWORD,
     MAX_SCAN_PER_KEYWORD,
+    INCREMENTAL_CRAWL,
+    FRONTIER_CLAIM_TIMEOUT_MIN,
+    SEARCH_CHECKPOINT_TTL_HOURS,
+    SEARCH_EXCLUDE_FORKS,
+    SEARCH_EXCLUDE_ARCHIVED,
+    SEARCH_MIN_SIZE_KB,
+    SEARCH_MAX_SIZE_KB,
+    SEARCH_PUSHED_WITHIN_DAYS,
+    SEARCH_MIN_GOOD_FIRST_ISSUES,
+    SEARCH_REPORT_FILTER_SAVINGS,
+    VALIDATION_WORKERS,
+    KEYWORD_CONCURRENCY,
 )
+from core.artifact_cache import ArtifactCache
+from core.quota_scheduler import QuotaScheduler
 from core.rate_limiter import GitHubRateLimiter
 from core.repo_validator import RepoValidator
+from core.search_partitioner import SEARCH_PER_PAGE, SearchPartitioner
 from models.repository import RepositoryInfo, RepositoryDB, ValidationResult
 from utils.logger import log
 
@@ -27,9 +49,14 @@ class GitHubCrawler:
 
     def __init__(self, db: RepositoryDB | None = None):
         self.rate_limiter = GitHubRateLimiter()
-        self.validator = RepoValidator(self.rate_limiter)
         self.db = db or RepositoryDB()
-        self._seen: set[str] = set()
+        # کش آرتیفکت اجرا — به استخراج‌کننده/انتقال‌دهنده هم داده می‌شود
+        self.artifacts = ArtifactCache()
+        self.validator = RepoValidator(
+            self.rate_limiter, db=self.db, artifacts=self.artifacts
+        )
+        # شناسه این پروسه برای ادعای مخازن صف کرول
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
 
     def search_repositories(
         self,
@@ -42,6 +69,8 @@ class GitHubCrawler:
         """
         جستجوی مخازن با اعتبارسنجی اجباری
         فقط مخازنی برگردانده می‌شوند که تمام شرایط آموزشی را دارند
+        تا KEYWORD_CONCURRENCY کلیدواژه هم‌زمان؛ سهمیه جستجو و اعتبارسنجی
+        بر اساس فاصله هر کلیدواژه تا هدف بین آن‌ها تقسیم می‌شود
         """
         keywords = keywords or SEARCH_KEYWORDS
         language = language or SEARCH_LANGUAGE
@@ -49,31 +78,35 @@ class GitHubCrawler:
         target_count = projects_per_keyword or PROJECTS_PER_KEYWORD
         scan_limit = max_scan or MAX_SCAN_PER_KEYWORD
 
-        all_valid_repos: list[RepositoryInfo] = []
-
-        for keyword in keywords:
-            log.info(f"\n{'='*50}")
-            log.info(
-                f"🔍 کلیدواژه: [bold cyan]{keyword}[/] | "
-                f"هدف: {target_count} پروژه واجد شرایط"
-            )
-            log.info(f"{'='*50}")
-
-            valid_repos = self._search_keyword_with_validation(
-                keyword=keyword,
-                language=language,
-                min_stars=min_stars,
-                target_count=target_count,
-                scan_limit=scan_limit,
-            )
-            all_valid_repos.extend(valid_repos)
-
-            log.info(
-                f"✅ «{keyword}»: {len(valid_repos)}/{target_count} "
-                f"پروژه واجد شرایط یافت شد"
-            )
-            time.sleep(3)
+        self.db.clear_search_checkpoints(ttl_hours=SEARCH_CHECKPOINT_TTL_HOURS)
+        scheduler = QuotaScheduler({kw: target_count for kw in keywords})
+        results: dict[str, list[RepositoryInfo]] = {}
+
+        workers = max(1, min(KEYWORD_CONCURRENCY, len(keywords)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    self._search_keyword_with_validation,
+                    keyword=keyword,
+                    language=language,
+                    min_stars=min_stars,
+                    target_count=target_count,
+                    scan_limit=scan_limit,
+                    scheduler=scheduler,
+                ): keyword
+                for keyword in keywords
+            }
+            for future in as_completed(futures):
+                keyword = futures[future]
+                results[keyword] = future.result()
+                log.info(
+                    f"✅ «{keyword}»: {len(results[keyword])}/{target_count} "
+                    f"پروژه واجد شرایط یافت شد"
+                )
 
+        # ترتیب خروجی مثل ترتیب کلیدواژه‌ها
+        all_valid_repos = [repo for kw in keywords for repo in results[kw]]
+        scheduler.summary()
         log.info(f"\n📦 مجموع پروژه‌های واجد شرایط: "
                  f"[bold green]{len(all_valid_repos)}[/]")
         return all_valid_repos
@@ -85,70 +118,94 @@ class GitHubCrawler:
         min_stars: int,
         target_count: int,
         scan_limit: int,
+        scheduler: QuotaScheduler | None = None,
     ) -> list[RepositoryInfo]:
         """
         جستجو + اعتبارسنجی برای یک کلیدواژه
         تا رسیدن به تعداد هدف یا اتمام نتایج ادامه می‌دهد
+        هر صفحه جستجو و هر دور اعتبارسنجی با نوبت از scheduler اجرا می‌شود
         """
-        query = f"{keyword} language:{language} stars:>={min_stars}"
+        scheduler = scheduler or QuotaScheduler({keyword: target_count})
+        log.info(f"\n{'='*50}")
+        log.info(
+            f"🔍 کلیدواژه: [bold cyan]{keyword}[/] | "
+            f"هدف: {target_count} پروژه واجد شرایط"
+        )
+        log.info(f"{'='*50}")
+
+        # ── واترمارک: بعد از یک پیمایش کامل فقط تغییرات جستجو می‌شوند ──
+        watermark = self.db.get_watermark(keyword, language)
+        pushed_after = None
+        if INCREMENTAL_CRAWL and watermark and watermark["complete"]:
+            pushed_after = watermark["max_pushed_at"]
+            log.info(f"   🔖 کرول افزایشی: pushed>{pushed_after}")
+
+        # پیمایش با سقف هدف/اسکن در چند اجرا (از چک‌پوینت‌ها و صف) تمام می‌شود؛
+        # واترمارک بعدی زمان شروع اولین اجرای آن است — push‌های حین پیمایش
+        # در برش‌های پیمایش‌شده جا نمی‌مانند
+        pass_started = self.db.begin_watermark_pass(keyword, language)
+
+        query = self.build_query(keyword, language, pushed_after)
         valid_repos: list[RepositoryInfo] = []
         scanned = 0
         rejected = 0
         skipped = 0
-        page = 1
-        per_page = 30
+        max_created = ""
+        search_done = False
+        # partitioner جدا برای هر کلیدواژه — شمارنده‌ها و last_total مخلوط نشوند
+        partitioner = SearchPartitioner(self.rate_limiter, db=self.db)
+        validation_resource = "graphql" if self.validator.mode == "graphql" else "core"
 
-        while len(valid_repos) < target_count and scanned < scan_limit:
-            # ── دریافت صفحه نتایج ──
-            params = {
-                "q": query,
-                "sort": "stars",
-                "order": "desc",
-                "per_page": per_page,
-                "page": page,
-            }
+        pending = self.db.get_frontier_counts(keyword, language).get("pending", 0)
+        if pending:
+            log.info(f"   ⏯️ [{keyword}] ادامه از صف کرول: {pending} مخزن در انتظار")
 
-            response = self.rate_limiter.get(
-                "/search/repositories", params=params, is_search=True
-            )
-
-            if response.status_code != 200:
-                log.error(f"❌ خطای جستجو: {response.status_code}")
-                break
-
-            data = response.json()
-            items = data.get("items", [])
-            total_available = data.get("total_count", 0)
+        # هر دور: اول پرستاره‌ترین مخازن صف ادعا و اعتبارسنجی می‌شوند؛
+        # صف که خالی شد صفحه بعدی جستجو (برش‌های زیر سقف 1000) به صف می‌رود
+        pages = partitioner.pages(query, min_stars)
+        claim_size = self.validator.batch_size * max(1, VALIDATION_WORKERS)
 
-            if not items:
-                log.info("   📭 نتایج تمام شد")
-                break
-
-            log.info(
-                f"   📄 صفحه {page} — {len(items)} مخزن "
-                f"(مجموع در GitHub: {total_available})"
+        while len(valid_repos) < target_count and scanned < scan_limit:
+            claimed = self.db.claim_frontier(
+                keyword, language, self.worker_id,
+                min(claim_size, scan_limit - scanned),
+                FRONTIER_CLAIM_TIMEOUT_MIN,
             )
 
-            # ── بررسی هر مخزن ──
-            for item in items:
-                if len(valid_repos) >= target_count:
-                    break
-                if scanned >= scan_limit:
+            if not claimed:
+                if search_done:
                     break
-
-                full_name = item.get("full_name", "")
-
-                # رد تکراری
-                if full_name in self._seen:
-                    skipped += 1
+                with scheduler.turn(keyword, "search") as turn:
+                    before = partitioner.requests
+                    page_result = next(pages, None)
+                    turn.calls = partitioner.requests - before
+                if page_result is None:
+                    search_done = True
                     continue
-                self._seen.add(full_name)
 
-                # رد بررسی‌شده قبلی
-                if self.db.is_already_checked(full_name):
-                    skipped += 1
+                slice_query, page, items, total_available = page_result
+                if not items:
                     continue
 
+                max_created = max([max_created, *(it.get("created_at") or "" for it in items)])
+
+                # رد بررسی‌شده قبلی (این پروسه یا workerهای دیگر)؛
+                # تکراری‌های صف (برش دیگر / پروسه دیگر) را INSERT OR IGNORE حذف می‌کند
+                checked = self.db.checked_among([it.get("full_name", "") for it in items])
+                fresh = [it for it in items if it.get("full_name", "") not in checked]
+                added = self.db.enqueue_frontier(keyword, language, fresh)
+                skipped += len(items) - added
+
+                log.info(
+                    f"   📄 [{keyword}] صفحه {page} — {len(items)} مخزن، {added} به صف "
+                    f"(برش: {slice_query.removeprefix(query).strip()} | "
+                    f"مجموع در GitHub: {total_available})"
+                )
+                continue
+
+            # ── جمع‌آوری کاندیدها ──
+            candidates: list[RepositoryInfo] = []
+            for item in claimed:
                 scanned += 1
                 repo = RepositoryInfo.from_github_api(item)
 
@@ -162,63 +219,254 @@ class GitHubCrawler:
                     rejected += 1
                     continue
 
-                # ── اعتبارسنجی کامل ──
                 log.info(
-                    f"   [{scanned}/{scan_limit}] 🔎 بررسی: "
-                    f"{full_name} (⭐{repo.stars})"
+                    f"   [{keyword} {scanned}/{scan_limit}] 🔎 بررسی: "
+                    f"{repo.full_name} (⭐{repo.stars})"
                 )
+                candidates.append(repo)
 
-                validation = self.validator.validate(repo)
+            # ── اعتبارسنجی موازی ──
+            if candidates:
+                with scheduler.turn(keyword, validation_resource) as turn:
+                    rejected += self._validate_candidates(
+                        candidates, keyword, valid_repos, target_count
+                    )
+                    turn.calls = math.ceil(
+                        len(candidates) * self.validator.calls_per_repo
+                    )
+            scheduler.progress(keyword, len(valid_repos), scanned)
+
+        # همه برش‌ها (در این اجرا یا اجراهای قبلی از چک‌پوینت) به صف رفتند و
+        # صفحه/کاوش ناموفقی نبود — باقی‌مانده صف پایدار است و اجرای بعدی
+        # اول آن را اعتبارسنجی می‌کند، پس واترمارک می‌تواند جلو برود
+        exhausted = search_done and not partitioner.failed
+        if search_done and partitioner.failed:
+            log.warning(
+                f"   ⚠️ [{keyword}] پیمایش ناقص (خطای جستجو) — "
+                f"واترمارک و چک‌پوینت‌ها دست نخورد"
+            )
+        elif not search_done:
+            log.info(
+                f"   ⏭️ [{keyword}] پیمایش در اجرای بعدی از چک‌پوینت‌ها ادامه می‌یابد "
+                f"(شروع: {pass_started})"
+            )
+        if exhausted:
+            # پیمایش بعدی از ابتدای نتایج شروع شود
+            self.db.clear_search_checkpoints(query)
 
-                if validation.is_valid:
-                    # ✅ واجد شرایط
-                    repo.has_readme = True
-                    repo.has_sufficient_issues = True
-                    repo.has_sufficient_prs = True
-                    repo.has_sufficient_code = True
-                    repo.mark_training_ready()
+        self.db.save_watermark(
+            keyword, language, pass_started, max_created or None,
+            complete=exhausted,
+        )
 
-                    valid_repos.append(repo)
-                    self.db.upsert_repository(repo, keyword=keyword)
+        log.info(
+            f"   📊 خلاصه «{keyword}»: "
+            f"اسکن={scanned} | قبول={len(valid_repos)} | "
+            f"رد={rejected} | رد تکراری={skipped} | "
+            f"صفحه از چک‌پوینت={partitioner.resumed}"
+        )
+        if SEARCH_REPORT_FILTER_SAVINGS:
+            with scheduler.turn(keyword, "search") as turn:
+                turn.calls = 1
+                self._report_pushdown_savings(
+                    keyword, language, min_stars, scanned,
+                    partitioner.last_total, pushed_after,
+                )
+        self.validator.flush_stats()
 
+        return valid_repos
+
+    # ──────────────────────────────────────────
+    # ساخت کوئری (فیلترها سمت GitHub)
+    # ──────────────────────────────────────────
+
+    @staticmethod
+    def _pushdown_qualifiers(pushed_after: str | None = None) -> list[str]:
+        """
+        شرایطی که به جای رد سمت کلاینت، در کوئری جستجو اعمال می‌شوند
+        pushed_after: واترمارک کرول افزایشی (جدیدتر از بازه SEARCH_PUSHED_WITHIN_DAYS)
+        """
+        qualifiers = ["is:public"]
+        if SEARCH_EXCLUDE_FORKS:
+            qualifiers.append("fork:false")
+        if SEARCH_EXCLUDE_ARCHIVED:
+            qualifiers.append("archived:false")
+        if SEARCH_MAX_SIZE_KB:
+            qualifiers.append(f"size:{SEARCH_MIN_SIZE_KB}..{SEARCH_MAX_SIZE_KB}")
+        elif SEARCH_MIN_SIZE_KB:
+            qualifiers.append(f"size:>={SEARCH_MIN_SIZE_KB}")
+        since = ""
+        if SEARCH_PUSHED_WITHIN_DAYS:
+            since = (
+                date.today() - timedelta(days=SEARCH_PUSHED_WITHIN_DAYS)
+            ).isoformat()
+        since = max(since, pushed_after or "")
+        if since:
+            qualifiers.append(f"pushed:>{since}")
+        if SEARCH_MIN_GOOD_FIRST_ISSUES:
+            qualifiers.append(f"good-first-issues:>={SEARCH_MIN_GOOD_FIRST_ISSUES}")
+        return qualifiers
+
+    def build_query(
+        self, keyword: str, language: str, pushed_after: str | None = None
+    ) -> str:
+        """کوئری جستجو (بدون stars — بازه ستاره را partitioner اضافه می‌کند)"""
+        return " ".join([
+            keyword, f"language:{language}",
+            *self._pushdown_qualifiers(pushed_after),
+        ])
+
+    def _report_pushdown_savings(
+        self,
+        keyword: str,
+        language: str,
+        min_stars: int,
+        scanned: int,
+        filtered_total: int,
+        pushed_after: str | None = None,
+    ) -> None:
+        """
+        تخمین درخواست‌های صرفه‌جویی‌شده توسط فیلترهای کوئری
+        (فقط با SEARCH_REPORT_FILTER_SAVINGS — یک جستجوی اضافه per_page=1)
+        مبنا همان کوئری بدون فیلترهاست؛ واترمارک کرول افزایشی در مبنا هم
+        می‌ماند تا نتایج قدیمی‌تر از آن به حساب فیلترها نوشته نشوند
+        """
+        base = f"{keyword} language:{language} stars:>={min_stars}"
+        if pushed_after:
+            base += f" pushed:>{pushed_after}"
+        resp = self.rate_limiter.get(
+            "/search/repositories",
+            params={"q": base, "per_page": 1},
+            is_search=True,
+        )
+        if resp.status_code != 200:
+            return
+
+        unfiltered_total = resp.json().get("total_count", 0)
+        excluded = max(0, unfiltered_total - filtered_total)
+        if not excluded or not filtered_total:
+            return
+
+        # برای رسیدن به همین تعداد کاندید مفید، بدون فیلتر باید این تعداد
+        # مخزن اضافه اسکن و اعتبارسنجی می‌شد
+        extra = scanned * excluded / filtered_total
+        saved = math.ceil(
+            extra * self.validator.calls_per_repo + extra / SEARCH_PER_PAGE
+        )
+        log.info(
+            f"   🎯 فیلترهای کوئری «{keyword}»: "
+            f"{excluded}/{unfiltered_total} نتیجه حذف شد | "
+            f"~{saved} درخواست API صرفه‌جویی شد"
+        )
+
+    def _validate_candidates(
+        self,
+        candidates: list[RepositoryInfo],
+        keyword: str,
+        valid_repos: list[RepositoryInfo],
+        target_count: int,
+    ) -> int:
+        """
+        اعتبارسنجی دسته‌ها با چند worker روی rate limiter مشترک
+        با رسیدن به هدف، دسته‌های شروع‌نشده لغو و دسته‌های در حال اجرا
+        قبل از درخواست بعدی متوقف می‌شوند — تعداد ردشده‌ها را برمی‌گرداند
+        """
+        if not candidates:
+            return 0
+
+        size = self.validator.batch_size
+        batches = [
+            candidates[i:i + size] for i in range(0, len(candidates), size)
+        ]
+        workers = max(1, min(
+            VALIDATION_WORKERS, len(batches), self.rate_limiter.concurrency_limit()
+        ))
+        cancel = threading.Event()
+        rejected = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(self.validator.validate_many, batch, cancel): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                if future.cancelled():
+                    # دسته لغوشده — ادعاها به صف برمی‌گردند
+                    self.db.release_frontier([r.full_name for r in futures[future]])
+                    continue
+                rejected += self._record_results(
+                    futures[future], future.result(),
+                    keyword, valid_repos, target_count,
+                )
+                if len(valid_repos) >= target_count and not cancel.is_set():
+                    cancel.set()
+                    dropped = sum(f.cancel() for f in futures)
                     log.info(
-                        f"   ✅ [bold green]قبول[/] [{len(valid_repos)}/{target_count}]: "
-                        f"{full_name} | Issues={validation.issue_count} "
-                        f"PRs={validation.pr_count} Code={validation.code_file_count}"
+                        f"   🛑 هدف کامل شد — {dropped} دسته در صف لغو شد"
                     )
-                else:
-                    # ❌ رد شد
-                    reason = " | ".join(validation.rejection_reasons)
-                    self._reject_repo(repo, keyword, reason)
-                    rejected += 1
-                    log.info(f"   ⛔ رد: {full_name} — {reason}")
 
-                time.sleep(0.5)
+        return rejected
+
+    def _record_results(
+        self,
+        batch: list[RepositoryInfo],
+        results: list[ValidationResult | None],
+        keyword: str,
+        valid_repos: list[RepositoryInfo],
+        target_count: int,
+    ) -> int:
+        """ثبت نتیجه یک دسته — تعداد ردشده‌ها را برمی‌گرداند"""
+        rejected = 0
+
+        for repo, validation in zip(batch, results):
+            if validation is None:
+                # لغو شده — به صف برمی‌گردد تا در اجرای بعدی بررسی شود
+                self.db.release_frontier([repo.full_name])
+                continue
 
-            page += 1
+            if validation.is_valid:
+                if len(valid_repos) >= target_count:
+                    # مازاد هدف — به صف برمی‌گردد تا در اجرای بعدی استفاده شود
+                    self.db.release_frontier([repo.full_name])
+                    continue
 
-            # محدودیت GitHub Search (1000 نتیجه)
-            if page > 34:
-                log.warning("   ⚠️ به محدودیت 1000 نتیجه GitHub رسیدیم")
-                break
+                # ✅ واجد شرایط
+                repo.has_readme = True
+                repo.has_sufficient_issues = True
+                repo.has_sufficient_prs = True
+                repo.has_sufficient_code = True
+                repo.mark_training_ready()
 
-            time.sleep(2)
+                valid_repos.append(repo)
+                self.db.upsert_repository(repo, keyword=keyword)
+                self.db.finish_frontier(repo.full_name, "accepted")
 
-        log.info(
-            f"   📊 خلاصه «{keyword}»: "
-            f"اسکن={scanned} | قبول={len(valid_repos)} | "
-            f"رد={rejected} | رد تکراری={skipped}"
-        )
+                log.info(
+                    f"   ✅ [bold green]قبول[/] [{keyword} {len(valid_repos)}/{target_count}]: "
+                    f"{repo.full_name} | Issues={validation.issue_count} "
+                    f"PRs={validation.pr_count} Code={validation.code_file_count}"
+                )
+            else:
+                # ❌ رد شد
+                reason = " | ".join(validation.rejection_reasons)
+                self._reject_repo(repo, keyword, reason, validation)
+                rejected += 1
+                log.info(f"   ⛔ [{keyword}] رد: {repo.full_name} — {reason}")
 
-        return valid_repos
+        return rejected
 
     def _reject_repo(
-        self, repo: RepositoryInfo, keyword: str, reason: str
+        self,
+        repo: RepositoryInfo,
+        keyword: str,
+        reason: str,
+        validation: ValidationResult | None = None,
     ) -> None:
-        """ثبت مخزن رد شده"""
+        """ثبت مخزن رد شده (با شمارش‌ها برای زمان‌بندی بازبینی)"""
         repo.rejection_reason = reason
         repo.is_training_ready = False
-        self.db.save_rejected(repo.full_name, reason)
+        self.db.save_rejected(repo.full_name, reason, validation)
+        self.db.finish_frontier(repo.full_name, "rejected")
 
     def get_repository_details(self, full_name: str) -> RepositoryInfo | None:
         """دریافت جزئیات یک مخزن خاص"""
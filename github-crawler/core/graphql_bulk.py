@@ -0,0 +1,243 @@
+"""
+دریافت دسته‌ای Issues و Pull Requests با GraphQL
+Issues همراه کامنت‌ها و PRها همراه Review، کامنت و آمار فایل‌ها
+در یک کوئری صفحه‌بندی‌شده — به جای یک درخواست برای هر آیتم
+خروجی هم‌شکل پاسخ REST است تا کد ذخیره‌سازی مشترک بماند
+"""
+
+from __future__ import annotations
+
+from typing import Iterator
+
+from core.rate_limiter import GitHubRateLimiter
+from utils.logger import log
+
+_RATE_LIMIT = "rateLimit { cost remaining limit resetAt }"
+
+_ISSUES_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String,
+      $field: IssueOrderField!, $direction: OrderDirection!, $comments: Int!,
+      $since: DateTime) {
+  %s
+  repository(owner: $owner, name: $name) {
+    issues(first: $first, after: $after,
+           orderBy: {field: $field, direction: $direction},
+           filterBy: {since: $since}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number title state body url createdAt updatedAt
+        author { login }
+        labels(first: 20) { nodes { name } }
+        comments(first: $comments) {
+          totalCount
+          nodes { author { login } body createdAt }
+        }
+      }
+    }
+  }
+}
+""" % _RATE_LIMIT
+
+_PRS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String,
+      $field: IssueOrderField!, $direction: OrderDirection!,
+      $comments: Int!, $files: Int!, $reviews: Int!) {
+  %s
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $first, after: $after,
+                 orderBy: {field: $field, direction: $direction}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number title state body url createdAt updatedAt mergedAt
+        additions deletions changedFiles headRefName baseRefName
+        author { login }
+        labels(first: 20) { nodes { name } }
+        files(first: $files) {
+          nodes { path changeType additions deletions }
+        }
+        reviews(first: $reviews) {
+          nodes { author { login } state body }
+        }
+        comments(first: $comments) {
+          totalCount
+          nodes { author { login } body createdAt }
+        }
+      }
+    }
+  }
+}
+""" % _RATE_LIMIT
+
+# نگاشت changeType در GraphQL به status در REST
+_CHANGE_TYPES = {
+    "ADDED": "added",
+    "DELETED": "removed",
+    "MODIFIED": "modified",
+    "RENAMED": "renamed",
+    "COPIED": "copied",
+    "CHANGED": "changed",
+}
+
+
+def _login(node: dict | None) -> str:
+    """نام کاربری نویسنده (کاربر حذف‌شده → ghost)"""
+    return ((node or {}).get("author") or {}).get("login", "ghost")
+
+
+def _comments(node: dict) -> list[dict]:
+    return [
+        {
+            "user": {"login": _login(c)},
+            "body": c.get("body", "") or "",
+            "created_at": c.get("createdAt", ""),
+        }
+        for c in node.get("comments", {}).get("nodes", [])
+    ]
+
+
+class GraphQLBulkFetcher:
+    """Issues و PRها با داده‌های تو در تو، صفحه به صفحه"""
+
+    def __init__(self, rate_limiter: GitHubRateLimiter | None = None):
+        self.api = rate_limiter or GitHubRateLimiter()
+
+    def _pages(
+        self, query: str, connection: str, variables: dict, max_items: int
+    ) -> Iterator[list[dict]]:
+        """دنبال کردن cursor تا پایان نتایج یا رسیدن به max_items"""
+        after = None
+        fetched = 0
+
+        while fetched < max_items:
+            first = min(variables["first"], max_items - fetched)
+            body = self.api.graphql(
+                query, {**variables, "first": first, "after": after}
+            )
+            repository = (body.get("data") or {}).get("repository")
+            if not repository:
+                log.warning(
+                    f"⚠️ GraphQL {connection}: {body.get('errors', [])[:1]}"
+                )
+                return
+
+            conn = repository[connection]
+            nodes = conn.get("nodes", [])
+            fetched += len(nodes)
+            yield nodes
+
+            if not nodes or not conn["pageInfo"]["hasNextPage"]:
+                return
+            after = conn["pageInfo"]["endCursor"]
+
+    # ──────────────────────────────────────────
+    # Issues
+    # ──────────────────────────────────────────
+
+    def issues(
+        self,
+        full_name: str,
+        max_count: int,
+        order_by: str = "UPDATED_AT",
+        direction: str = "DESC",
+        max_comments: int = 10,
+        page_size: int = 50,
+        since: str | None = None,
+    ) -> Iterator[list[dict]]:
+        """
+        صفحه‌های Issue به شکل REST؛ کامنت‌ها در کلید comment_list
+        (PRها در اتصال issues گراف‌کیوال نیستند)
+        since: فقط Issueهای به‌روزشده از این زمان (ISO 8601)
+        """
+        owner, name = full_name.split("/", 1)
+        variables = {
+            "owner": owner, "name": name, "first": page_size,
+            "field": order_by, "direction": direction,
+            "comments": max_comments, "since": since,
+        }
+        for nodes in self._pages(_ISSUES_QUERY, "issues", variables, max_count):
+            yield [
+                {
+                    "number": n["number"],
+                    "title": n.get("title", ""),
+                    "state": n.get("state", "OPEN").lower(),
+                    "body": n.get("body", "") or "",
+                    "html_url": n.get("url", ""),
+                    "labels": n.get("labels", {}).get("nodes", []),
+                    "created_at": n.get("createdAt"),
+                    "updated_at": n.get("updatedAt"),
+                    "comments": n.get("comments", {}).get("totalCount", 0),
+                    "comment_list": _comments(n),
+                    "user": {"login": _login(n)},
+                }
+                for n in nodes
+            ]
+
+    # ──────────────────────────────────────────
+    # Pull Requests
+    # ──────────────────────────────────────────
+
+    def pull_requests(
+        self,
+        full_name: str,
+        max_count: int,
+        order_by: str = "UPDATED_AT",
+        direction: str = "DESC",
+        max_comments: int = 10,
+        max_files: int = 20,
+        max_reviews: int = 20,
+        page_size: int = 25,
+    ) -> Iterator[list[dict]]:
+        """
+        صفحه‌های PR به شکل REST؛ فایل‌ها (بدون patch)، Reviewها و
+        کامنت‌ها در کلیدهای file_list / review_list / comment_list
+        """
+        owner, name = full_name.split("/", 1)
+        variables = {
+            "owner": owner, "name": name, "first": page_size,
+            "field": order_by, "direction": direction,
+            "comments": max_comments, "files": max_files,
+            "reviews": max_reviews,
+        }
+        for nodes in self._pages(_PRS_QUERY, "pullRequests", variables, max_count):
+            yield [self._pull_request(n) for n in nodes]
+
+    @staticmethod
+    def _pull_request(n: dict) -> dict:
+        state = n.get("state", "OPEN")
+        return {
+            "number": n["number"],
+            "title": n.get("title", ""),
+            "state": "open" if state == "OPEN" else "closed",
+            "body": n.get("body", "") or "",
+            "html_url": n.get("url", ""),
+            "merged_at": n.get("mergedAt"),
+            "head": {"ref": n.get("headRefName", "")},
+            "base": {"ref": n.get("baseRefName", "")},
+            "labels": n.get("labels", {}).get("nodes", []),
+            "created_at": n.get("createdAt"),
+            "updated_at": n.get("updatedAt"),
+            "user": {"login": _login(n)},
+            "additions": n.get("additions", 0),
+            "deletions": n.get("deletions", 0),
+            "changed_files": n.get("changedFiles", 0),
+            "file_list": [
+                {
+                    "filename": f.get("path", ""),
+                    "status": _CHANGE_TYPES.get(f.get("changeType"), "modified"),
+                    "additions": f.get("additions", 0),
+                    "deletions": f.get("deletions", 0),
+                    "patch": "",
+                }
+                for f in (n.get("files") or {}).get("nodes", [])
+            ],
+            "review_list": [
+                {
+                    "user": _login(r),
+                    "state": r.get("state", "COMMENTED"),
+                    "body": r.get("body", ""),
+                }
+                for r in n.get("reviews", {}).get("nodes", [])
+                if (r.get("body") or "").strip()
+            ],
+            "comment_list": _comments(n),
+        }
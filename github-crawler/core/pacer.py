@@ -0,0 +1,163 @@
+"""
+زیرسیستم واحد فاصله‌گذاری درخواست‌ها (Token Bucket)
+یک سطل برای هر مقصد: github_core, github_search, github_graphql, gitea
+نرخ هر سطل از سهمیه باقی‌مانده، زمان تا reset و
+تأخیر / خطاهای 5xx مشاهده‌شده تنظیم می‌شود
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import requests
+
+from config.settings import PACER_GITHUB_MAX_RPS, PACER_GITEA_RPS
+from core.rate_budget import PACING_THRESHOLDS, RESET_WINDOWS
+from utils.logger import log
+
+
+class TokenBucket:
+    """سطل توکن با نرخ تطبیقی"""
+
+    def __init__(self, name: str, rate: float, capacity: float = 5):
+        self.name = name
+        self.base_rate: float = rate      # نرخ مجاز از سهمیه / تنظیمات
+        self.capacity: float = capacity
+        self.health: float = 1.0          # ضریب سلامت (۰.۰۵ تا ۱)
+        self.latency: float = 0.0         # میانگین نمایی تأخیر
+        self._baseline_latency: float = 0.0
+        self._tokens: float = capacity
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return max(0.01, self.base_rate * self.health)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self) -> float:
+        """برداشتن یک توکن — در صورت نیاز صبر می‌کند؛ مدت صبر را برمی‌گرداند"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def set_rate(self, rate: float, capacity: float | None = None) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.base_rate = max(0.01, rate)
+            if capacity is not None:
+                self.capacity = max(1.0, capacity)
+
+    def observe(self, latency: float, status_code: int) -> None:
+        """
+        بازخورد پاسخ: کاهش ضربی در خطای سرور / محدودیت،
+        افزایش جمعی در پاسخ سالم (AIMD)
+        """
+        with self._lock:
+            self.latency = (
+                latency if not self.latency else 0.8 * self.latency + 0.2 * latency
+            )
+            if not self._baseline_latency or latency < self._baseline_latency:
+                self._baseline_latency = latency
+
+            if status_code >= 500 or status_code == 429:
+                self.health = max(0.05, self.health * 0.5)
+                log.debug(
+                    f"🐢 {self.name}: پاسخ {status_code} — نرخ {self.rate:.2f}/s"
+                )
+            elif self.latency > 3 * max(self._baseline_latency, 0.05):
+                # سرور کند شده — کمی عقب‌نشینی
+                self.health = max(0.05, self.health * 0.9)
+            else:
+                self.health = min(1.0, self.health + 0.05)
+
+
+class Pacer:
+    """مدیریت سطل‌های همه مقصدها"""
+
+    def __init__(self):
+        self.buckets: dict[str, TokenBucket] = {
+            "github_core": TokenBucket("github_core", PACER_GITHUB_MAX_RPS),
+            "github_search": TokenBucket("github_search", 0.5, capacity=1),
+            "github_code_search": TokenBucket("github_code_search", 0.15, capacity=1),
+            "github_graphql": TokenBucket("github_graphql", PACER_GITHUB_MAX_RPS),
+            "gitea": TokenBucket("gitea", PACER_GITEA_RPS),
+        }
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> TokenBucket:
+        with self._lock:
+            if name not in self.buckets:
+                self.buckets[name] = TokenBucket(name, PACER_GITHUB_MAX_RPS)
+            return self.buckets[name]
+
+    def acquire(self, name: str) -> float:
+        return self.bucket(name).acquire()
+
+    def observe(self, name: str, latency: float, status_code: int) -> None:
+        self.bucket(name).observe(latency, status_code)
+
+    def retune(
+        self, resource: str, remaining: int, limit: int, reset: float
+    ) -> None:
+        """
+        تنظیم نرخ سطل GitHub از سهمیه
+        تا وقتی سهمیه بالای آستانه است با حداکثر نرخ، وگرنه
+        سهمیه باقی‌مانده یکنواخت تا reset پخش می‌شود
+        """
+        now = time.time()
+        window = RESET_WINDOWS.get(resource, 3600)
+        reset_in = reset - now if reset > now else window
+        if reset and reset <= now:
+            remaining = limit
+
+        threshold = PACING_THRESHOLDS.get(resource, 0.2)
+        spread = max(1, remaining) / max(1.0, reset_in)
+        if remaining > limit * threshold:
+            rate, capacity = PACER_GITHUB_MAX_RPS, 5
+        else:
+            rate, capacity = min(spread, PACER_GITHUB_MAX_RPS), 1
+        self.bucket(f"github_{resource}").set_rate(rate, capacity)
+
+    def snapshot(self) -> dict[str, dict]:
+        return {
+            name: {
+                "rate": round(b.rate, 3),
+                "health": round(b.health, 2),
+                "latency": round(b.latency, 3),
+            }
+            for name, b in self.buckets.items()
+        }
+
+
+pacer = Pacer()
+
+
+class PacedSession(requests.Session):
+    """Session که هر درخواست را از سطل مقصد عبور می‌دهد (برای Gitea)"""
+
+    def __init__(self, bucket: str = "gitea"):
+        super().__init__()
+        self.bucket = bucket
+
+    def request(self, method, url, *args, **kwargs):
+        pacer.acquire(self.bucket)
+        start = time.monotonic()
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            pacer.observe(self.bucket, time.monotonic() - start, 599)
+            raise
+        pacer.observe(self.bucket, time.monotonic() - start, resp.status_code)
+        return resp
@@ -0,0 +1,116 @@
+"""
+زمان‌بندی سهمیه بین کلیدواژه‌های هم‌زمان
+هر کلیدواژه برای هر واحد کار (یک صفحه جستجو / یک دور اعتبارسنجی)
+از منبع مربوطه نوبت می‌گیرد؛ نوبت به کلیدواژه‌ای می‌رسد که نسبت
+مصرفش به کسری تا هدف (PROJECTS_PER_KEYWORD) کمتر است
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from utils.logger import log
+
+# واحدهای کار هم‌زمان روی هر منبع — هر واحد خودش موازی است
+# (partitioner چند برش، اعتبارسنج چند worker)، پس یک نوبت کافی است
+# و جستجوی یک کلیدواژه با اعتبارسنجی کلیدواژه دیگر هم‌پوشانی دارد
+_SLOTS: dict[str, int] = {"search": 1, "core": 1, "graphql": 1}
+
+
+class Turn:
+    """نوبت گرفته‌شده — گیرنده تعداد درخواست واقعی را در calls ثبت می‌کند"""
+
+    def __init__(self, keyword: str, resource: str):
+        self.keyword = keyword
+        self.resource = resource
+        self.calls = 0
+
+
+class QuotaScheduler:
+    """صف نوبت وزن‌دار منابع GitHub بین کلیدواژه‌ها"""
+
+    def __init__(self, targets: dict[str, int]):
+        self._cond = threading.Condition()
+        self.targets = dict(targets)
+        self.found = {kw: 0 for kw in targets}
+        self.scanned = {kw: 0 for kw in targets}
+        self.spent: dict[str, dict[str, int]] = {}
+        self._busy: dict[str, int] = {}
+        self._waiting: dict[str, list[str]] = {}
+        self._started = {kw: time.monotonic() for kw in targets}
+
+    # ──────────────────────────────────────────
+    # نوبت‌دهی
+    # ──────────────────────────────────────────
+
+    def weight(self, keyword: str) -> int:
+        """کسری تا هدف — کلیدواژه عقب‌تر سهم بیشتری می‌گیرد"""
+        return max(1, self.targets[keyword] - self.found[keyword])
+
+    def _share(self, keyword: str, resource: str) -> float:
+        return self.spent.get(resource, {}).get(keyword, 0) / self.weight(keyword)
+
+    def _my_turn(self, keyword: str, resource: str) -> bool:
+        if self._busy.get(resource, 0) >= _SLOTS.get(resource, 1):
+            return False
+        waiting = self._waiting[resource]
+        # کمترین مصرف نسبت به وزن؛ در تساوی، زودتر صف‌گرفته
+        return keyword == min(waiting, key=lambda kw: self._share(kw, resource))
+
+    @contextmanager
+    def turn(self, keyword: str, resource: str) -> Iterator[Turn]:
+        """
+        انتظار تا نوبت این کلیدواژه روی منبع
+        بعد از پایان، turn.calls به مصرف کلیدواژه اضافه می‌شود
+        """
+        with self._cond:
+            self._waiting.setdefault(resource, []).append(keyword)
+            self._cond.wait_for(lambda: self._my_turn(keyword, resource))
+            self._waiting[resource].remove(keyword)
+            self._busy[resource] = self._busy.get(resource, 0) + 1
+
+        turn = Turn(keyword, resource)
+        try:
+            yield turn
+        finally:
+            with self._cond:
+                self._busy[resource] -= 1
+                spent = self.spent.setdefault(resource, {})
+                spent[keyword] = spent.get(keyword, 0) + turn.calls
+                self._cond.notify_all()
+
+    # ──────────────────────────────────────────
+    # پیشرفت
+    # ──────────────────────────────────────────
+
+    def progress(self, keyword: str, found: int, scanned: int) -> None:
+        """به‌روزرسانی وزن کلیدواژه و لاگ پیشرفت/سرعت"""
+        with self._cond:
+            self.found[keyword] = found
+            self.scanned[keyword] = scanned
+            minutes = max(time.monotonic() - self._started[keyword], 1e-6) / 60
+            calls = {
+                res: spent[keyword]
+                for res, spent in self.spent.items() if spent.get(keyword)
+            }
+            # تغییر وزن ممکن است نوبت را به کلیدواژه دیگری بدهد
+            self._cond.notify_all()
+
+        log.info(
+            f"   📈 «{keyword}»: {found}/{self.targets[keyword]} | "
+            f"اسکن {scanned} ({scanned / minutes:.1f}/دقیقه) | "
+            f"قبول {found / minutes:.1f}/دقیقه | "
+            f"درخواست‌ها: {' '.join(f'{r}={n}' for r, n in calls.items()) or '-'}"
+        )
+
+    def summary(self) -> None:
+        """سهم هر کلیدواژه از هر منبع در پایان کرول"""
+        for resource, spent in sorted(self.spent.items()):
+            total = sum(spent.values()) or 1
+            shares = " | ".join(
+                f"{kw}={n} ({n / total:.0%})" for kw, n in spent.items()
+            )
+            log.info(f"   ⚖️ سهم {resource}: {shares}")
@@ -0,0 +1,81 @@
+"""
+بودجه سهمیه به تفکیک منبع GitHub (core / search / graphql / ...)
+هر پاسخ با هدر X-RateLimit-Resource مشخص می‌کند از کدام سهمیه کم شده
+"""
+
+from __future__ import annotations
+
+# سقف پیش‌فرض هر منبع تا رسیدن اولین هدر
+DEFAULT_LIMITS: dict[str, int] = {
+    "core": 5000,
+    "search": 30,
+    "code_search": 10,
+    "graphql": 5000,
+}
+
+# طول پنجره بازنشانی هر منبع (ثانیه)
+RESET_WINDOWS: dict[str, int] = {
+    "core": 3600,
+    "search": 60,
+    "code_search": 60,
+    "graphql": 3600,
+}
+
+# وقتی سهمیه باقی‌مانده زیر این سهم از سقف باشد، درخواست‌ها یکنواخت پخش می‌شوند
+# search همیشه یکنواخت پخش می‌شود تا به secondary limit نخورد
+PACING_THRESHOLDS: dict[str, float] = {
+    "core": 0.2,
+    "search": 1.0,
+    "code_search": 1.0,
+    "graphql": 0.2,
+}
+
+
+def resource_for(url: str, is_search: bool = False) -> str:
+    """حدس منبع سهمیه از مسیر درخواست (قبل از دریافت هدر)"""
+    if "/search/code" in url:
+        return "code_search"
+    if is_search or "/search/" in url:
+        return "search"
+    if url.rstrip("/").endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class RateBudget:
+    """شمارنده‌های یک منبع برای یک توکن"""
+
+    def __init__(self, resource: str):
+        self.resource = resource
+        self.limit: int = DEFAULT_LIMITS.get(resource, 5000)
+        self.remaining: int = self.limit
+        self.used: int = 0
+        self.reset: float = 0
+
+    def available(self, now: float) -> int:
+        """سهمیه قابل استفاده — بعد از reset، کل سقف برمی‌گردد"""
+        if self.reset and now >= self.reset:
+            return self.limit
+        return self.remaining
+
+    def consume(self, now: float) -> None:
+        """کسر خوش‌بینانه قبل از ارسال (تا رسیدن هدر واقعی)"""
+        if self.reset and now >= self.reset:
+            self.remaining = self.limit
+            self.used = 0
+            self.reset = 0
+        self.remaining -= 1
+        self.used += 1
+
+    def update_from_headers(self, headers: dict) -> None:
+        self.remaining = int(headers["X-RateLimit-Remaining"])
+        self.limit = int(headers.get("X-RateLimit-Limit", self.limit))
+        self.used = int(headers.get("X-RateLimit-Used", self.limit - self.remaining))
+        self.reset = float(headers.get("X-RateLimit-Reset", self.reset))
+
+    def update(self, info: dict) -> None:
+        """به‌روزرسانی از بدنه /rate_limit"""
+        self.remaining = info.get("remaining", self.remaining)
+        self.limit = info.get("limit", self.limit)
+        self.used = info.get("used", self.used)
+        self.reset = info.get("reset", self.reset)
@@ -2,10 +2,19 @@
 مدیریت محدودیت نرخ API گیت‌هاب
 """
 
+import asyncio
+import codecs
+import math
+import threading
 import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -13,7 +22,19 @@ from tenacity import (
     retry_if_exception_type,
 )
 
-from config.settings import GITHUB_HEADERS, GITHUB_API_BASE
+from config.settings import (
+    GITHUB_HEADERS,
+    GITHUB_API_BASE,
+    GITHUB_MAX_CONCURRENCY,
+    GITHUB_TOKENS,
+    HTTP_CACHE_ENABLED,
+    RAW_DOWNLOAD_MAX_KB,
+)
+from core.pacer import pacer
+from core.rate_budget import resource_for
+from core.response_cache import ResponseCache
+from core.token_pool import PooledToken, TokenPool
+from utils.helpers import git_blob_sha
 from utils.logger import log
 
 
@@ -24,62 +45,163 @@ class RateLimitExceeded(Exception):
 class GitHubRateLimiter:
     """مدیریت هوشمند Rate Limit"""
 
-    def __init__(self):
-        self.remaining: int = 5000
-        self.limit: int = 5000
-        self.reset_time: float = 0
-        self.search_remaining: int = 30
-        self.search_reset_time: float = 0
+    def __init__(
+        self,
+        cache: ResponseCache | None = None,
+        tokens: list[str] | None = None,
+    ):
+        self.pool = TokenPool(tokens if tokens is not None else GITHUB_TOKENS)
         self._session = requests.Session()
         self._session.headers.update(GITHUB_HEADERS)
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=GITHUB_MAX_CONCURRENCY,
+            pool_maxsize=GITHUB_MAX_CONCURRENCY,
+        ))
+        self._lock = threading.Lock()
+        self.cache = cache or (ResponseCache() if HTTP_CACHE_ENABLED else None)
+
+        # سقف درخواست‌های هم‌زمان async — مشترک بین همه event loopها و threadها
+        # (کلیدواژه‌های هم‌زمان هر کدام asyncio.run جداگانه دارند)
+        self._gate = threading.Condition()
+        self._in_flight: int = 0
+
+        # مجموع امتیاز مصرف‌شده GraphQL در این اجرا (از فیلد rateLimit)
+        self.graphql_points: int = 0
+
+    # ── مقادیر تجمیعی استخر (سازگار با نسخه تک‌توکنی) ──
+
+    @property
+    def remaining(self) -> int:
+        return self.pool.total_remaining("core")
 
-    def update_from_headers(self, headers: dict) -> None:
-        self.remaining = int(headers.get("X-RateLimit-Remaining", self.remaining))
-        self.limit = int(headers.get("X-RateLimit-Limit", self.limit))
-        self.reset_time = float(headers.get("X-RateLimit-Reset", self.reset_time))
+    @property
+    def limit(self) -> int:
+        return self.pool.total_limit("core")
 
-    def wait_if_needed(self, is_search: bool = False) -> None:
-        """صبر هوشمند تا بازنشانی سهمیه"""
-        threshold = 5 if is_search else 10
-        remaining = self.search_remaining if is_search else self.remaining
-        reset = self.search_reset_time if is_search else self.reset_time
+    @property
+    def reset_time(self) -> float:
+        return self.pool.next_reset("core")
 
-        if remaining > threshold:
+    @property
+    def search_remaining(self) -> int:
+        return self.pool.total_remaining("search")
+
+    @property
+    def search_reset_time(self) -> float:
+        return self.pool.next_reset("search")
+
+    def update_from_headers(
+        self,
+        headers: dict,
+        token: PooledToken | None = None,
+        resource: str = "core",
+    ) -> None:
+        """
+        هدر X-RateLimit-Resource تعیین می‌کند کدام بودجه به‌روز شود
+        (resource فقط وقتی استفاده می‌شود که هدر نباشد)
+        """
+        token = token or self.pool.tokens[0]
+        if self.pool.update_from_headers(token, headers):
             return
+        if "X-RateLimit-Remaining" in headers:
+            tagged = CaseInsensitiveDict(headers)
+            tagged["X-RateLimit-Resource"] = resource
+            self.pool.update_from_headers(token, tagged)
 
+    def budget(self, resource: str) -> dict:
+        """وضعیت تجمیعی یک منبع روی همه توکن‌ها"""
+        return {
+            "remaining": self.pool.total_remaining(resource),
+            "limit": self.pool.total_limit(resource),
+            "reset": self.pool.next_reset(resource),
+        }
+
+    def pace(self, resource: str) -> None:
+        """تنظیم و برداشت از سطل pacer مخصوص این منبع"""
+        b = self.budget(resource)
+        pacer.retune(resource, b["remaining"], b["limit"], b["reset"])
+        pacer.acquire(f"github_{resource}")
+
+    def concurrency_limit(self) -> int:
+        """
+        سقف درخواست‌های هم‌زمان بر اساس سهمیه زنده
+        سهمیه باقی‌مانده بر زمان تا بازنشانی تقسیم می‌شود تا
+        درخواست‌های موازی، سهمیه را قبل از reset تمام نکنند
+        """
         now = time.time()
-        wait_seconds = max(0, reset - now) + 5
+        remaining = self.remaining
+        if self.reset_time and now >= self.reset_time:
+            remaining = self.limit  # پنجره جدید شروع شده
+
+        budget = remaining - 10
+        if budget <= 0:
+            return 1
 
-        if wait_seconds > 0:
+        window = max(1.0, self.reset_time - now) if self.reset_time > now else 3600.0
+        per_minute = math.ceil(budget / window * 60)
+        return max(1, min(GITHUB_MAX_CONCURRENCY, budget // 2, per_minute))
+
+    def wait_if_needed(
+        self,
+        is_search: bool = False,
+        resource: str | None = None,
+        prefer: PooledToken | None = None,
+    ) -> PooledToken:
+        """
+        انتخاب توکن با بیشترین سهمیه (یا prefer اگر هنوز سهمیه دارد)
+        فقط وقتی همه توکن‌ها تمام شده باشند تا اولین بازنشانی صبر می‌کند
+        """
+        resource = resource or ("search" if is_search else "core")
+        threshold = 10 if resource == "core" else 5
+
+        while True:
+            token = self.pool.acquire(resource, reserve=threshold, prefer=prefer)
+            if token is not None:
+                return token
+
+            reset = self.pool.next_reset(resource)
+            wait_seconds = max(0, reset - time.time()) + 5
             reset_dt = datetime.fromtimestamp(
                 reset, tz=timezone.utc
             ).strftime("%H:%M:%S UTC")
-            kind = "Search" if is_search else "Core"
             log.warning(
-                f"⏳ {kind} Rate Limit: remaining={remaining} | "
+                f"⏳ {resource} Rate Limit: همه {len(self.pool.tokens)} توکن تمام شده | "
                 f"صبر {wait_seconds:.0f}s تا {reset_dt}"
             )
             time.sleep(wait_seconds)
 
     def check_rate_limit(self) -> dict:
-        """بررسی وضعیت فعلی"""
-        resp = self._session.get(f"{GITHUB_API_BASE}/rate_limit")
-        if resp.status_code == 200:
-            data = resp.json()
-            core = data.get("resources", {}).get("core", {})
-            search = data.get("resources", {}).get("search", {})
+        """بررسی وضعیت فعلی همه توکن‌های استخر"""
+        first: dict = {}
+        for token in self.pool.tokens:
+            resp = self._session.get(
+                f"{GITHUB_API_BASE}/rate_limit",
+                headers=self._auth_headers(token),
+            )
+            if resp.status_code != 200:
+                log.warning(f"⚠️ Rate Limit توکن {token.label}: {resp.status_code}")
+                continue
 
-            self.remaining = core.get("remaining", self.remaining)
-            self.search_remaining = search.get("remaining", self.search_remaining)
-            self.reset_time = core.get("reset", self.reset_time)
-            self.search_reset_time = search.get("reset", self.search_reset_time)
+            data = resp.json()
+            resources = data.get("resources", {})
+            for resource, info in resources.items():
+                self.pool.update(token, resource, info)
 
+            core = resources.get("core", {})
+            search = resources.get("search", {})
+            graphql = resources.get("graphql", {})
             log.info(
-                f"📊 Rate Limit — Core: {core.get('remaining')}/{core.get('limit')} | "
-                f"Search: {search.get('remaining')}/{search.get('limit')}"
+                f"📊 Rate Limit ({token.label}) — "
+                f"Core: {core.get('remaining')}/{core.get('limit')} | "
+                f"Search: {search.get('remaining')}/{search.get('limit')} | "
+                f"GraphQL: {graphql.get('remaining')}/{graphql.get('limit')}"
             )
-            return data
-        return {}
+            first = first or data
+        return first
+
+    @staticmethod
+    def _auth_headers(token: PooledToken) -> dict:
+        return {"Authorization": f"Bearer {token.token}"} if token.token else {}
 
     @retry(
         stop=stop_after_attempt(5),
@@ -99,24 +221,74 @@ class GitHubRateLimiter:
     ) -> requests.Response:
         """ارسال درخواست با مدیریت Rate Limit"""
 
-        self.wait_if_needed(is_search=is_search)
-
         full_url = url if url.startswith("http") else f"{GITHUB_API_BASE}{url}"
 
-        response = self._session.request(
-            method=method, url=full_url,
-            params=params, json=json_data, timeout=30,
+        resource = resource_for(full_url, is_search=is_search)
+
+        # ── درخواست شرطی از کش ──
+        # ETag به توکن وابسته است — توکنی که مدخل را ذخیره کرده ترجیح دارد،
+        # وگرنه با چرخش استخر، 304 فقط در یکی از N درخواست ممکن بود
+        cache_key = None
+        cached = None
+        owner = None
+        if self.cache and method == "GET":
+            keys = {
+                self.cache.make_key(full_url, params, scope=t.scope): t
+                for t in self.pool.tokens
+            }
+            found = self.cache.lookup_any(list(keys))
+            if found:
+                cache_key, cached = found
+                owner = keys[cache_key]
+
+        token = self.wait_if_needed(resource=resource, prefer=owner)
+        self.pace(resource)
+
+        headers = self._auth_headers(token)
+        if self.cache and method == "GET":
+            if token is not owner:
+                cache_key = self.cache.make_key(full_url, params, scope=token.scope)
+                # مدخل این توکن فقط وقتی ممکن است که صاحب تازه‌ترین مدخل سهمیه نداشت
+                cached = self.cache.lookup(cache_key) if owner else None
+            if cached:
+                headers.update(self.cache.conditional_headers(cached))
+
+        started = time.monotonic()
+        try:
+            response = self._session.request(
+                method=method, url=full_url,
+                params=params, json=json_data, timeout=30,
+                headers=headers or None,
+            )
+        except requests.ConnectionError:
+            pacer.observe(f"github_{resource}", time.monotonic() - started, 599)
+            raise
+
+        self.update_from_headers(response.headers, token, resource)
+        throttled = response.status_code == 403 and "Retry-After" in response.headers
+        pacer.observe(
+            f"github_{resource}",
+            time.monotonic() - started,
+            429 if throttled else response.status_code,
         )
 
-        self.update_from_headers(response.headers)
+        if cache_key:
+            if cached and response.status_code == 304:
+                return self.cache.build_response(cache_key, cached, response)
+            self.cache.record_miss()
+            if response.status_code == 200:
+                self.cache.store(cache_key, response)
 
         if response.status_code == 403:
             retry_after = response.headers.get("Retry-After")
             if retry_after:
                 time.sleep(int(retry_after) + 1)
                 raise RateLimitExceeded("Secondary rate limit")
-            if self.remaining == 0:
-                raise RateLimitExceeded("Primary rate limit exceeded")
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                # تلاش بعدی به توکن دیگری می‌رود
+                raise RateLimitExceeded(
+                    f"Primary rate limit exceeded ({token.label})"
+                )
 
         if response.status_code == 429:
             raise RateLimitExceeded("Too many requests")
@@ -126,4 +298,284 @@ class GitHubRateLimiter:
     def get(
         self, url: str, params: dict | None = None, is_search: bool = False
     ) -> requests.Response:
-        return self.request("GET", url, params=params, is_search=is_search)
\ No newline at end of file
+        return self.request("GET", url, params=params, is_search=is_search)
+
+    def graphql(self, query: str, variables: dict | None = None) -> dict:
+        """
+        ارسال کوئری GraphQL (سهمیه جدای graphql)
+        خروجی: بدنه JSON شامل data و در صورت وجود errors
+        """
+        resp = self.request(
+            "POST", "/graphql",
+            json_data={"query": query, "variables": variables or {}},
+        )
+        if resp.status_code != 200:
+            log.warning(f"⚠️ GraphQL: {resp.status_code} — {resp.text[:200]}")
+            return {"errors": [{"message": f"HTTP {resp.status_code}"}]}
+
+        body = resp.json()
+        rate = (body.get("data") or {}).get("rateLimit")
+        if rate:
+            with self._lock:
+                self.graphql_points += rate.get("cost", 0)
+            log.debug(
+                f"🔷 GraphQL: هزینه={rate.get('cost')} | "
+                f"باقی‌مانده={rate.get('remaining')}/{rate.get('limit')}"
+            )
+        return body
+
+    # ──────────────────────────────────────────
+    # دانلود جریانی
+    # ──────────────────────────────────────────
+
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=2, min=4, max=120),
+        retry=retry_if_exception_type((requests.ConnectionError, RateLimitExceeded)),
+        before_sleep=lambda rs: log.warning(
+            f"🔄 تلاش مجدد ({rs.attempt_number}/5)..."
+        ),
+    )
+    def _open_stream(
+        self, url: str, params: dict | None, accept: str | None
+    ) -> requests.Response:
+        full_url = url if url.startswith("http") else f"{GITHUB_API_BASE}{url}"
+        resource = resource_for(full_url)
+        token = self.wait_if_needed(resource=resource)
+        self.pace(resource)
+
+        headers = self._auth_headers(token)
+        if accept:
+            headers["Accept"] = accept
+
+        started = time.monotonic()
+        try:
+            response = self._session.request(
+                method="GET", url=full_url, params=params, timeout=30,
+                headers=headers or None, stream=True,
+            )
+        except requests.ConnectionError:
+            pacer.observe(f"github_{resource}", time.monotonic() - started, 599)
+            raise
+
+        # بعد از ریدایرکت (مثلاً به codeload) هدرهای سهمیه در پاسخ اول‌اند
+        api_response = response.history[0] if response.history else response
+        self.update_from_headers(api_response.headers, token, resource)
+        pacer.observe(
+            f"github_{resource}", time.monotonic() - started,
+            api_response.status_code,
+        )
+
+        if response.status_code in (403, 429) and (
+            "Retry-After" in response.headers
+            or response.headers.get("X-RateLimit-Remaining") == "0"
+            or response.status_code == 429
+        ):
+            response.close()
+            raise RateLimitExceeded(f"Stream rate limited ({token.label})")
+
+        return response
+
+    @contextmanager
+    def stream(
+        self, url: str, params: dict | None = None, accept: str | None = None
+    ) -> Iterator[requests.Response]:
+        """
+        GET جریانی — بدنه در حافظه نگه داشته نمی‌شود و از کش عبور نمی‌کند
+        خروجی پاسخ با stream=True است؛ اتصال در پایان بلوک بسته می‌شود
+        """
+        response = self._open_stream(url, params, accept)
+        try:
+            yield response
+        finally:
+            response.close()
+
+    def download_raw(
+        self,
+        url: str,
+        params: dict | None = None,
+        max_bytes: int = RAW_DOWNLOAD_MAX_KB * 1024,
+        truncate: bool = False,
+    ) -> tuple[str, int, str] | None:
+        """
+        دریافت محتوای خام یک فایل (application/vnd.github.raw) به جای JSON base64
+        بدنه تکه‌تکه خوانده و هم‌زمان دیکد می‌شود؛ با عبور از max_bytes قطع می‌شود
+        خروجی: (متن، اندازه بایت، sha بلاب گیت) — None اگر نبود یا از سقف گذشت
+        truncate: به جای None، max_bytes اول برمی‌گردد (sha خالی — بلاب کامل نیست)
+        """
+        with self.stream(url, params, accept="application/vnd.github.raw") as resp:
+            if resp.status_code != 200:
+                return None
+
+            # با gzip، Content-Length اندازه فشرده است — فقط بدون آن قابل اتکاست
+            declared = resp.headers.get("Content-Length")
+            if (
+                not truncate
+                and declared
+                and "Content-Encoding" not in resp.headers
+                and int(declared) > max_bytes
+            ):
+                log.debug(f"   ⚠️ فایل بزرگ‌تر از سقف ({declared}B): {url}")
+                return None
+
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            raw = bytearray()
+            parts: list[str] = []
+            truncated = False
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                if len(raw) + len(chunk) > max_bytes:
+                    if not truncate:
+                        log.debug(f"   ⚠️ دانلود از سقف {max_bytes}B گذشت: {url}")
+                        return None
+                    chunk = chunk[: max_bytes - len(raw)]
+                    truncated = True
+                raw += chunk
+                parts.append(decoder.decode(chunk))
+                if truncated:
+                    break
+            if not truncated:
+                # بایت‌های نیمه‌کاره انتهای بدنه کوتاه‌شده دور ریخته می‌شوند
+                parts.append(decoder.decode(b"", final=True))
+
+        if truncated:
+            log.debug(f"   ✂️ کوتاه شد به {max_bytes}B: {url}")
+            return "".join(parts), len(raw), ""
+        return "".join(parts), len(raw), git_blob_sha(raw)
+
+    # ──────────────────────────────────────────
+    # صفحه‌بندی با هدر Link
+    # ──────────────────────────────────────────
+
+    def paginate_pages(
+        self,
+        url: str,
+        params: dict | None = None,
+        max_items: int | None = None,
+        prefetch: bool = False,
+        per_page: int = 100,
+        is_search: bool = False,
+    ) -> Iterator[list[dict]]:
+        """
+        پیمایش صفحات با دنبال کردن Link: rel="next"
+        max_items: بعد از این تعداد آیتم صفحه جدیدی درخواست نمی‌شود
+        prefetch: صفحه بعد در پس‌زمینه دریافت می‌شود تا پردازش صفحه فعلی تمام شود
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        pending: Future | None = None
+        fetched = 0
+
+        try:
+            resp = self.get(
+                url, params={**(params or {}), "per_page": per_page},
+                is_search=is_search,
+            )
+            while resp.status_code == 200:
+                data = resp.json()
+                items = data.get("items", []) if isinstance(data, dict) else data
+                if not items:
+                    return
+                fetched += len(items)
+
+                next_url = resp.links.get("next", {}).get("url")
+                if max_items is not None and fetched >= max_items:
+                    next_url = None
+                if next_url and executor:
+                    pending = executor.submit(self.get, next_url, None, is_search)
+
+                yield items
+
+                if not next_url:
+                    return
+                if pending is not None:
+                    resp, pending = pending.result(), None
+                else:
+                    resp = self.get(next_url, is_search=is_search)
+
+            if resp.status_code != 200:
+                log.debug(f"   ⚠️ صفحه‌بندی متوقف شد: {resp.status_code} — {url}")
+        finally:
+            if pending is not None:
+                pending.cancel()
+            if executor:
+                executor.shutdown(wait=False)
+
+    def paginate(
+        self,
+        url: str,
+        params: dict | None = None,
+        limit: int | None = None,
+        prefetch: bool = False,
+        per_page: int = 100,
+        is_search: bool = False,
+    ) -> Iterator[dict]:
+        """نسخه آیتم‌به‌آیتم paginate_pages — با limit تمیز متوقف می‌شود"""
+        if limit is not None and limit <= 0:
+            return
+        count = 0
+        for items in self.paginate_pages(
+            url, params, max_items=limit, prefetch=prefetch,
+            per_page=per_page, is_search=is_search,
+        ):
+            for item in items:
+                yield item
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+    # ──────────────────────────────────────────
+    # موتور async
+    # ──────────────────────────────────────────
+
+    def _slotted_request(self, *args) -> requests.Response:
+        """request داخل یک جایگاه از سقف هم‌زمانی (در thread اجرا می‌شود)"""
+        with self._gate:
+            self._gate.wait_for(
+                lambda: self._in_flight < self.concurrency_limit()
+            )
+            self._in_flight += 1
+        try:
+            return self.request(*args)
+        finally:
+            with self._gate:
+                self._in_flight -= 1
+                self._gate.notify_all()
+
+    async def arequest(
+        self,
+        method: str,
+        url: str,
+        params: dict | None = None,
+        json_data: dict | None = None,
+        is_search: bool = False,
+    ) -> requests.Response:
+        """نسخه async از request — هم‌زمانی محدود به سهمیه باقی‌مانده"""
+        return await asyncio.to_thread(
+            self._slotted_request, method, url, params, json_data, is_search
+        )
+
+    async def aget(
+        self, url: str, params: dict | None = None, is_search: bool = False
+    ) -> requests.Response:
+        return await self.arequest("GET", url, params=params, is_search=is_search)
+
+    async def agather(
+        self, calls: list[tuple[str, dict | None]]
+    ) -> list[requests.Response]:
+        """اجرای هم‌زمان چند GET — ترتیب خروجی مطابق ورودی"""
+        return list(await asyncio.gather(
+            *(self.aget(url, params=params) for url, params in calls)
+        ))
+
+    def get_many(
+        self, calls: list[tuple[str, dict | None]]
+    ) -> list[requests.Response]:
+        """
+        اجرای هم‌زمان چند GET از کد همگام
+        (نباید از داخل یک event loop در حال اجرا صدا زده شود)
+        """
+        if not calls:
+            return []
+        if len(calls) == 1:
+            url, params = calls[0]
+            return [self.get(url, params=params)]
+        return asyncio.run(self.agather(calls))
\ No newline at end of file
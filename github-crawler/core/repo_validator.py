@@ -6,6 +6,7 @@
 
 from __future__ import annotations
 
+import threading
 import time
 
 from config.settings import (
@@ -13,11 +14,61 @@ from config.settings import (
     MIN_PRS_REQUIRED,
     MIN_CODE_FILES_REQUIRED,
     CODE_EXTENSIONS,
+    VALIDATION_MODE,
+    GRAPHQL_VALIDATION_BATCH,
+    RAW_DOWNLOAD_MAX_KB,
 )
+from core.artifact_cache import ArtifactCache
 from core.rate_limiter import GitHubRateLimiter
-from models.repository import RepositoryInfo, ValidationResult
+from models.repository import RepositoryDB, RepositoryInfo, ValidationResult
+from utils.helpers import decode_base64_content
 from utils.logger import log
 
+# فیلدهای هر مخزن در کوئری دسته‌ای — درخت تا دو سطح
+# نام‌های رایج README در ریشه — متن بلاب همراه اعتبارسنجی گرفته می‌شود
+# تا استخراج دوباره /readme را دانلود نکند (GraphQL جستجوی الگو ندارد)
+_README_NAMES = ("README.md", "README.rst", "README.txt", "README", "readme.md")
+
+_README_FIELDS = "".join(
+    f"""
+    readme{i}: object(expression: "HEAD:{name}") {{
+      ... on Blob {{ text byteSize oid isTruncated }}
+    }}"""
+    for i, name in enumerate(_README_NAMES)
+)
+
+_REPO_FIELDS = _README_FIELDS + """
+    issues { totalCount }
+    pullRequests { totalCount }
+    object(expression: "HEAD:") {
+      ... on Tree {
+        entries {
+          name
+          type
+          object {
+            ... on Blob { byteSize }
+            ... on Tree {
+              entries { name type object { ... on Blob { byteSize } } }
+            }
+          }
+        }
+      }
+    }
+"""
+
+# بررسی‌های REST و هزینه اولیه هر کدام (ثانیه) تا وقتی زمان واقعی
+# اندازه‌گیری نشده — درخت بازگشتی گران‌ترین است
+_DEFAULT_CHECK_COSTS: dict[str, float] = {
+    "readme": 0.3,
+    "issues": 0.5,
+    "prs": 0.4,
+    "code": 1.5,
+}
+
+
+def _cancelled(cancel: threading.Event | None) -> bool:
+    return cancel is not None and cancel.is_set()
+
 
 class RepoValidator:
     """
@@ -25,48 +76,303 @@ class RepoValidator:
     فقط HEAD request یا حداقل API call برای بررسی وجود داده
     """
 
-    def __init__(self, rate_limiter: GitHubRateLimiter | None = None):
+    def __init__(
+        self,
+        rate_limiter: GitHubRateLimiter | None = None,
+        mode: str = VALIDATION_MODE,
+        db: RepositoryDB | None = None,
+        artifacts: ArtifactCache | None = None,
+    ):
         self.api = rate_limiter or GitHubRateLimiter()
+        self.mode = mode
+        self.db = db or RepositoryDB()
+        # README و درخت دریافت‌شده اینجا در استخراج دوباره دریافت نمی‌شوند
+        self.artifacts = artifacts or ArtifactCache()
+
+        # آمار خروج زودهنگام (تا flush_stats در حافظه)
+        self._stats_lock = threading.Lock()
+        self._observed: dict[str, tuple[int, int, float]] = {}
+        self._savings = {"validations": 0, "early_exits": 0, "calls": 0, "seconds": 0.0}
+        self._costs: dict[str, float] = dict(_DEFAULT_CHECK_COSTS)
+        self.check_order: list[str] = list(_DEFAULT_CHECK_COSTS)
+        self.refresh_check_order()
+
+    @property
+    def batch_size(self) -> int:
+        """تعداد مخزنی که در یک نوبت اعتبارسنجی می‌شود"""
+        return GRAPHQL_VALIDATION_BATCH if self.mode == "graphql" else 1
+
+    @property
+    def calls_per_repo(self) -> float:
+        """تخمین درخواست API برای اعتبارسنجی یک مخزن"""
+        # REST: README + Issues + PRs + Tree
+        return 1 / self.batch_size if self.mode == "graphql" else 4
 
-    def validate(self, repo: RepositoryInfo) -> ValidationResult:
+    def validate(
+        self, repo: RepositoryInfo, early_exit: bool = True
+    ) -> ValidationResult:
         """
-        بررسی اینکه مخزن تمام شرایط داده آموزشی را دارد:
-        ✅ README موجود
-        ✅ حداقل N عدد Issue (غیر PR)
-        ✅ حداقل N عدد Pull Request
-        ✅ حداقل N فایل کد با پسوند مجاز
+        اعتبارسنجی یک مخزن با حالت تنظیم‌شده
+        early_exit=False: همه بررسی‌ها اجرا می‌شوند (برای گزارش کامل)
+        """
+        if self.mode == "graphql":
+            return self.validate_many([repo])[0]
+        return self._validate_rest(repo, early_exit=early_exit)
+
+    def validate_many(
+        self,
+        repos: list[RepositoryInfo],
+        cancel: threading.Event | None = None,
+    ) -> list[ValidationResult | None]:
         """
+        اعتبارسنجی دسته‌ای — در حالت graphql همه مخازن با یک کوئری
+        (هر مخزن با یک alias) بررسی می‌شوند
+        با set شدن cancel، مخازن بررسی‌نشده None برمی‌گردند
+        """
+        if self.mode != "graphql" or not repos:
+            return [self._validate_rest(repo, cancel) for repo in repos]
+        if _cancelled(cancel):
+            return [None] * len(repos)
+
+        aliases = []
+        variables = {}
+        declared = []
+        for i, repo in enumerate(repos):
+            aliases.append(
+                f"r{i}: repository(owner: $o{i}, name: $n{i}) {{{_REPO_FIELDS}}}"
+            )
+            declared.append(f"$o{i}: String!, $n{i}: String!")
+            variables[f"o{i}"] = repo.owner
+            variables[f"n{i}"] = repo.name
+
+        query = f"query({', '.join(declared)}) {{\n" + "\n".join(aliases) + "\n}"
+        body = self.api.graphql(query, variables)
+        data = body.get("data")
+
+        if not data:
+            errors = body.get("errors", [])
+            log.warning(
+                f"   ⚠️ GraphQL ناموفق ({errors[:1]}) — بازگشت به REST"
+            )
+            return [self._validate_rest(repo, cancel) for repo in repos]
+
+        return [
+            self._result_from_graphql(repo, data.get(f"r{i}"))
+            for i, repo in enumerate(repos)
+        ]
+
+    def _result_from_graphql(
+        self, repo: RepositoryInfo, node: dict | None
+    ) -> ValidationResult:
+        """ساخت ValidationResult از پاسخ GraphQL یک مخزن"""
         result = ValidationResult(full_name=repo.full_name)
+        if node is None:
+            result.rejection_reasons.append("❌ مخزن در GraphQL یافت نشد")
+            return result
 
-        log.debug(f"   🔎 اعتبارسنجی: {repo.full_name}")
+        entries = (node.get("object") or {}).get("entries") or []
+        result.has_readme = self._tree_has_readme(entries)
+        readme = self._readme_from_graphql(node)
+        if readme is not None:
+            self.artifacts.put(repo.full_name, "readme", repo.default_branch, readme)
+        result.issue_count = node.get("issues", {}).get("totalCount", 0)
+        result.pr_count = node.get("pullRequests", {}).get("totalCount", 0)
+        result.code_file_count = self._count_tree_code_files(entries)
+        if (
+            result.code_file_count < MIN_CODE_FILES_REQUIRED
+            and self._tree_has_deeper_levels(entries)
+        ):
+            # کد ممکن است پایین‌تر باشد (src/<pkg>/...) — شمارش کامل با درخت بازگشتی REST
+            result.code_file_count = self._count_code_files(repo)
+        return self._judge(result)
+
+    @staticmethod
+    def _readme_from_graphql(node: dict) -> dict | None:
+        """
+        آرتیفکت README به همان شکل _fetch_readme (برای DataExtractor)
+        بزرگ‌تر از سقف دانلود خام، باینری یا کوتاه‌شده → بدون محتوا
+        README در docs/ یا .github/ اینجا دیده نمی‌شود — استخراج خودش می‌گیرد
+        """
+        for i, name in enumerate(_README_NAMES):
+            blob = node.get(f"readme{i}")
+            if not blob or "oid" not in blob:
+                continue
+            content = blob.get("text")
+            if (
+                blob.get("isTruncated")
+                or blob.get("byteSize", 0) > RAW_DOWNLOAD_MAX_KB * 1024
+            ):
+                content = None
+            return {
+                "content": content,
+                "size": blob.get("byteSize", 0),
+                "sha": blob.get("oid", ""),
+                "name": name,
+                "path": name,
+            }
+        return None
+
+    @staticmethod
+    def _tree_has_readme(entries: list[dict]) -> bool:
+        """README در ریشه یا در docs/ و .github/ (همان جاهایی که /readme می‌گردد)"""
+        for entry in entries:
+            name = entry.get("name", "").lower()
+            if entry.get("type") == "blob" and name.startswith("readme"):
+                return True
+            if entry.get("type") == "tree" and name in ("docs", ".github"):
+                sub = (entry.get("object") or {}).get("entries") or []
+                if any(
+                    e.get("type") == "blob" and e.get("name", "").lower().startswith("readme")
+                    for e in sub
+                ):
+                    return True
+        return False
+
+    @staticmethod
+    def _count_tree_code_files(entries: list[dict], depth: int = 0) -> int:
+        """شمارش فایل‌های کد در دو سطح اول درخت"""
+        count = 0
+        for entry in entries:
+            obj = entry.get("object") or {}
+            if entry.get("type") == "blob":
+                if (
+                    any(entry.get("name", "").endswith(ext) for ext in CODE_EXTENSIONS)
+                    and obj.get("byteSize", 0) <= 100_000
+                ):
+                    count += 1
+            elif entry.get("type") == "tree" and depth == 0:
+                count += RepoValidator._count_tree_code_files(
+                    obj.get("entries") or [], depth=1
+                )
+        return count
+
+    @staticmethod
+    def _tree_has_deeper_levels(entries: list[dict]) -> bool:
+        """آیا زیرپوشه‌ای در سطح دوم هست که کوئری GraphQL محتوایش را ندیده؟"""
+        return any(
+            sub.get("type") == "tree"
+            for entry in entries
+            if entry.get("type") == "tree"
+            for sub in (entry.get("object") or {}).get("entries") or []
+        )
 
-        # ── ۱. بررسی README ──
-        result.has_readme = self._check_readme(repo)
+    @staticmethod
+    def _judge(result: ValidationResult) -> ValidationResult:
+        """اعمال آستانه‌ها روی شمارش‌ها"""
         if not result.has_readme:
             result.rejection_reasons.append("❌ README ندارد")
-            result.is_valid = False
-            return result
-
-        # ── ۲. بررسی Issues ──
-        result.issue_count = self._count_issues(repo)
         if result.issue_count < MIN_ISSUES_REQUIRED:
             result.rejection_reasons.append(
                 f"❌ Issues ناکافی: {result.issue_count}/{MIN_ISSUES_REQUIRED}"
             )
-
-        # ── ۳. بررسی Pull Requests ──
-        result.pr_count = self._count_pull_requests(repo)
         if result.pr_count < MIN_PRS_REQUIRED:
             result.rejection_reasons.append(
                 f"❌ PRs ناکافی: {result.pr_count}/{MIN_PRS_REQUIRED}"
             )
-
-        # ── ۴. بررسی فایل‌های کد ──
-        result.code_file_count = self._count_code_files(repo)
         if result.code_file_count < MIN_CODE_FILES_REQUIRED:
             result.rejection_reasons.append(
                 f"❌ Code files ناکافی: {result.code_file_count}/{MIN_CODE_FILES_REQUIRED}"
             )
+        result.is_valid = len(result.rejection_reasons) == 0
+        return result
+
+    # ──────────────────────────────────────────
+    # ترتیب بررسی‌ها (هزینه × احتمال رد)
+    # ──────────────────────────────────────────
+
+    def refresh_check_order(self) -> None:
+        """
+        مرتب‌سازی بررسی‌ها بر اساس هزینه / احتمال رد (کمترین اول)
+        هر دو از اجراهای ثبت‌شده خود بررسی: میانگین زمان و fails/runs
+        """
+        stats = self.db.get_check_stats()
+        for name, s in stats.items():
+            if name in self._costs:
+                self._costs[name] = s["cost"]
+
+        def rank(name: str) -> float:
+            s = stats.get(name, {})
+            # هموارسازی لاپلاس — بررسی بی‌سابقه احتمال ½ می‌گیرد
+            p_fail = (s.get("fails", 0) + 1) / (s.get("outcomes", 0) + 2)
+            return self._costs[name] / p_fail
+
+        self.check_order = sorted(_DEFAULT_CHECK_COSTS, key=rank)
+        log.debug(f"   🧮 ترتیب بررسی‌ها: {' → '.join(self.check_order)}")
+
+    def _observe(self, name: str, passed: bool, seconds: float) -> None:
+        with self._stats_lock:
+            runs, fails, total = self._observed.get(name, (0, 0, 0.0))
+            self._observed[name] = (runs + 1, fails + (not passed), total + seconds)
+
+    def _record_exit(self, skipped: list[str]) -> None:
+        with self._stats_lock:
+            self._savings["validations"] += 1
+            if skipped:
+                self._savings["early_exits"] += 1
+                # هر بررسی حداقل یک درخواست API است
+                self._savings["calls"] += len(skipped)
+                self._savings["seconds"] += sum(self._costs[n] for n in skipped)
+
+    def flush_stats(self) -> None:
+        """ذخیره آمار این دور، گزارش صرفه‌جویی و به‌روزرسانی ترتیب"""
+        with self._stats_lock:
+            observed, self._observed = self._observed, {}
+            savings = dict(self._savings)
+            self._savings = {"validations": 0, "early_exits": 0, "calls": 0, "seconds": 0.0}
+
+        if not savings["validations"]:
+            return
+
+        order = ">".join(self.check_order)
+        self.db.record_check_costs(observed)
+        self.db.record_validation_savings(
+            order, savings["validations"], savings["early_exits"],
+            savings["calls"], savings["seconds"],
+        )
+        log.info(
+            f"   💰 خروج زودهنگام ({order}): "
+            f"{savings['early_exits']}/{savings['validations']} | "
+            f"~{savings['calls']} درخواست و {savings['seconds']:.1f}s صرفه‌جویی"
+        )
+        self.refresh_check_order()
+
+    # ──────────────────────────────────────────
+    # اعتبارسنجی REST
+    # ──────────────────────────────────────────
+
+    def _validate_rest(
+        self,
+        repo: RepositoryInfo,
+        cancel: threading.Event | None = None,
+        early_exit: bool = True,
+    ) -> ValidationResult | None:
+        """
+        بررسی اینکه مخزن تمام شرایط داده آموزشی را دارد:
+        ✅ README موجود
+        ✅ حداقل N عدد Issue (غیر PR)
+        ✅ حداقل N عدد Pull Request
+        ✅ حداقل N فایل کد با پسوند مجاز
+        بررسی‌ها به ترتیب check_order اجرا و با اولین رد متوقف می‌شوند
+        قبل از هر درخواست cancel بررسی می‌شود (لغو → None)
+        """
+        result = ValidationResult(full_name=repo.full_name)
+
+        log.debug(f"   🔎 اعتبارسنجی: {repo.full_name}")
+
+        order = self.check_order
+        for i, name in enumerate(order):
+            if _cancelled(cancel):
+                return None
+
+            start = time.monotonic()
+            passed = self._run_check(name, repo, result)
+            self._observe(name, passed, time.monotonic() - start)
+
+            if not passed and early_exit:
+                self._record_exit(order[i + 1:])
+                break
+        else:
+            self._record_exit([])
 
         # ── نتیجه نهایی ──
         result.is_valid = len(result.rejection_reasons) == 0
@@ -84,11 +390,69 @@ class RepoValidator:
 
         return result
 
+    def _run_check(
+        self, name: str, repo: RepositoryInfo, result: ValidationResult
+    ) -> bool:
+        """اجرای یک بررسی و ثبت در result — آیا قبول شد؟"""
+        if name == "readme":
+            result.has_readme = self._check_readme(repo)
+            if not result.has_readme:
+                result.rejection_reasons.append("❌ README ندارد")
+            return result.has_readme
+
+        if name == "issues":
+            result.issue_count = self._count_issues(repo)
+            if result.issue_count < MIN_ISSUES_REQUIRED:
+                result.rejection_reasons.append(
+                    f"❌ Issues ناکافی: {result.issue_count}/{MIN_ISSUES_REQUIRED}"
+                )
+                return False
+            return True
+
+        if name == "prs":
+            result.pr_count = self._count_pull_requests(repo)
+            if result.pr_count < MIN_PRS_REQUIRED:
+                result.rejection_reasons.append(
+                    f"❌ PRs ناکافی: {result.pr_count}/{MIN_PRS_REQUIRED}"
+                )
+                return False
+            return True
+
+        result.code_file_count = self._count_code_files(repo)
+        if result.code_file_count < MIN_CODE_FILES_REQUIRED:
+            result.rejection_reasons.append(
+                f"❌ Code files ناکافی: {result.code_file_count}/{MIN_CODE_FILES_REQUIRED}"
+            )
+            return False
+        return True
+
     def _check_readme(self, repo: RepositoryInfo) -> bool:
-        """بررسی وجود README (یک API call)"""
+        """بررسی وجود README (یک API call) — محتوا برای استخراج کش می‌شود"""
+        readme = self.artifacts.get_or_fetch(
+            repo.full_name, "readme", repo.default_branch,
+            lambda: self._fetch_readme(repo),
+        )
+        return readme is not None
+
+    def _fetch_readme(self, repo: RepositoryInfo) -> dict | None:
+        """/readme همراه محتوای base64 — بزرگ‌تر از سقف دانلود خام، بدون محتوا"""
         resp = self.api.get(f"/repos/{repo.full_name}/readme")
-        time.sleep(0.3)
-        return resp.status_code == 200
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        content = None
+        if (
+            data.get("encoding") == "base64"
+            and data.get("size", 0) <= RAW_DOWNLOAD_MAX_KB * 1024
+        ):
+            content = decode_base64_content(data.get("content", ""))
+        return {
+            "content": content,
+            "size": data.get("size", 0),
+            "sha": data.get("sha", ""),
+            "name": data.get("name", ""),
+            "path": data.get("path", ""),
+        }
 
     def _count_issues(self, repo: RepositoryInfo) -> int:
         """
@@ -96,39 +460,16 @@ class RepoValidator:
         از open_issues_count API نمی‌شود استفاده کرد چون PR ها هم شامل می‌شود
         """
         count = 0
-        page = 1
-
-        while True:
-            resp = self.api.get(
-                f"/repos/{repo.full_name}/issues",
-                params={
-                    "state": "all",
-                    "per_page": 30,
-                    "page": page,
-                },
-            )
-            if resp.status_code != 200:
-                break
-
-            items = resp.json()
-            if not items:
-                break
-
-            for item in items:
-                if "pull_request" not in item:
-                    count += 1
 
+        for item in self.api.paginate(
+            f"/repos/{repo.full_name}/issues", params={"state": "all"}
+        ):
+            if "pull_request" not in item:
+                count += 1
             # اگر به حداقل رسیدیم، نیازی به ادامه نیست
             if count >= MIN_ISSUES_REQUIRED:
                 break
 
-            # اگر کمتر از per_page آمد، صفحه آخر بود
-            if len(items) < 30:
-                break
-
-            page += 1
-            time.sleep(0.3)
-
         return count
 
     def _count_pull_requests(self, repo: RepositoryInfo) -> int:
@@ -137,7 +478,6 @@ class RepoValidator:
             f"/repos/{repo.full_name}/pulls",
             params={"state": "all", "per_page": MIN_PRS_REQUIRED + 5},
         )
-        time.sleep(0.3)
 
         if resp.status_code != 200:
             return 0
@@ -145,17 +485,14 @@ class RepoValidator:
         return len(resp.json())
 
     def _count_code_files(self, repo: RepositoryInfo) -> int:
-        """شمارش فایل‌های کد با پسوند مجاز"""
-        resp = self.api.get(
-            f"/repos/{repo.full_name}/git/trees/{repo.default_branch}",
-            params={"recursive": "1"},
+        """شمارش فایل‌های کد با پسوند مجاز (درخت برای استخراج کش می‌شود)"""
+        tree = self.artifacts.get_or_fetch(
+            repo.full_name, "tree", repo.default_branch,
+            lambda: self._fetch_tree(repo),
         )
-        time.sleep(0.3)
-
-        if resp.status_code != 200:
+        if tree is None:
             return 0
 
-        tree = resp.json().get("tree", [])
         count = sum(
             1
             for node in tree
@@ -163,4 +500,13 @@ class RepoValidator:
             and any(node.get("path", "").endswith(ext) for ext in CODE_EXTENSIONS)
             and node.get("size", 0) <= 100_000  # فایل‌های زیر 100KB
         )
-        return count
\ No newline at end of file
+        return count
+
+    def _fetch_tree(self, repo: RepositoryInfo) -> list[dict] | None:
+        resp = self.api.get(
+            f"/repos/{repo.full_name}/git/trees/{repo.default_branch}",
+            params={"recursive": "1"},
+        )
+        if resp.status_code != 200:
+            return None
+        return resp.json().get("tree", [])
\ No newline at end of file
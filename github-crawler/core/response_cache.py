@@ -0,0 +1,253 @@
+"""
+کش پایدار پاسخ‌های API گیت‌هاب (درخواست شرطی)
+ETag / Last-Modified هر URL ذخیره می‌شود و درخواست بعدی با
+If-None-Match ارسال می‌شود — پاسخ 304 از سهمیه GitHub کم نمی‌کند
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config.settings import HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB
+from utils.logger import log
+
+# هدرهایی که همراه بدنه ذخیره می‌شوند
+_STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Link")
+
+
+class ResponseCache:
+    """کش SQLite با سقف حجم و حذف LRU"""
+
+    def __init__(
+        self,
+        db_path: str = HTTP_CACHE_PATH,
+        max_bytes: int = HTTP_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+        # حجم کل نگه‌داری‌شده — یک بار شمرده و با هر ذخیره/حذف به‌روز می‌شود
+        self._size_lock = threading.Lock()
+        with self._get_conn() as conn:
+            self._total_size = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) AS s FROM http_cache"
+            ).fetchone()["s"]
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self) -> None:
+        with self._get_conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    cache_key      TEXT PRIMARY KEY,
+                    url            TEXT NOT NULL,
+                    etag           TEXT,
+                    last_modified  TEXT,
+                    headers        TEXT,
+                    body           BLOB,
+                    size           INTEGER DEFAULT 0,
+                    last_access    REAL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_http_cache_access
+                ON http_cache(last_access)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache_stats (
+                    name   TEXT PRIMARY KEY,
+                    value  INTEGER DEFAULT 0
+                )
+            """)
+
+    # ──────────────────────────────────────────
+    # کلید و جستجو
+    # ──────────────────────────────────────────
+
+    @staticmethod
+    def make_key(
+        url: str, params: dict | None = None, accept: str = "", scope: str = ""
+    ) -> str:
+        """
+        کلید یکتا از URL + پارامترهای مرتب‌شده + نوع رسانه + دامنه
+        scope اثر انگشت توکن است — پاسخ (و ETag) هر توکن جداست، چون
+        دسترسی توکن‌ها به مخازن خصوصی یکی نیست
+        """
+        raw = json.dumps(
+            [url, sorted((params or {}).items()), accept, scope],
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, cache_key: str) -> dict | None:
+        with self._get_conn() as conn:
+            row = conn.execute(
+                """SELECT etag, last_modified, headers, body
+                   FROM http_cache WHERE cache_key=?""",
+                (cache_key,),
+            ).fetchone()
+            return dict(row) if row else None
+
+    def lookup_any(self, cache_keys: list[str]) -> tuple[str, dict] | None:
+        """
+        تازه‌ترین مدخل از بین چند کلید (یک کلید برای هر توکن استخر)
+        خروجی: (کلید پیداشده، مدخل) — None اگر هیچ‌کدام نبود
+        """
+        if not cache_keys:
+            return None
+        marks = ",".join("?" * len(cache_keys))
+        with self._get_conn() as conn:
+            row = conn.execute(
+                f"""SELECT cache_key, etag, last_modified, headers, body
+                    FROM http_cache WHERE cache_key IN ({marks})
+                    ORDER BY last_access DESC LIMIT 1""",
+                cache_keys,
+            ).fetchone()
+        if not row:
+            return None
+        entry = dict(row)
+        return entry.pop("cache_key"), entry
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # ──────────────────────────────────────────
+    # ذخیره و ساخت پاسخ
+    # ──────────────────────────────────────────
+
+    def store(self, cache_key: str, response: requests.Response) -> None:
+        """ذخیره پاسخ 200 که ETag یا Last-Modified دارد"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        body = response.content
+        headers = {
+            h: response.headers[h] for h in _STORED_HEADERS if h in response.headers
+        }
+        with self._get_conn() as conn:
+            old = conn.execute(
+                "SELECT size FROM http_cache WHERE cache_key=?", (cache_key,)
+            ).fetchone()
+            conn.execute(
+                """INSERT OR REPLACE INTO http_cache
+                   (cache_key, url, etag, last_modified, headers, body,
+                    size, last_access)
+                   VALUES (?,?,?,?,?,?,?,?)""",
+                (
+                    cache_key, response.url, etag, last_modified,
+                    json.dumps(headers), body, len(body), time.time(),
+                ),
+            )
+            self._bump(conn, "stores")
+            with self._size_lock:
+                self._total_size += len(body) - (old["size"] if old else 0)
+            self._evict(conn)
+
+    def build_response(
+        self, cache_key: str, entry: dict, not_modified: requests.Response
+    ) -> requests.Response:
+        """ساخت پاسخ 200 از کش برای جواب 304"""
+        with self._get_conn() as conn:
+            conn.execute(
+                "UPDATE http_cache SET last_access=? WHERE cache_key=?",
+                (time.time(), cache_key),
+            )
+            self._bump(conn, "hits")
+
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = entry["body"] or b""
+        resp.headers = CaseInsensitiveDict(json.loads(entry["headers"] or "{}"))
+        # هدرهای Rate Limit از پاسخ 304 تازه هستند
+        for h, v in not_modified.headers.items():
+            if h.lower().startswith("x-ratelimit"):
+                resp.headers[h] = v
+        resp.url = not_modified.url
+        resp.encoding = "utf-8"
+        resp.request = not_modified.request
+        resp.from_cache = True
+        return resp
+
+    def record_miss(self) -> None:
+        with self._get_conn() as conn:
+            self._bump(conn, "misses")
+
+    # ──────────────────────────────────────────
+    # حذف LRU و آمار
+    # ──────────────────────────────────────────
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """حذف قدیمی‌ترین‌ها تا زیر سقف — از شمارنده حجم، بدون SUM روی جدول"""
+        with self._size_lock:
+            to_free = self._total_size - self.max_bytes
+        if to_free <= 0:
+            return
+
+        victims = []
+        freed = 0
+        for row in conn.execute(
+            "SELECT cache_key, size FROM http_cache ORDER BY last_access ASC"
+        ):
+            victims.append((row["cache_key"],))
+            freed += row["size"]
+            if freed >= to_free:
+                break
+
+        conn.executemany("DELETE FROM http_cache WHERE cache_key=?", victims)
+        with self._size_lock:
+            self._total_size -= freed
+        self._bump(conn, "evictions", len(victims))
+        log.debug(f"🧹 کش: {len(victims)} پاسخ قدیمی حذف شد")
+
+    @staticmethod
+    def _bump(conn: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        conn.execute(
+            """INSERT INTO http_cache_stats (name, value) VALUES (?, ?)
+               ON CONFLICT(name) DO UPDATE SET value = value + excluded.value""",
+            (name, amount),
+        )
+
+    def get_stats(self) -> dict:
+        """آمار کش برای --stats"""
+        with self._get_conn() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS c, COALESCE(SUM(size), 0) AS s FROM http_cache"
+            ).fetchone()
+            counters = {
+                r["name"]: r["value"]
+                for r in conn.execute("SELECT name, value FROM http_cache_stats")
+            }
+
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "entries": row["c"],
+            "size_mb": round(row["s"] / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": f"{hits / lookups:.1%}" if lookups else "N/A",
+            "stores": counters.get("stores", 0),
+            "evictions": counters.get("evictions", 0),
+        }
@@ -0,0 +1,113 @@
+"""
+بازبینی مخازن ردشده
+مخزنی که نزدیک آستانه‌ها رد شده، زودتر دوباره بررسی می‌شود؛
+فقط با سهمیه اضافه و اول با یک درخواست شرطی (304 رایگان)
+"""
+
+from __future__ import annotations
+
+from config.settings import REVALIDATE_BATCH, REVALIDATE_MIN_QUOTA
+from core.rate_limiter import GitHubRateLimiter
+from core.repo_validator import RepoValidator
+from models.repository import RepositoryDB, RepositoryInfo
+from utils.logger import log
+
+
+class Revalidator:
+    """صف بازبینی ردشده‌ها بر اساس next_check_at و closeness"""
+
+    def __init__(
+        self,
+        db: RepositoryDB | None = None,
+        rate_limiter: GitHubRateLimiter | None = None,
+        validator: RepoValidator | None = None,
+    ):
+        self.db = db or RepositoryDB()
+        self.api = rate_limiter or GitHubRateLimiter()
+        self.validator = validator or RepoValidator(self.api, db=self.db)
+
+    def has_spare_quota(self) -> bool:
+        """سهمیه منابع مصرفی بالاتر از REVALIDATE_MIN_QUOTA است؟"""
+        resources = ["core"]
+        if self.validator.mode == "graphql":
+            resources.append("graphql")
+        for resource in resources:
+            b = self.api.budget(resource)
+            if b["remaining"] <= b["limit"] * REVALIDATE_MIN_QUOTA:
+                return False
+        return True
+
+    def run(self, max_repos: int = REVALIDATE_BATCH) -> list[RepositoryInfo]:
+        """بازبینی ردشده‌های سررسیده — مخازن تازه قبول‌شده را برمی‌گرداند"""
+        due = self.db.get_due_rejects(max_repos)
+        if not due:
+            log.info("   ♻️ ردشده سررسیده‌ای نیست")
+            return []
+
+        accepted: list[RepositoryInfo] = []
+        changed: list[RepositoryInfo] = []
+        unchanged = rechecked = 0
+
+        for row in due:
+            if not self.has_spare_quota():
+                log.info("   ⏸️ سهمیه اضافه تمام شد — ادامه در اجرای بعدی")
+                break
+
+            full_name = row["full_name"]
+            resp = self.api.get(f"/repos/{full_name}")
+
+            if resp.status_code != 200:
+                # حذف یا خصوصی شده — با دورترین فاصله دوباره سر می‌زنیم
+                self.db.reschedule_rejected(full_name, 0.0)
+                continue
+
+            # 304 از کش: از آخرین بازبینی تغییری نکرده
+            if getattr(resp, "from_cache", False) and (row["check_count"] or 1) > 1:
+                self.db.reschedule_rejected(full_name, row["closeness"])
+                unchanged += 1
+                continue
+
+            # تغییرکرده‌ها دسته‌ای اعتبارسنجی می‌شوند (graphql: یک کوئری برای دسته)
+            changed.append(RepositoryInfo.from_github_api(resp.json()))
+            if len(changed) >= self.validator.batch_size:
+                rechecked += len(changed)
+                accepted += self._validate_batch(changed)
+                changed = []
+
+        if changed:
+            rechecked += len(changed)
+            accepted += self._validate_batch(changed)
+
+        self.validator.flush_stats()
+        log.info(
+            f"   ♻️ بازبینی: {rechecked} بررسی | {unchanged} بدون تغییر (304) | "
+            f"{len(accepted)} قبول"
+        )
+        return accepted
+
+    def _validate_batch(self, repos: list[RepositoryInfo]) -> list[RepositoryInfo]:
+        """اعتبارسنجی یک دسته و ثبت نتیجه — قبول‌شده‌ها را برمی‌گرداند"""
+        accepted = []
+        for repo, result in zip(repos, self.validator.validate_many(repos)):
+            if result.is_valid:
+                repo.has_readme = True
+                repo.has_sufficient_issues = True
+                repo.has_sufficient_prs = True
+                repo.has_sufficient_code = True
+                repo.mark_training_ready()
+                self.db.upsert_repository(repo, keyword="revalidated")
+                self.db.remove_rejected(repo.full_name)
+                accepted.append(repo)
+                log.info(
+                    f"   ✅ [bold green]قبول در بازبینی[/]: {repo.full_name} | "
+                    f"Issues={result.issue_count} PRs={result.pr_count} "
+                    f"Code={result.code_file_count}"
+                )
+            else:
+                reason = " | ".join(result.rejection_reasons)
+                self.db.save_rejected(repo.full_name, reason, result)
+                log.debug(
+                    f"   ⛔ هنوز رد: {repo.full_name} — {reason} "
+                    f"(نزدیکی {result.closeness():.0%})"
+                )
+        return accepted
@@ -0,0 +1,268 @@
+"""
+تقسیم فضای جستجو برای عبور از سقف 1000 نتیجه GitHub Search
+کوئری یک کلیدواژه بازگشتی بر اساس بازه stars: و سپس پنجره‌های
+created: / pushed: شکسته می‌شود تا total_count هر برش زیر 1000 باشد
+با دیتابیس، صفحات پیمایش‌شده چک‌پوینت می‌شوند و بعد از کرش دوباره درخواست نمی‌شوند
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Iterator
+
+from config.settings import SEARCH_CHECKPOINT_TTL_HOURS, SEARCH_SLICE_CONCURRENCY
+from core.rate_limiter import GitHubRateLimiter
+from models.repository import RepositoryDB
+from utils.logger import log
+
+# حداکثر نتیجه‌ای که GitHub برای یک کوئری جستجو برمی‌گرداند
+SEARCH_RESULT_CAP = 1000
+SEARCH_PER_PAGE = 100
+
+# قدیمی‌ترین تاریخ ممکن برای created/pushed
+_EPOCH = date(2008, 1, 1)
+
+
+class SearchPartitioner:
+    """
+    تولید برش‌های جستجو (زیر سقف 1000) و پیمایش هم‌زمان صفحات آن‌ها
+    کاوش هر برش با صفحه اول واقعی انجام می‌شود و همان صفحه مصرف می‌شود
+    """
+
+    def __init__(
+        self,
+        rate_limiter: GitHubRateLimiter | None = None,
+        concurrency: int = SEARCH_SLICE_CONCURRENCY,
+        db: RepositoryDB | None = None,
+    ):
+        self.api = rate_limiter or GitHubRateLimiter()
+        self.concurrency = max(1, concurrency)
+        self.db = db  # None = بدون چک‌پوینت
+        self.probes = 0
+        self.requests = 0  # درخواست‌های واقعی جستجو (کاوش + صفحات)
+        self.resumed = 0  # صفحاتی که از چک‌پوینت خوانده شدند (بدون درخواست)
+        self.last_total = 0  # total_count کل کوئری آخرین slices()
+        # یک کاوش یا صفحه شکست خورد — پیمایش ناقص است (واترمارک جلو نرود)
+        self.failed = False
+
+    # ──────────────────────────────────────────
+    # درخواست جستجو
+    # ──────────────────────────────────────────
+
+    @staticmethod
+    def _params(query: str, page: int) -> dict:
+        return {
+            "q": query,
+            "sort": "stars",
+            "order": "desc",
+            "per_page": SEARCH_PER_PAGE,
+            "page": page,
+        }
+
+    def _probe(self, query: str) -> dict | None:
+        """صفحه اول یک برش (total_count + آیتم‌ها)"""
+        data = self._resume(query, 1)
+        if data is not None:
+            return data
+
+        self.probes += 1
+        self.requests += 1
+        resp = self.api.get(
+            "/search/repositories", params=self._params(query, 1), is_search=True
+        )
+        if resp.status_code != 200:
+            log.error(f"❌ خطای جستجو: {resp.status_code} — {query}")
+            self.failed = True
+            return None
+        data = resp.json()
+        if data.get("total_count", 0) >= SEARCH_RESULT_CAP:
+            # برش شکسته می‌شود و آیتم‌هایش مصرف نمی‌شوند — همین حالا ثبت شود
+            self._checkpoint(query, 1, data)
+        return data
+
+    # ──────────────────────────────────────────
+    # چک‌پوینت صفحات
+    # ──────────────────────────────────────────
+
+    def _resume(self, query: str, page: int) -> dict | None:
+        """
+        صفحه پیمایش‌شده از چک‌پوینت — آیتم‌ها قبلاً در صف کرول ثبت شده‌اند،
+        پس فقط شمارش‌ها برای ادامه برش‌بندی/صفحه‌بندی برمی‌گردند
+        """
+        if self.db is None:
+            return None
+        cp = self.db.get_search_checkpoint(query, page, SEARCH_CHECKPOINT_TTL_HOURS)
+        if cp is None:
+            return None
+        self.resumed += 1
+        return {
+            "total_count": cp["total_count"],
+            "items": [],
+            "item_count": cp["item_count"],
+            "top_stars": cp["top_stars"],
+            "resumed": True,
+        }
+
+    def _checkpoint(self, query: str, page: int, data: dict) -> None:
+        if self.db is None or data.get("resumed"):
+            return
+        items = data.get("items", [])
+        self.db.save_search_checkpoint(
+            query, page, data.get("total_count", 0), len(items),
+            items[0].get("stargazers_count") if items else None,
+        )
+
+    # ──────────────────────────────────────────
+    # تولید برش‌ها
+    # ──────────────────────────────────────────
+
+    def slices(
+        self, base_query: str, min_stars: int
+    ) -> Iterator[tuple[str, dict]]:
+        """
+        برش‌ها به ترتیب ستاره نزولی (تنبل — فقط به اندازه مصرف کاوش می‌شود)
+        خروجی: (کوئری برش، پاسخ صفحه اول)
+        """
+        query = f"{base_query} stars:>={min_stars}"
+        data = self._probe(query)
+        if data is None:
+            return
+        self.last_total = data.get("total_count", 0)
+        if data.get("total_count", 0) < SEARCH_RESULT_CAP:
+            yield query, data
+            return
+
+        items = data.get("items", [])
+        max_stars = data.get("top_stars") or (
+            items[0].get("stargazers_count", min_stars) if items else min_stars
+        )
+        log.info(
+            f"   🧩 {data['total_count']} نتیجه — تقسیم بازه ستاره "
+            f"{min_stars}..{max_stars}"
+        )
+        yield from self._split_stars(base_query, min_stars, max_stars)
+
+    def _split_stars(
+        self, base_query: str, lo: int, hi: int
+    ) -> Iterator[tuple[str, dict]]:
+        query = f"{base_query} stars:{lo}..{hi}"
+        data = self._probe(query)
+        if data is None or not data.get("total_count"):
+            return
+        if data["total_count"] < SEARCH_RESULT_CAP:
+            yield query, data
+            return
+
+        if lo >= hi:
+            # یک مقدار ستاره با بیش از 1000 مخزن — تقسیم زمانی
+            yield from self._split_dates(
+                query, "created", _EPOCH, date.today(), data
+            )
+            return
+
+        # میانه هندسی — توزیع ستاره‌ها به شدت چوله است
+        mid = int(((lo + 1) * (hi + 1)) ** 0.5) - 1
+        mid = min(max(mid, lo), hi - 1)
+        yield from self._split_stars(base_query, mid + 1, hi)
+        yield from self._split_stars(base_query, lo, mid)
+
+    def _split_dates(
+        self,
+        base_query: str,
+        field: str,
+        start: date,
+        end: date,
+        data: dict | None = None,
+    ) -> Iterator[tuple[str, dict]]:
+        query = f"{base_query} {field}:{start.isoformat()}..{end.isoformat()}"
+        if data is None:
+            data = self._probe(query)
+            if data is None or not data.get("total_count"):
+                return
+            if data["total_count"] < SEARCH_RESULT_CAP:
+                yield query, data
+                return
+
+        if start >= end:
+            if field == "created":
+                # یک روز ساخت با بیش از 1000 مخزن — تقسیم بر اساس pushed
+                yield from self._split_dates(
+                    query, "pushed", _EPOCH, date.today()
+                )
+            else:
+                log.warning(f"   ⚠️ برش قابل تقسیم نیست (سقف 1000): {query}")
+                yield query, data
+            return
+
+        mid = start + timedelta(days=(end - start).days // 2)
+        # جدیدترها اول
+        yield from self._split_dates(base_query, field, mid + timedelta(days=1), end)
+        yield from self._split_dates(base_query, field, start, mid)
+
+    # ──────────────────────────────────────────
+    # پیمایش هم‌زمان صفحات
+    # ──────────────────────────────────────────
+
+    def pages(
+        self, base_query: str, min_stars: int
+    ) -> Iterator[tuple[str, int, list[dict], int]]:
+        """
+        صفحات همه برش‌ها — تا `concurrency` برش هم‌زمان پیمایش می‌شوند
+        خروجی: (کوئری برش، شماره صفحه، آیتم‌ها، total_count برش)
+        چک‌پوینت هر صفحه هم‌زمان با تحویل آن ثبت می‌شود (مصرف‌کننده باید
+        آیتم‌ها را فوراً در صف کرول بگذارد)؛ صفحات چک‌پوینت‌شده بدون درخواست
+        و با آیتم‌های خالی برمی‌گردند
+        """
+        slices = self.slices(base_query, min_stars)
+        active: list[list] = []  # [query, next_page, total]
+        exhausted = False
+
+        while True:
+            # پر کردن پنجره برش‌های فعال
+            while not exhausted and len(active) < self.concurrency:
+                nxt = next(slices, None)
+                if nxt is None:
+                    exhausted = True
+                    break
+                query, data = nxt
+                total = data.get("total_count", 0)
+                items = data.get("items", [])
+                self._checkpoint(query, 1, data)
+                yield query, 1, items, total
+                if (
+                    data.get("item_count", len(items)) >= SEARCH_PER_PAGE
+                    and total > SEARCH_PER_PAGE
+                ):
+                    active.append([query, 2, total])
+
+            if not active:
+                return
+
+            resumed = [self._resume(query, page) for query, page, _ in active]
+            to_fetch = [
+                ("/search/repositories", self._params(query, page))
+                for (query, page, _), data in zip(active, resumed)
+                if data is None
+            ]
+            self.requests += len(to_fetch)
+            responses = iter(self.api.get_many(to_fetch) if to_fetch else [])
+
+            still_active = []
+            for entry, data in zip(active, resumed):
+                query, page, total = entry
+                if data is None:
+                    resp = next(responses)
+                    if resp.status_code != 200:
+                        log.error(f"❌ خطای جستجو: {resp.status_code} — {query}")
+                        self.failed = True
+                        continue
+                    data = resp.json()
+                items = data.get("items", [])
+                self._checkpoint(query, page, data)
+                yield query, page, items, total
+                if (
+                    data.get("item_count", len(items)) >= SEARCH_PER_PAGE
+                    and page * SEARCH_PER_PAGE < min(total, SEARCH_RESULT_CAP)
+                ):
+                    still_active.append([query, page + 1, total])
+            active = still_active
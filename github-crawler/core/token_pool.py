@@ -0,0 +1,121 @@
+"""
+استخر توکن‌های GitHub با چرخش بر اساس سهمیه
+هر درخواست به توکنی می‌رود که بیشترین سهمیه باقی‌مانده را دارد
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+
+from core.rate_budget import DEFAULT_LIMITS, RateBudget
+
+
+class PooledToken:
+    """یک توکن و سهمیه‌های آن"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.quotas: dict[str, RateBudget] = {
+            resource: RateBudget(resource) for resource in DEFAULT_LIMITS
+        }
+
+    @property
+    def label(self) -> str:
+        """نمایش امن توکن در لاگ"""
+        if not self.token:
+            return "anonymous"
+        return f"{self.token[:4]}…{self.token[-4:]}"
+
+    @property
+    def scope(self) -> str:
+        """اثر انگشت توکن برای کلید کش — پاسخ یک توکن به توکن دیگر داده نشود"""
+        if not self.token:
+            return "anonymous"
+        return hashlib.sha256(self.token.encode()).hexdigest()[:16]
+
+    def quota(self, resource: str) -> RateBudget:
+        if resource not in self.quotas:
+            self.quotas[resource] = RateBudget(resource)
+        return self.quotas[resource]
+
+
+class TokenPool:
+    """انتخاب توکن با بیشترین سهمیه برای هر منبع"""
+
+    def __init__(self, tokens: list[str]):
+        self.tokens = [PooledToken(t) for t in (tokens or [""])]
+        self._lock = threading.Lock()
+
+    def acquire(
+        self, resource: str, reserve: int = 0, prefer: PooledToken | None = None
+    ) -> PooledToken | None:
+        """
+        توکنی با بیشترین سهمیه باقی‌مانده
+        prefer: اگر هنوز بالای حد ذخیره باشد همین توکن انتخاب می‌شود
+        (مثلاً توکنی که ETag کش‌شده را گرفته — ETag به توکن وابسته است)
+        اگر همه توکن‌ها زیر حد ذخیره باشند None برمی‌گردد
+        """
+        now = time.time()
+        with self._lock:
+            if prefer is not None and prefer.quota(resource).available(now) > reserve:
+                best = prefer
+            else:
+                best = max(
+                    self.tokens, key=lambda t: t.quota(resource).available(now)
+                )
+            quota = best.quota(resource)
+            if quota.available(now) <= reserve:
+                return None
+            # رزرو خوش‌بینانه تا درخواست‌های هم‌زمان بین توکن‌ها پخش شوند
+            quota.consume(now)
+            return best
+
+    def update_from_headers(self, token: PooledToken, headers: dict) -> str | None:
+        """
+        به‌روزرسانی بودجه منبعی که هدر X-RateLimit-Resource نام می‌برد
+        نام منبع را برمی‌گرداند
+        """
+        resource = headers.get("X-RateLimit-Resource")
+        if not resource or "X-RateLimit-Remaining" not in headers:
+            return None
+        with self._lock:
+            token.quota(resource).update_from_headers(headers)
+        return resource
+
+    def update(self, token: PooledToken, resource: str, info: dict) -> None:
+        """به‌روزرسانی از بدنه /rate_limit"""
+        with self._lock:
+            token.quota(resource).update(info)
+
+    def total_remaining(self, resource: str) -> int:
+        now = time.time()
+        return sum(t.quota(resource).available(now) for t in self.tokens)
+
+    def total_limit(self, resource: str) -> int:
+        return sum(t.quota(resource).limit for t in self.tokens)
+
+    def next_reset(self, resource: str) -> float:
+        """زودترین زمان بازنشانی بین توکن‌ها"""
+        resets = [t.quota(resource).reset for t in self.tokens if t.quota(resource).reset]
+        return min(resets) if resets else 0
+
+    def snapshot(self) -> list[dict]:
+        """وضعیت استخر برای --rate-limit"""
+        now = time.time()
+        return [
+            {
+                "token": t.label,
+                **{
+                    resource: {
+                        "remaining": q.available(now),
+                        "limit": q.limit,
+                        "used": q.used,
+                        "reset": q.reset,
+                    }
+                    for resource, q in t.quotas.items()
+                },
+            }
+            for t in self.tokens
+        ]
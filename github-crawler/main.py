@@ -8,7 +8,10 @@ Usage:
     python main.py --crawl --per-keyword 10                 کرول خودکار
     python main.py --schedule                               زمان‌بندی
     python main.py --validate owner/repo                    اعتبارسنجی
+    python main.py --revalidate                             بازبینی ردشده‌ها
     python main.py --stats                                  آمار
+    python main.py --export out/                            خروجی داده آموزشی (JSONL)
+    python main.py --gc                                     پاک‌سازی بلاب‌های بی‌ارجاع
     python main.py --rate-limit                              وضعیت API
 """
 
@@ -16,6 +19,7 @@ import argparse
 import json
 import time
 import sys
+from pathlib import Path
 
 import requests
 from rich.console import Console
@@ -27,12 +31,22 @@ from config.settings import (
     PROJECTS_PER_KEYWORD, MAX_SCAN_PER_KEYWORD,
     MIN_ISSUES_REQUIRED, MIN_PRS_REQUIRED, MIN_CODE_FILES_REQUIRED,
     CRON_INTERVAL_HOURS, GITEA_URL, GITEA_ORG,
-    GITEA_API_BASE, GITEA_HEADERS, GITHUB_TOKEN,
+    GITEA_API_BASE, GITEA_HEADERS, GITHUB_TOKEN, EXTRACTION_MODE,
 )
+from core.artifact_cache import (
+    PR_FILES_PER_PAGE,
+    ArtifactCache,
+    pr_file_entries,
+)
+from core.comment_index import RepoComments, load_repo_comments
 from core.data_extractor import DataExtractor
+from core.graphql_bulk import GraphQLBulkFetcher
 from core.github_crawler import GitHubCrawler
 from core.repo_validator import RepoValidator
+from core.pacer import PacedSession
 from core.rate_limiter import GitHubRateLimiter
+from core.response_cache import ResponseCache
+from core.revalidator import Revalidator
 from models.repository import RepositoryDB, RepositoryInfo
 from scheduler.cron_manager import CronManager
 from utils.logger import log
@@ -51,12 +65,22 @@ class FullMigrator:
     همه مستقیم GitHub API → Gitea API (بدون ذخیره لوکال)
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        mode: str = EXTRACTION_MODE,
+        artifacts: ArtifactCache | None = None,
+    ):
         self.github = GitHubRateLimiter()
-        self.gitea = requests.Session()
+        # مشترک با کرول/استخراج همین اجرا (فایل‌های PR)
+        self.artifacts = artifacts or ArtifactCache()
+        self.mode = mode
+        self.bulk = GraphQLBulkFetcher(self.github)
+        self.gitea = PacedSession("gitea")
         self.gitea.headers.update(GITEA_HEADERS)
         self.org = GITEA_ORG
         self.db = RepositoryDB()
+        # کامنت‌های دسته‌ای مخزن در حال انتقال (حالت rest)
+        self.comments: RepoComments | None = None
 
     # ──────────────────────────────────────
     # بررسی اتصال
@@ -97,11 +121,14 @@ class FullMigrator:
         )
         return r.status_code == 200
 
-    def delete_repo(self, name: str):
+    def delete_repo(self, name: str, max_checks: int = 10):
         self.gitea.delete(
             f"{GITEA_API_BASE}/repos/{self.org}/{name}", timeout=10
         )
-        time.sleep(3)
+        # صبر تا حذف کامل (فاصله بررسی‌ها با pacer)
+        for _ in range(max_checks):
+            if not self.repo_exists(name):
+                break
 
     # ──────────────────────────────────────
     # مرحله ۱: انتقال کد
@@ -208,43 +235,34 @@ class FullMigrator:
     def migrate_labels(self, github_repo: str, repo_name: str) -> dict[str, int]:
         log.info("🏷️ انتقال Labels...")
         label_map = {}
-        page = 1
 
-        while True:
-            r = self.github.get(
-                f"/repos/{github_repo}/labels",
-                params={"per_page": 100, "page": page},
+        for lb in self.github.paginate(
+            f"/repos/{github_repo}/labels", prefetch=True
+        ):
+            color = lb.get("color", "ee0701")
+            if not color.startswith("#"):
+                color = f"#{color}"
+
+            gr = self.gitea.post(
+                f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}/labels",
+                json={
+                    "name": lb["name"],
+                    "color": color,
+                    "description": lb.get("description", "") or "",
+                },
+                timeout=10,
             )
-            if r.status_code != 200 or not r.json():
-                break
-
-            for lb in r.json():
-                color = lb.get("color", "ee0701")
-                if not color.startswith("#"):
-                    color = f"#{color}"
-
-                gr = self.gitea.post(
+            if gr.status_code in (200, 201):
+                label_map[lb["name"]] = gr.json()["id"]
+            elif gr.status_code == 409:
+                existing = self.gitea.get(
                     f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}/labels",
-                    json={
-                        "name": lb["name"],
-                        "color": color,
-                        "description": lb.get("description", "") or "",
-                    },
-                    timeout=10,
+                    params={"limit": 100}, timeout=10,
                 )
-                if gr.status_code in (200, 201):
-                    label_map[lb["name"]] = gr.json()["id"]
-                elif gr.status_code == 409:
-                    existing = self.gitea.get(
-                        f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}/labels",
-                        params={"limit": 100}, timeout=10,
-                    )
-                    if existing.status_code == 200:
-                        for el in existing.json():
-                            if el["name"] == lb["name"]:
-                                label_map[lb["name"]] = el["id"]
-                time.sleep(0.2)
-            page += 1
+                if existing.status_code == 200:
+                    for el in existing.json():
+                        if el["name"] == lb["name"]:
+                            label_map[lb["name"]] = el["id"]
 
         log.info(f"   ✅ {len(label_map)} label")
         return label_map
@@ -259,65 +277,67 @@ class FullMigrator:
     ) -> int:
         log.info(f"🐛 انتقال Issues (max {max_issues})...")
         count = 0
-        page = 1
 
-        while count < max_issues:
-            r = self.github.get(
-                f"/repos/{github_repo}/issues",
-                params={
-                    "state": "all", "sort": "created",
-                    "direction": "asc", "per_page": 30, "page": page,
-                },
-            )
-            if r.status_code != 200 or not r.json():
+        for item in self._iter_issues(github_repo, max_issues):
+            if count >= max_issues:
                 break
+            if "pull_request" in item:
+                continue
 
-            for item in r.json():
-                if count >= max_issues:
-                    break
-                if "pull_request" in item:
-                    continue
+            user = item.get("user", {}).get("login", "?")
+            body = item.get("body", "") or ""
+            state = item.get("state", "open")
+            created = item.get("created_at", "")
 
-                user = item.get("user", {}).get("login", "?")
-                body = item.get("body", "") or ""
-                state = item.get("state", "open")
-                created = item.get("created_at", "")
+            full_body = (
+                f"📌 *@{user} — {created}*\n"
+                f"🔗 [GitHub]({item.get('html_url', '')})\n\n---\n\n{body}"
+            )
 
-                full_body = (
-                    f"📌 *@{user} — {created}*\n"
-                    f"🔗 [GitHub]({item.get('html_url', '')})\n\n---\n\n{body}"
-                )
+            gh_labels = [lb["name"] for lb in item.get("labels", [])]
+            ids = [label_map[n] for n in gh_labels if n in label_map]
 
-                gh_labels = [lb["name"] for lb in item.get("labels", [])]
-                ids = [label_map[n] for n in gh_labels if n in label_map]
+            gr = self.gitea.post(
+                f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}/issues",
+                json={"title": item["title"], "body": full_body, "labels": ids},
+                timeout=15,
+            )
 
-                gr = self.gitea.post(
-                    f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}/issues",
-                    json={"title": item["title"], "body": full_body, "labels": ids},
-                    timeout=15,
+            if gr.status_code in (200, 201):
+                gn = gr.json()["number"]
+                count += 1
+                self._migrate_comments(
+                    github_repo, item["number"], repo_name, gn,
+                    comments=item.get("comment_list"),
                 )
-
-                if gr.status_code in (200, 201):
-                    gn = gr.json()["number"]
-                    count += 1
-                    self._migrate_comments(
-                        github_repo, item["number"], repo_name, gn
+                if state == "closed":
+                    self.gitea.patch(
+                        f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}"
+                        f"/issues/{gn}",
+                        json={"state": "closed"}, timeout=10,
                     )
-                    if state == "closed":
-                        self.gitea.patch(
-                            f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}"
-                            f"/issues/{gn}",
-                            json={"state": "closed"}, timeout=10,
-                        )
-                    if count % 20 == 0:
-                        log.info(f"   📊 Issues: {count}")
-                time.sleep(0.3)
-            page += 1
-            time.sleep(1)
+                if count % 20 == 0:
+                    log.info(f"   📊 Issues: {count}")
 
         log.info(f"   ✅ {count} Issue")
         return count
 
+    def _iter_issues(self, github_repo: str, max_issues: int):
+        """Issues به ترتیب ساخت — در حالت graphql همراه کامنت‌ها"""
+        if self.mode == "graphql":
+            for page in self.bulk.issues(
+                github_repo, max_issues, order_by="CREATED_AT",
+                direction="ASC", max_comments=50,
+            ):
+                yield from page
+            return
+
+        yield from self.github.paginate(
+            f"/repos/{github_repo}/issues",
+            params={"state": "all", "sort": "created", "direction": "asc"},
+            prefetch=True,
+        )
+
     # ──────────────────────────────────────
     # مرحله ۴: Pull Requests
     # ──────────────────────────────────────
@@ -328,36 +348,36 @@ class FullMigrator:
     ) -> int:
         log.info(f"🔀 انتقال Pull Requests (max {max_prs})...")
         count = 0
-        page = 1
 
-        while count < max_prs:
-            r = self.github.get(
-                f"/repos/{github_repo}/pulls",
-                params={
-                    "state": "all", "sort": "created",
-                    "direction": "asc", "per_page": 30, "page": page,
-                },
-            )
-            if r.status_code != 200 or not r.json():
+        for pr in self._iter_prs(github_repo, max_prs):
+            if count >= max_prs:
                 break
 
-            for pr in r.json():
-                if count >= max_prs:
-                    break
-
-                success = self._create_pr(github_repo, repo_name, pr, label_map)
-                if success:
-                    count += 1
-                if count % 20 == 0 and count > 0:
-                    log.info(f"   📊 PRs: {count}")
-                time.sleep(0.5)
-
-            page += 1
-            time.sleep(1)
+            success = self._create_pr(github_repo, repo_name, pr, label_map)
+            if success:
+                count += 1
+            if count % 20 == 0 and count > 0:
+                log.info(f"   📊 PRs: {count}")
 
         log.info(f"   ✅ {count} PR")
         return count
 
+    def _iter_prs(self, github_repo: str, max_prs: int):
+        """PRها به ترتیب ساخت — در حالت graphql همراه فایل‌ها، Reviewها و کامنت‌ها"""
+        if self.mode == "graphql":
+            for page in self.bulk.pull_requests(
+                github_repo, max_prs, order_by="CREATED_AT",
+                direction="ASC", max_comments=50, max_files=30,
+            ):
+                yield from page
+            return
+
+        yield from self.github.paginate(
+            f"/repos/{github_repo}/pulls",
+            params={"state": "all", "sort": "created", "direction": "asc"},
+            prefetch=True,
+        )
+
     def _create_pr(
         self, github_repo: str, repo_name: str,
         pr: dict, label_map: dict
@@ -381,8 +401,10 @@ class FullMigrator:
             "❌ Closed" if state == "closed" else "🟡 Open"
         )
 
-        # ── Diff فایل‌ها ──
-        files = self._get_pr_files(github_repo, number)
+        # ── Diff فایل‌ها ── (در حالت graphql از قبل دریافت شده)
+        files = pr.get("file_list")
+        if files is None:
+            files = self._get_pr_files(github_repo, pr)
         files_md = ""
         if files:
             files_md = "\n---\n\n### 📁 فایل‌های تغییریافته\n\n"
@@ -400,7 +422,9 @@ class FullMigrator:
                     files_md += f"```diff\n{patch}\n```\n\n"
 
         # ── Reviews ──
-        reviews = self._get_pr_reviews(github_repo, number)
+        reviews = pr.get("review_list")
+        if reviews is None:
+            reviews = self._get_pr_reviews(github_repo, number)
         reviews_md = ""
         if reviews:
             reviews_md = "\n---\n\n### 💬 Reviews\n\n"
@@ -443,7 +467,12 @@ class FullMigrator:
 
         gn = resp.json()["number"]
 
-        self._migrate_comments(github_repo, number, repo_name, gn)
+        self._migrate_comments(
+            github_repo, number, repo_name, gn,
+            comments=pr.get("comment_list"),
+        )
+        if self.comments is not None:
+            self._migrate_review_comments(number, repo_name, gn)
 
         if state == "closed" or merged:
             self.gitea.patch(
@@ -453,24 +482,21 @@ class FullMigrator:
 
         return True
 
-    def _get_pr_files(self, github_repo: str, pr_number: int) -> list[dict]:
-        r = self.github.get(
-            f"/repos/{github_repo}/pulls/{pr_number}/files",
-            params={"per_page": 30},
-        )
-        if r.status_code != 200:
-            return []
-        time.sleep(0.3)
-        return [
-            {
-                "filename": f.get("filename", ""),
-                "status": f.get("status", ""),
-                "additions": f.get("additions", 0),
-                "deletions": f.get("deletions", 0),
-                "patch": f.get("patch", ""),
-            }
-            for f in r.json()
-        ]
+    def _get_pr_files(self, github_repo: str, pr: dict) -> list[dict]:
+        """فایل‌های PR — اگر استخراج همین اجرا گرفته، از کش آرتیفکت"""
+        def fetch() -> list[dict] | None:
+            r = self.github.get(
+                f"/repos/{github_repo}/pulls/{pr['number']}/files",
+                params={"per_page": PR_FILES_PER_PAGE},
+            )
+            if r.status_code != 200:
+                return None
+            return pr_file_entries(r.json())
+
+        return self.artifacts.get_or_fetch(
+            github_repo, f"pr_files/{pr['number']}",
+            pr.get("head", {}).get("sha", ""), fetch,
+        ) or []
 
     def _get_pr_reviews(self, github_repo: str, pr_number: int) -> list[dict]:
         r = self.github.get(
@@ -479,7 +505,6 @@ class FullMigrator:
         )
         if r.status_code != 200:
             return []
-        time.sleep(0.3)
         return [
             {
                 "user": rev.get("user", {}).get("login", "?"),
@@ -496,15 +521,20 @@ class FullMigrator:
 
     def _migrate_comments(
         self, github_repo: str, gh_number: int,
-        repo_name: str, gitea_number: int
+        repo_name: str, gitea_number: int,
+        comments: list[dict] | None = None,
     ):
-        r = self.github.get(
-            f"/repos/{github_repo}/issues/{gh_number}/comments",
-            params={"per_page": 50},
-        )
-        if r.status_code != 200:
-            return
-        for c in r.json():
+        if comments is None and self.comments is not None:
+            comments = self.comments.for_issue(gh_number, 50)
+        if comments is None:
+            r = self.github.get(
+                f"/repos/{github_repo}/issues/{gh_number}/comments",
+                params={"per_page": 50},
+            )
+            if r.status_code != 200:
+                return
+            comments = r.json()
+        for c in comments:
             cu = c.get("user", {}).get("login", "?")
             cb = c.get("body", "")
             ct = c.get("created_at", "")
@@ -514,7 +544,23 @@ class FullMigrator:
                 json={"body": f"💬 *@{cu} — {ct}*\n\n---\n\n{cb}"},
                 timeout=10,
             )
-            time.sleep(0.2)
+
+    def _migrate_review_comments(
+        self, gh_number: int, repo_name: str, gitea_number: int
+    ):
+        """کامنت‌های Review روی خطوط کد (فقط از ایندکس دسته‌ای)"""
+        for c in self.comments.for_review(gh_number, 50):
+            cu = c.get("user", {}).get("login", "?")
+            line = c.get("line") or c.get("original_line") or ""
+            self.gitea.post(
+                f"{GITEA_API_BASE}/repos/{self.org}/{repo_name}"
+                f"/issues/{gitea_number}/comments",
+                json={"body": (
+                    f"🔍 *@{cu} — `{c.get('path', '')}`:{line}*\n\n"
+                    f"---\n\n{c.get('body', '')}"
+                )},
+                timeout=10,
+            )
 
     # ──────────────────────────────────────
     # اجرای کامل
@@ -554,14 +600,19 @@ class FullMigrator:
             log.error("❌ انتقال کد ناموفق")
             return
 
-        time.sleep(5)
-
         # ── Labels ──
         log.info(f"\n{'='*50}")
         log.info("🏷️ مرحله ۲: Labels")
         log.info(f"{'='*50}")
         label_map = self.migrate_labels(github_repo, repo_name)
 
+        # ── کامنت‌ها: یک پیمایش برای کل مخزن به جای یک درخواست برای هر آیتم ──
+        self.comments = None
+        if self.mode != "graphql":
+            self.comments = load_repo_comments(
+                self.github, github_repo, max_issues + max_prs, reviews=True
+            )
+
         # ── Issues ──
         log.info(f"\n{'='*50}")
         log.info("🐛 مرحله ۳: Issues")
@@ -577,6 +628,7 @@ class FullMigrator:
         prs_count = self.migrate_prs(
             github_repo, repo_name, label_map, max_prs
         )
+        self.comments = None
 
         # ── گزارش ──
         url = f"{GITEA_URL}/{self.org}/{repo_name}"
@@ -585,6 +637,8 @@ class FullMigrator:
         log.info(f"   🏷️  Labels: {len(label_map)}")
         log.info(f"   🐛 Issues: {issues_count}")
         log.info(f"   🔀 PRs:    {prs_count}")
+        if self.mode == "graphql":
+            log.info(f"   🔷 GraphQL: {self.github.graphql_points} امتیاز")
         log.info(f"   🔗 {url}")
         log.info(f"{'='*60}")
 
@@ -628,10 +682,10 @@ def cmd_full_crawl(full_name: str, max_issues: int, max_prs: int):
 def cmd_crawl_only(per_keyword: int | None = None):
     db = RepositoryDB()
     crawler = GitHubCrawler(db)
-    extractor = DataExtractor(db, crawler.rate_limiter)
+    extractor = DataExtractor(db, crawler.rate_limiter, artifacts=crawler.artifacts)
 
     repos = crawler.search_repositories(projects_per_keyword=per_keyword)
-    migrator = FullMigrator()
+    migrator = FullMigrator(artifacts=crawler.artifacts)
     if not migrator.verify():
         log.error("❌ Gitea متصل نیست")
         return
@@ -640,9 +694,22 @@ def cmd_crawl_only(per_keyword: int | None = None):
         log.info(f"\n[{i}/{len(repos)}] {repo.full_name}")
         migrator.full_migrate(repo.full_name)
 
+    crawler.artifacts.summary()
     log.info(f"\n✅ {len(repos)} پروژه کامل شد")
 
 
+def cmd_revalidate():
+    db = RepositoryDB()
+    api = GitHubRateLimiter()
+    api.check_rate_limit()
+    revalidator = Revalidator(db, api)
+    accepted = revalidator.run()
+    if accepted:
+        extractor = DataExtractor(db, api, artifacts=revalidator.validator.artifacts)
+        for repo in accepted:
+            extractor.extract_all(repo)
+
+
 def cmd_schedule():
     manager = CronManager()
     manager.start_scheduler()
@@ -651,14 +718,14 @@ def cmd_schedule():
 def cmd_validate(full_name: str):
     api = GitHubRateLimiter()
     crawler = GitHubCrawler()
-    validator = RepoValidator(api)
+    validator = RepoValidator(api, db=crawler.db)
 
     repo = crawler.get_repository_details(full_name)
     if not repo:
         log.error(f"❌ {full_name} یافت نشد")
         return
 
-    result = validator.validate(repo)
+    result = validator.validate(repo, early_exit=False)
     t = Table(title=f"اعتبارسنجی {full_name}", show_lines=True)
     t.add_column("معیار", style="cyan")
     t.add_column("وضعیت", justify="center")
@@ -694,11 +761,92 @@ def cmd_stats():
             t.add_row(k, str(v))
     console.print(t)
 
+    cache_t = Table(title="🗃️ کش پاسخ‌ها (ETag)", show_lines=True)
+    cache_t.add_column("متریک", style="cyan")
+    cache_t.add_column("مقدار", style="green", justify="center")
+    for k, v in ResponseCache().get_stats().items():
+        cache_t.add_row(k, str(v))
+    console.print(cache_t)
+
+    savings = db.get_validation_savings()
+    if savings:
+        sv_t = Table(title="💰 خروج زودهنگام اعتبارسنجی", show_lines=True)
+        sv_t.add_column("ترتیب بررسی‌ها", style="cyan")
+        sv_t.add_column("اعتبارسنجی", justify="right")
+        sv_t.add_column("خروج زودهنگام", justify="right")
+        sv_t.add_column("درخواست صرفه‌جویی", style="green", justify="right")
+        sv_t.add_column("زمان صرفه‌جویی", justify="right")
+        for row in savings:
+            sv_t.add_row(
+                row["check_order"], str(row["validations"]),
+                str(row["early_exits"]), str(row["calls_saved"]),
+                f"{row['seconds_saved']:.0f}s",
+            )
+        console.print(sv_t)
+
+
+def cmd_export(out_dir: str, repo_name: str | None = None):
+    """
+    خروجی JSONL: blobs.jsonl (هر محتوای یکتا یک بار) + items.jsonl (ردیف‌ها
+    با ارجاع blob_sha) — بلاب مشترک بین مخازن فقط یک بار خوانده و نوشته می‌شود
+    """
+    db = RepositoryDB()
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    blobs = blob_bytes = 0
+    with open(out / "blobs.jsonl", "w", encoding="utf-8") as f:
+        for blob in db.iter_blobs(repo_name):
+            f.write(json.dumps(blob, ensure_ascii=False) + "\n")
+            blobs += 1
+            blob_bytes += blob["size"] or 0
+
+    items = refs = 0
+    with open(out / "items.jsonl", "w", encoding="utf-8") as f:
+        for row in db.iter_extracted_data(repo_name):
+            if row["metadata"]:
+                try:
+                    row["metadata"] = json.loads(row["metadata"])
+                except ValueError:
+                    pass
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            items += 1
+            refs += row["blob_sha"] is not None
+
+    log.info(
+        f"📤 خروجی {out}: {items} آیتم ({refs} ارجاع بلاب) | "
+        f"{blobs} بلاب یکتا ({blob_bytes / 1024 / 1024:.1f}MB)"
+    )
+
+
+def cmd_gc():
+    db = RepositoryDB()
+    removed, freed = db.gc_blobs(vacuum=True)
+    log.info(f"🧹 {removed} بلاب بی‌ارجاع حذف شد ({freed / 1024 / 1024:.1f}MB)")
+
 
 def cmd_rate_limit():
     api = GitHubRateLimiter()
     api.check_rate_limit()
 
+    t = Table(title=f"🔑 استخر توکن‌ها ({len(api.pool.tokens)})", show_lines=True)
+    t.add_column("توکن", style="cyan")
+    for resource in ("core", "search", "graphql"):
+        t.add_column(resource, justify="center")
+    t.add_column("Reset (core)", justify="center")
+
+    for entry in api.pool.snapshot():
+        reset = entry["core"]["reset"]
+        t.add_row(
+            entry["token"],
+            *(
+                f"{entry[r]['remaining']}/{entry[r]['limit']}"
+                for r in ("core", "search", "graphql")
+            ),
+            time.strftime("%H:%M:%S", time.localtime(reset)) if reset else "-",
+        )
+    console.print(t)
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -711,12 +859,16 @@ def main():
     group.add_argument("--crawl", action="store_true")
     group.add_argument("--schedule", action="store_true")
     group.add_argument("--validate", type=str, metavar="OWNER/REPO")
+    group.add_argument("--revalidate", action="store_true")
     group.add_argument("--stats", action="store_true")
     group.add_argument("--rate-limit", action="store_true")
+    group.add_argument("--export", type=str, metavar="DIR")
+    group.add_argument("--gc", action="store_true")
 
     parser.add_argument("--per-keyword", type=int, default=None)
     parser.add_argument("--max-issues", type=int, default=500)
     parser.add_argument("--max-prs", type=int, default=500)
+    parser.add_argument("--repo", type=str, default=None, metavar="OWNER/REPO")
 
     args = parser.parse_args()
     print_banner()
@@ -729,10 +881,16 @@ def main():
         cmd_schedule()
     elif args.validate:
         cmd_validate(args.validate)
+    elif args.revalidate:
+        cmd_revalidate()
     elif args.stats:
         cmd_stats()
     elif args.rate_limit:
         cmd_rate_limit()
+    elif args.export:
+        cmd_export(args.export, args.repo)
+    elif args.gc:
+        cmd_gc()
     else:
         parser.print_help()
 
@@ -7,21 +7,25 @@
 
 import time
 import sys
-import requests
 from config.settings import (
     GITEA_API_BASE, GITEA_HEADERS, GITEA_ORG,
     GITHUB_TOKEN, GITEA_URL,
 )
+from core.comment_index import RepoComments, load_repo_comments
+from core.pacer import PacedSession
 from core.rate_limiter import GitHubRateLimiter
 from utils.logger import log
 
 GITHUB_REPO = sys.argv[1] if len(sys.argv) > 1 else "ShishirPatil/gorilla"
 REPO_NAME = GITHUB_REPO.split("/")[-1]
 
-session = requests.Session()
+session = PacedSession("gitea")
 session.headers.update(GITEA_HEADERS)
 github = GitHubRateLimiter()
 
+# کامنت‌های دسته‌ای کل مخزن (در main بارگذاری می‌شود)
+comment_index: RepoComments | None = None
+
 
 def delete_if_exists():
     r = session.get(f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}", timeout=10)
@@ -30,7 +34,13 @@ def delete_if_exists():
         session.delete(
             f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}", timeout=10
         )
-        time.sleep(3)
+        # صبر تا حذف کامل (فاصله بررسی‌ها با pacer)
+        for _ in range(10):
+            r = session.get(
+                f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}", timeout=10
+            )
+            if r.status_code == 404:
+                break
 
 
 def method_1_migrate_code_only():
@@ -133,44 +143,33 @@ def disable_mirror():
 def migrate_labels():
     log.info("🏷️ انتقال Labels...")
     label_map = {}
-    page = 1
 
-    while True:
-        r = github.get(
-            f"/repos/{GITHUB_REPO}/labels",
-            params={"per_page": 100, "page": page},
+    for lb in github.paginate(f"/repos/{GITHUB_REPO}/labels", prefetch=True):
+        color = lb.get("color", "ee0701")
+        if not color.startswith("#"):
+            color = f"#{color}"
+
+        gr = session.post(
+            f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}/labels",
+            json={
+                "name": lb["name"],
+                "color": color,
+                "description": lb.get("description", "") or "",
+            },
+            timeout=10,
         )
-        if r.status_code != 200 or not r.json():
-            break
-
-        for lb in r.json():
-            color = lb.get("color", "ee0701")
-            if not color.startswith("#"):
-                color = f"#{color}"
-
-            gr = session.post(
+        if gr.status_code in (200, 201):
+            label_map[lb["name"]] = gr.json()["id"]
+        elif gr.status_code == 409:
+            existing = session.get(
                 f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}/labels",
-                json={
-                    "name": lb["name"],
-                    "color": color,
-                    "description": lb.get("description", "") or "",
-                },
+                params={"limit": 100},
                 timeout=10,
             )
-            if gr.status_code in (200, 201):
-                label_map[lb["name"]] = gr.json()["id"]
-            elif gr.status_code == 409:
-                existing = session.get(
-                    f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}/labels",
-                    params={"limit": 100},
-                    timeout=10,
-                )
-                if existing.status_code == 200:
-                    for el in existing.json():
-                        if el["name"] == lb["name"]:
-                            label_map[lb["name"]] = el["id"]
-            time.sleep(0.2)
-        page += 1
+            if existing.status_code == 200:
+                for el in existing.json():
+                    if el["name"] == lb["name"]:
+                        label_map[lb["name"]] = el["id"]
 
     log.info(f"   ✅ {len(label_map)} label")
     return label_map
@@ -183,76 +182,53 @@ def migrate_labels():
 def migrate_issues(label_map, max_issues=500):
     log.info(f"🐛 انتقال Issues (max {max_issues})...")
     count = 0
-    page = 1
-
-    while count < max_issues:
-        r = github.get(
-            f"/repos/{GITHUB_REPO}/issues",
-            params={
-                "state": "all",
-                "sort": "created",
-                "direction": "asc",
-                "per_page": 30,
-                "page": page,
-            },
-        )
-        if r.status_code != 200:
-            break
 
-        items = r.json()
-        if not items:
+    for item in github.paginate(
+        f"/repos/{GITHUB_REPO}/issues",
+        params={"state": "all", "sort": "created", "direction": "asc"},
+        prefetch=True,
+    ):
+        if count >= max_issues:
             break
+        if "pull_request" in item:
+            continue
 
-        for item in items:
-            if count >= max_issues:
-                break
-            if "pull_request" in item:
-                continue
+        user = item.get("user", {}).get("login", "?")
+        body = item.get("body", "") or ""
+        state = item.get("state", "open")
+        created = item.get("created_at", "")
 
-            user = item.get("user", {}).get("login", "?")
-            body = item.get("body", "") or ""
-            state = item.get("state", "open")
-            created = item.get("created_at", "")
+        full_body = (
+            f"📌 *@{user} — {created}*\n"
+            f"🔗 [GitHub]({item.get('html_url', '')})\n\n---\n\n{body}"
+        )
 
-            full_body = (
-                f"📌 *@{user} — {created}*\n"
-                f"🔗 [GitHub]({item.get('html_url', '')})\n\n---\n\n{body}"
-            )
+        gh_labels = [lb["name"] for lb in item.get("labels", [])]
+        ids = [label_map[n] for n in gh_labels if n in label_map]
 
-            gh_labels = [lb["name"] for lb in item.get("labels", [])]
-            ids = [label_map[n] for n in gh_labels if n in label_map]
+        gr = session.post(
+            f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}/issues",
+            json={"title": item["title"], "body": full_body, "labels": ids},
+            timeout=15,
+        )
 
-            gr = session.post(
-                f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}/issues",
-                json={"title": item["title"], "body": full_body, "labels": ids},
-                timeout=15,
-            )
+        if gr.status_code in (200, 201):
+            gn = gr.json()["number"]
+            count += 1
 
-            if gr.status_code in (200, 201):
-                gn = gr.json()["number"]
-                count += 1
+            # کامنت‌ها
+            migrate_comments(item["number"], gn)
 
-                # کامنت‌ها
-                migrate_comments(
-                    f"/repos/{GITHUB_REPO}/issues/{item['number']}/comments",
-                    gn,
+            if state == "closed":
+                session.patch(
+                    f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}"
+                    f"/issues/{gn}",
+                    json={"state": "closed"},
+                    timeout=10,
                 )
 
-                if state == "closed":
-                    session.patch(
-                        f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}"
-                        f"/issues/{gn}",
-                        json={"state": "closed"},
-                        timeout=10,
-                    )
-
-                if count % 20 == 0:
-                    log.info(f"   📊 Issues: {count} منتقل شد")
-
-            time.sleep(0.3)
-
-        page += 1
-        time.sleep(1)
+            if count % 20 == 0:
+                log.info(f"   📊 Issues: {count} منتقل شد")
 
     log.info(f"   ✅ {count} Issue منتقل شد")
     return count
@@ -271,42 +247,21 @@ def migrate_pull_requests(label_map, max_prs=500):
     """
     log.info(f"🔀 انتقال Pull Requests (max {max_prs})...")
     count = 0
-    page = 1
 
-    while count < max_prs:
-        r = github.get(
-            f"/repos/{GITHUB_REPO}/pulls",
-            params={
-                "state": "all",
-                "sort": "created",
-                "direction": "asc",
-                "per_page": 30,
-                "page": page,
-            },
-        )
-        if r.status_code != 200:
-            log.warning(f"   ⚠️ خطای API: {r.status_code}")
-            break
-
-        items = r.json()
-        if not items:
+    for pr in github.paginate(
+        f"/repos/{GITHUB_REPO}/pulls",
+        params={"state": "all", "sort": "created", "direction": "asc"},
+        prefetch=True,
+    ):
+        if count >= max_prs:
             break
 
-        for pr in items:
-            if count >= max_prs:
-                break
-
-            success = create_pr_as_issue(pr, label_map)
-            if success:
-                count += 1
-
-            if count % 20 == 0:
-                log.info(f"   📊 PRs: {count} منتقل شد")
+        success = create_pr_as_issue(pr, label_map)
+        if success:
+            count += 1
 
-            time.sleep(0.5)
-
-        page += 1
-        time.sleep(1)
+        if count % 20 == 0:
+            log.info(f"   📊 PRs: {count} منتقل شد")
 
     log.info(f"   ✅ {count} Pull Request منتقل شد")
     return count
@@ -416,10 +371,8 @@ def create_pr_as_issue(pr: dict, label_map: dict) -> bool:
     gitea_number = resp.json()["number"]
 
     # ── کامنت‌های PR ──
-    migrate_comments(
-        f"/repos/{GITHUB_REPO}/issues/{number}/comments",
-        gitea_number,
-    )
+    migrate_comments(number, gitea_number)
+    migrate_review_comments(number, gitea_number)
 
     # ── بستن اگه بسته یا merge شده ──
     if state == "closed" or merged:
@@ -452,7 +405,6 @@ def get_pr_files(pr_number: int, max_files: int = 30) -> list[dict]:
             "patch": f.get("patch", ""),
         })
 
-    time.sleep(0.3)
     return files
 
 
@@ -478,7 +430,6 @@ def get_pr_reviews(pr_number: int) -> list[dict]:
             "submitted_at": rev.get("submitted_at", ""),
         })
 
-    time.sleep(0.3)
     return reviews
 
 
@@ -486,13 +437,20 @@ def get_pr_reviews(pr_number: int) -> list[dict]:
 # Comments (مشترک بین Issues و PRs)
 # ──────────────────────────────────────────
 
-def migrate_comments(github_comments_url: str, gitea_issue_number: int):
-    """انتقال کامنت‌ها"""
-    r = github.get(github_comments_url, params={"per_page": 50})
-    if r.status_code != 200:
-        return
+def migrate_comments(github_number: int, gitea_issue_number: int):
+    """انتقال کامنت‌ها (از ایندکس دسته‌ای، یا یک درخواست برای این آیتم)"""
+    if comment_index is not None:
+        comments = comment_index.for_issue(github_number, 50)
+    else:
+        r = github.get(
+            f"/repos/{GITHUB_REPO}/issues/{github_number}/comments",
+            params={"per_page": 50},
+        )
+        if r.status_code != 200:
+            return
+        comments = r.json()
 
-    for c in r.json():
+    for c in comments:
         cu = c.get("user", {}).get("login", "?")
         cb = c.get("body", "")
         ct = c.get("created_at", "")
@@ -503,7 +461,26 @@ def migrate_comments(github_comments_url: str, gitea_issue_number: int):
             json={"body": f"💬 *@{cu} — {ct}*\n\n---\n\n{cb}"},
             timeout=10,
         )
-        time.sleep(0.2)
+
+
+def migrate_review_comments(github_number: int, gitea_issue_number: int):
+    """کامنت‌های Review روی خطوط کد (فقط با ایندکس دسته‌ای)"""
+    if comment_index is None:
+        return
+
+    for c in comment_index.for_review(github_number, 50):
+        cu = c.get("user", {}).get("login", "?")
+        line = c.get("line") or c.get("original_line") or ""
+
+        session.post(
+            f"{GITEA_API_BASE}/repos/{GITEA_ORG}/{REPO_NAME}"
+            f"/issues/{gitea_issue_number}/comments",
+            json={"body": (
+                f"🔍 *@{cu} — `{c.get('path', '')}`:{line}*\n\n"
+                f"---\n\n{c.get('body', '')}"
+            )},
+            timeout=10,
+        )
 
 
 # ──────────────────────────────────────────
@@ -511,6 +488,7 @@ def migrate_comments(github_comments_url: str, gitea_issue_number: int):
 # ──────────────────────────────────────────
 
 def main():
+    global comment_index
     log.info(f"🎯 مخزن: {GITHUB_REPO}")
     log.info(f"🏢 مقصد: {GITEA_ORG}/{REPO_NAME}")
 
@@ -535,15 +513,16 @@ def main():
                 log.error("❌ انتقال کد ناموفق")
                 sys.exit(1)
 
-        log.info("⏳ صبر ۳۰ ثانیه...")
-        time.sleep(30)
-
     # ── Labels ──
     log.info("\n" + "=" * 50)
     log.info("🏷️ مرحله ۲: انتقال Labels")
     log.info("=" * 50)
     label_map = migrate_labels()
 
+    # کامنت‌ها: یک پیمایش برای کل مخزن به جای یک درخواست برای هر Issue/PR
+    # (سقف پیش‌فرض migrate_issues + migrate_pull_requests)
+    comment_index = load_repo_comments(github, GITHUB_REPO, 500 + 500, reviews=True)
+
     # ── Issues ──
     log.info("\n" + "=" * 50)
     log.info("🐛 مرحله ۳: انتقال Issues")
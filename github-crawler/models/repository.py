@@ -4,15 +4,31 @@
 
 from __future__ import annotations
 
+import json
 import sqlite3
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
 
 from pydantic import BaseModel, Field
 
-from config.settings import DB_PATH
+from config.settings import (
+    BLOB_DATA_TYPES,
+    DB_PATH,
+    MIN_ISSUES_REQUIRED,
+    MIN_PRS_REQUIRED,
+    MIN_CODE_FILES_REQUIRED,
+    REVALIDATE_MIN_DAYS,
+    REVALIDATE_MAX_DAYS,
+)
+from utils.helpers import git_blob_sha
 from utils.logger import log
 
+# PRAGMA user_version — مهاجرت محتوای درون‌خطی به blobs فقط یک بار اجرا شود
+_BLOB_STORE_VERSION = 1
+# ردیف‌های هر دسته انتقال (و commit) — کل محتوا یک‌جا در حافظه نمی‌آید
+_BLOB_MIGRATION_BATCH = 500
+
 
 # ──────────────────────────────────────────────
 # مدل‌های Pydantic
@@ -70,6 +86,27 @@ class RepositoryInfo(BaseModel):
             topics=data.get("topics", []),
         )
 
+    @classmethod
+    def from_db_row(cls, row: dict) -> RepositoryInfo:
+        """ساخت مدل از ردیف جدول repositories"""
+        return cls(
+            full_name=row["full_name"],
+            owner=row["owner"],
+            name=row["name"],
+            description=row.get("description"),
+            html_url=row.get("html_url") or "",
+            clone_url=row.get("clone_url") or "",
+            language=row.get("language"),
+            stars=row.get("stars") or 0,
+            forks=row.get("forks") or 0,
+            open_issues=row.get("open_issues") or 0,
+            default_branch=row.get("default_branch") or "main",
+            created_at=row.get("created_at"),
+            updated_at=row.get("updated_at"),
+            topics=[t for t in (row.get("topics") or "").split(",") if t],
+            is_training_ready=bool(row.get("is_training_ready")),
+        )
+
     def mark_training_ready(self) -> None:
         """بررسی و علامت‌گذاری آمادگی برای آموزش"""
         self.is_training_ready = all([
@@ -91,6 +128,29 @@ class ValidationResult(BaseModel):
     is_valid: bool = False
     rejection_reasons: list[str] = Field(default_factory=list)
 
+    def closeness(self) -> float:
+        """
+        نزدیکی به قبول شدن (۰ تا ۱) — کمترین نسبت شمارش به آستانه
+        بین بررسی‌های ردشده (بررسی‌های اجرانشده حساب نمی‌شوند)
+        """
+        ratios = []
+        for reason in self.rejection_reasons:
+            if "README" in reason:
+                ratios.append(0.0)
+            elif "Issues" in reason:
+                ratios.append(self.issue_count / MIN_ISSUES_REQUIRED)
+            elif "PRs" in reason:
+                ratios.append(self.pr_count / MIN_PRS_REQUIRED)
+            elif "Code files" in reason:
+                ratios.append(self.code_file_count / MIN_CODE_FILES_REQUIRED)
+        return min(1.0, min(ratios)) if ratios else 0.0
+
+
+def revalidation_delay(closeness: float) -> timedelta:
+    """فاصله تا بررسی مجدد — مخازن نزدیک‌تر به آستانه زودتر"""
+    span = REVALIDATE_MAX_DAYS - REVALIDATE_MIN_DAYS
+    return timedelta(days=REVALIDATE_MIN_DAYS + span * (1 - closeness) ** 2)
+
 
 # ──────────────────────────────────────────────
 # لایه دیتابیس
@@ -104,6 +164,10 @@ class RepositoryDB:
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
 
+        # ایندکس حافظه‌ای مخازن بررسی‌شده (قبول + رد) — در اولین استفاده بارگذاری می‌شود
+        self._checked: set[str] | None = None
+        self._checked_lock = threading.Lock()
+
     def _get_conn(self) -> sqlite3.Connection:
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
@@ -140,6 +204,8 @@ class RepositoryDB:
                     keyword_source     TEXT
                 )
             """)
+            # زمان آخرین استخراج کامل — مبنای تازه‌سازی دوره‌ای
+            self._add_columns(conn, "repositories", {"last_extracted_at": "TEXT"})
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS extracted_data (
                     id          INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -152,6 +218,34 @@ class RepositoryDB:
                     FOREIGN KEY (repo_name) REFERENCES repositories(full_name)
                 )
             """)
+            # کلید یکتای هر آیتم در مخزن (issue:12 / pull_request:7 / code:path)
+            self._add_columns(conn, "extracted_data", {"item_key": "TEXT"})
+            self._backfill_item_keys(conn)
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_extracted_item
+                ON extracted_data(repo_name, item_key)
+            """)
+            self._init_blob_store(conn)
+            # بیشترین updated_at استخراج‌شده هر مخزن — همگام‌سازی افزایشی
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_watermarks (
+                    repo_name       TEXT NOT NULL,
+                    data_type       TEXT NOT NULL,
+                    max_updated_at  TEXT,
+                    synced_at       TEXT,
+                    PRIMARY KEY (repo_name, data_type)
+                )
+            """)
+            # کامیت سر شاخه پیش‌فرض در آخرین استخراج README/کد — بدون تغییر = رد
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_heads (
+                    repo_name   TEXT NOT NULL,
+                    data_type   TEXT NOT NULL,
+                    head_sha    TEXT,
+                    synced_at   TEXT,
+                    PRIMARY KEY (repo_name, data_type)
+                )
+            """)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS rejected_repos (
                     full_name   TEXT PRIMARY KEY,
@@ -159,12 +253,229 @@ class RepositoryDB:
                     checked_at  TEXT DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            # شمارش‌های اندازه‌گیری‌شده و زمان بررسی مجدد (دیتابیس‌های قدیمی)
+            self._add_columns(conn, "rejected_repos", {
+                "has_readme": "INTEGER",
+                "issue_count": "INTEGER",
+                "pr_count": "INTEGER",
+                "code_file_count": "INTEGER",
+                "closeness": "REAL DEFAULT 0",
+                "next_check_at": "TEXT",
+                "check_count": "INTEGER DEFAULT 1",
+            })
+            # واترمارک کرول افزایشی هر کلیدواژه
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_watermarks (
+                    keyword         TEXT NOT NULL,
+                    language        TEXT NOT NULL,
+                    last_run_at     TEXT,
+                    max_pushed_at   TEXT,
+                    max_created_at  TEXT,
+                    complete        INTEGER DEFAULT 0,
+                    PRIMARY KEY (keyword, language)
+                )
+            """)
+            # شروع اولین اجرای پیمایش در جریان (ممکن است چند اجرا طول بکشد)
+            self._add_columns(conn, "crawl_watermarks", {"pass_started_at": "TEXT"})
+            # صف پایدار کرول: نتایج جستجو تا پایان اعتبارسنجی
+            # pending → validating (ادعای یک worker) → accepted / rejected
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_frontier (
+                    full_name   TEXT PRIMARY KEY,
+                    keyword     TEXT NOT NULL,
+                    language    TEXT NOT NULL,
+                    state       TEXT NOT NULL DEFAULT 'pending',
+                    priority    INTEGER DEFAULT 0,
+                    data        TEXT,
+                    claimed_by  TEXT,
+                    claimed_at  TEXT,
+                    enqueued_at TEXT,
+                    updated_at  TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_frontier_claim
+                ON crawl_frontier(keyword, language, state, priority DESC)
+            """)
+            # صفحات جستجوی پیمایش‌شده — برای ادامه بدون تکرار درخواست‌ها
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_checkpoints (
+                    query       TEXT NOT NULL,
+                    page        INTEGER NOT NULL,
+                    total_count INTEGER DEFAULT 0,
+                    item_count  INTEGER DEFAULT 0,
+                    top_stars   INTEGER,
+                    fetched_at  TEXT,
+                    PRIMARY KEY (query, page)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_rejected_next_check
+                ON rejected_repos(next_check_at)
+            """)
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_extracted_repo
                 ON extracted_data(repo_name, data_type)
             """)
+            # هزینه آموخته‌شده هر بررسی اعتبارسنج (ثانیه) و نرخ رد آن
+            # outcomes/fails: اجراهایی که نتیجه‌شان ثبت شده (ردیف‌های قدیمی فقط زمان دارند)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS validation_check_costs (
+                    check_name  TEXT PRIMARY KEY,
+                    runs        INTEGER DEFAULT 0,
+                    seconds     REAL DEFAULT 0,
+                    outcomes    INTEGER DEFAULT 0,
+                    fails       INTEGER DEFAULT 0
+                )
+            """)
+            self._add_columns(conn, "validation_check_costs", {
+                "outcomes": "INTEGER DEFAULT 0",
+                "fails": "INTEGER DEFAULT 0",
+            })
+            # سهمیه صرفه‌جویی‌شده با خروج زودهنگام، به تفکیک ترتیب بررسی‌ها
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS validation_savings (
+                    check_order     TEXT PRIMARY KEY,
+                    validations     INTEGER DEFAULT 0,
+                    early_exits     INTEGER DEFAULT 0,
+                    calls_saved     INTEGER DEFAULT 0,
+                    seconds_saved   REAL DEFAULT 0
+                )
+            """)
         log.debug("دیتابیس آماده شد")
 
+    @staticmethod
+    def _add_columns(
+        conn: sqlite3.Connection, table: str, columns: dict[str, str]
+    ) -> None:
+        """افزودن ستون‌های جدید به جدول موجود"""
+        existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+    @classmethod
+    def _init_blob_store(cls, conn: sqlite3.Connection) -> None:
+        """
+        انبار محتوای آدرس‌دهی‌شده با sha بلاب گیت — فایل‌های یکسان (vendor،
+        fork، کد کپی‌شده) در همه مخازن یک نسخه دارند
+        refcount با تریگرها همگام با ارجاع‌های extracted_data.blob_sha می‌ماند
+        """
+        cls._add_columns(conn, "extracted_data", {"blob_sha": "TEXT"})
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha         TEXT PRIMARY KEY,
+                content     TEXT NOT NULL,
+                size        INTEGER DEFAULT 0,
+                refcount    INTEGER DEFAULT 0,
+                created_at  TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_extracted_blob
+            ON extracted_data(blob_sha)
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_blob_ref_insert
+            AFTER INSERT ON extracted_data WHEN NEW.blob_sha IS NOT NULL
+            BEGIN
+                UPDATE blobs SET refcount = refcount + 1 WHERE sha = NEW.blob_sha;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_blob_ref_delete
+            AFTER DELETE ON extracted_data WHEN OLD.blob_sha IS NOT NULL
+            BEGIN
+                UPDATE blobs SET refcount = refcount - 1 WHERE sha = OLD.blob_sha;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_blob_ref_update
+            AFTER UPDATE OF blob_sha ON extracted_data
+            WHEN OLD.blob_sha IS NOT NEW.blob_sha
+            BEGIN
+                UPDATE blobs SET refcount = refcount - 1 WHERE sha = OLD.blob_sha;
+                UPDATE blobs SET refcount = refcount + 1 WHERE sha = NEW.blob_sha;
+            END
+        """)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < _BLOB_STORE_VERSION:
+            cls._move_content_to_blobs(conn)
+            conn.execute(f"PRAGMA user_version = {_BLOB_STORE_VERSION}")
+
+    @staticmethod
+    def _store_blob(conn: sqlite3.Connection, content: str) -> str:
+        """درج محتوا در blobs (اگر نبود) — sha بلاب گیت برمی‌گردد"""
+        data = content.encode("utf-8")
+        sha = git_blob_sha(data)
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (sha, content, size) VALUES (?,?,?)",
+            (sha, content, len(data)),
+        )
+        return sha
+
+    @classmethod
+    def _move_content_to_blobs(cls, conn: sqlite3.Connection) -> None:
+        """
+        انتقال محتوای درون‌خطی ردیف‌های قدیمی README/کد به blobs
+        دسته‌به‌دسته با commit — اگر وسط کار قطع شود، اجرای بعد ادامه می‌دهد
+        """
+        placeholders = ",".join("?" * len(BLOB_DATA_TYPES))
+        moved = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                f"""SELECT id, content FROM extracted_data
+                    WHERE id > ? AND blob_sha IS NULL AND content IS NOT NULL
+                      AND data_type IN ({placeholders})
+                    ORDER BY id LIMIT ?""",
+                (last_id, *BLOB_DATA_TYPES, _BLOB_MIGRATION_BATCH),
+            ).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                sha = cls._store_blob(conn, row["content"])
+                conn.execute(
+                    "UPDATE extracted_data SET blob_sha=?, content=NULL WHERE id=?",
+                    (sha, row["id"]),
+                )
+            conn.commit()
+            moved += len(rows)
+            last_id = rows[-1]["id"]
+
+        if moved:
+            unique = conn.execute("SELECT COUNT(*) AS c FROM blobs").fetchone()["c"]
+            log.info(f"🧱 extracted_data: {moved} محتوا به {unique} بلاب یکتا منتقل شد")
+
+    @staticmethod
+    def _backfill_item_keys(conn: sqlite3.Connection) -> None:
+        """
+        ساخت item_key برای ردیف‌های قدیمی از روی عنوان و حذف تکراری‌ها
+        (آخرین نسخه هر آیتم می‌ماند)
+        """
+        updated = conn.execute("""
+            UPDATE extracted_data SET item_key = CASE data_type
+                WHEN 'issue'
+                    THEN 'issue:' || substr(title, 2, instr(title, ':') - 2)
+                WHEN 'pull_request'
+                    THEN 'pull_request:' || substr(title, 5, instr(title, ':') - 5)
+                WHEN 'readme' THEN 'readme'
+                WHEN 'code' THEN 'code:' || title
+            END
+            WHERE item_key IS NULL
+              AND data_type IN ('issue', 'pull_request', 'readme', 'code')
+        """).rowcount
+        if not updated:
+            return
+        removed = conn.execute("""
+            DELETE FROM extracted_data
+            WHERE item_key IS NOT NULL AND id NOT IN (
+                SELECT MAX(id) FROM extracted_data
+                WHERE item_key IS NOT NULL
+                GROUP BY repo_name, item_key
+            )
+        """).rowcount
+        log.info(f"🧹 extracted_data: {updated} کلید ساخته شد، {removed} ردیف تکراری حذف شد")
+
     def upsert_repository(
         self, repo: RepositoryInfo, keyword: str = ""
     ) -> None:
@@ -214,6 +525,7 @@ class RepositoryDB:
                     keyword,
                 ),
             )
+        self._mark_checked(repo.full_name)
 
     def save_extracted_data(
         self,
@@ -222,36 +534,630 @@ class RepositoryDB:
         title: str,
         content: str,
         metadata: str = "",
+        item_key: str | None = None,
     ) -> None:
-        """ذخیره داده استخراج‌شده"""
+        """
+        ذخیره داده استخراج‌شده — با item_key، نسخه قبلی همان آیتم جایگزین می‌شود
+        محتوای BLOB_DATA_TYPES (README/کد) در blobs و ردیف فقط با blob_sha ارجاع می‌دهد
+        """
         with self._get_conn() as conn:
+            blob_sha = None
+            if data_type in BLOB_DATA_TYPES and content is not None:
+                blob_sha = self._store_blob(conn, content)
+                content = None
             conn.execute(
                 """INSERT INTO extracted_data
-                   (repo_name, data_type, title, content, metadata)
-                   VALUES (?,?,?,?,?)""",
-                (repo_name, data_type, title, content, metadata),
+                   (repo_name, data_type, title, content, metadata, item_key, blob_sha)
+                   VALUES (?,?,?,?,?,?,?)
+                   ON CONFLICT(repo_name, item_key) DO UPDATE SET
+                       title=excluded.title,
+                       content=excluded.content,
+                       metadata=excluded.metadata,
+                       blob_sha=excluded.blob_sha""",
+                (repo_name, data_type, title, content, metadata, item_key, blob_sha),
+            )
+
+    def iter_extracted_data(self, repo_name: str | None = None):
+        """
+        ردیف‌های extracted_data با blob_sha (بدون محتوای بلاب)؛ محتوای
+        هر بلاب یکتا جداگانه با iter_blobs خوانده می‌شود
+        """
+        query = """SELECT repo_name, data_type, item_key, title, content,
+                          metadata, blob_sha, created_at
+                   FROM extracted_data"""
+        params: tuple = ()
+        if repo_name:
+            query += " WHERE repo_name=?"
+            params = (repo_name,)
+        with self._get_conn() as conn:
+            for row in conn.execute(query + " ORDER BY repo_name, id", params):
+                yield dict(row)
+
+    def iter_blobs(self, repo_name: str | None = None):
+        """بلاب‌های ارجاع‌شده — هر sha یک بار، حتی اگر در چند مخزن باشد"""
+        query = "SELECT sha, content, size FROM blobs WHERE refcount > 0"
+        params: tuple = ()
+        if repo_name:
+            query = """SELECT sha, content, size FROM blobs WHERE sha IN (
+                           SELECT blob_sha FROM extracted_data WHERE repo_name=?
+                       )"""
+            params = (repo_name,)
+        with self._get_conn() as conn:
+            for row in conn.execute(query, params):
+                yield dict(row)
+
+    def gc_blobs(self, vacuum: bool = False) -> tuple[int, int]:
+        """
+        حذف بلاب‌های بدون ارجاع — refcount اول از روی extracted_data بازشماری
+        می‌شود تا خطای احتمالی شمارش چیزی را پاک نکند
+        خروجی: (تعداد حذف‌شده، بایت آزادشده)
+        """
+        with self._get_conn() as conn:
+            conn.execute("""
+                UPDATE blobs SET refcount = (
+                    SELECT COUNT(*) FROM extracted_data WHERE blob_sha = blobs.sha
+                )
+            """)
+            row = conn.execute(
+                """SELECT COUNT(*) AS c, COALESCE(SUM(size), 0) AS b
+                   FROM blobs WHERE refcount <= 0"""
+            ).fetchone()
+            conn.execute("DELETE FROM blobs WHERE refcount <= 0")
+        if vacuum:
+            conn = self._get_conn()
+            conn.execute("VACUUM")
+            conn.close()
+        return row["c"], row["b"]
+
+    def get_blob_stats(self) -> dict:
+        """حجم انبار بلاب و صرفه‌جویی حذف تکراری"""
+        with self._get_conn() as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS blobs,
+                       COALESCE(SUM(size), 0) AS stored,
+                       COALESCE(SUM(size * refcount), 0) AS referenced,
+                       COALESCE(SUM(refcount), 0) AS refs,
+                       COALESCE(SUM(refcount <= 0), 0) AS orphans
+                FROM blobs
+            """).fetchone()
+        mb = 1024 * 1024
+        return {
+            "unique_blobs": row["blobs"],
+            "references": row["refs"],
+            "stored_mb": round(row["stored"] / mb, 2),
+            "dedup_saved_mb": round((row["referenced"] - row["stored"]) / mb, 2),
+            "orphans": row["orphans"],
+        }
+
+    def get_extraction_watermark(
+        self, repo_name: str, data_type: str
+    ) -> str | None:
+        """بیشترین updated_at استخراج‌شده (None = اولین استخراج)"""
+        with self._get_conn() as conn:
+            row = conn.execute(
+                """SELECT max_updated_at FROM extraction_watermarks
+                   WHERE repo_name=? AND data_type=?""",
+                (repo_name, data_type),
+            ).fetchone()
+            return row["max_updated_at"] if row else None
+
+    def save_extraction_watermark(
+        self, repo_name: str, data_type: str, max_updated_at: str | None
+    ) -> None:
+        """ثبت همگام‌سازی — واترمارک هیچ‌وقت عقب نمی‌رود"""
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT INTO extraction_watermarks
+                   (repo_name, data_type, max_updated_at, synced_at)
+                   VALUES (?,?,?,?)
+                   ON CONFLICT(repo_name, data_type) DO UPDATE SET
+                       max_updated_at=MAX(
+                           COALESCE(max_updated_at, ''),
+                           COALESCE(excluded.max_updated_at, '')
+                       ),
+                       synced_at=excluded.synced_at""",
+                (
+                    repo_name, data_type, max_updated_at,
+                    datetime.utcnow().isoformat(),
+                ),
             )
 
-    def save_rejected(self, full_name: str, reason: str) -> None:
-        """ذخیره مخزن رد شده"""
+    def get_extraction_head(self, repo_name: str, data_type: str) -> str | None:
+        """sha کامیت سر شاخه در آخرین استخراج کامل این نوع داده"""
+        with self._get_conn() as conn:
+            row = conn.execute(
+                """SELECT head_sha FROM extraction_heads
+                   WHERE repo_name=? AND data_type=?""",
+                (repo_name, data_type),
+            ).fetchone()
+            return row["head_sha"] if row else None
+
+    def save_extraction_head(
+        self, repo_name: str, data_type: str, head_sha: str
+    ) -> None:
         with self._get_conn() as conn:
             conn.execute(
-                """INSERT OR REPLACE INTO rejected_repos
-                   (full_name, reason, checked_at)
-                   VALUES (?,?,?)""",
-                (full_name, reason, datetime.utcnow().isoformat()),
+                """INSERT INTO extraction_heads
+                   (repo_name, data_type, head_sha, synced_at)
+                   VALUES (?,?,?,?)
+                   ON CONFLICT(repo_name, data_type) DO UPDATE SET
+                       head_sha=excluded.head_sha,
+                       synced_at=excluded.synced_at""",
+                (repo_name, data_type, head_sha, datetime.utcnow().isoformat()),
             )
 
+    def get_stored_shas(self, repo_name: str, data_type: str) -> dict[str, str]:
+        """item_key → sha بلاب ذخیره‌شده در metadata (برای تشخیص تغییر)"""
+        return self.get_stored_metadata(repo_name, data_type, "sha")
+
+    def get_stored_metadata(
+        self, repo_name: str, data_type: str, field: str
+    ) -> dict[str, str]:
+        """item_key → مقدار یک فیلد metadata (آیتم‌های بدون آن فیلد حذف می‌شوند)"""
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                """SELECT item_key, metadata FROM extracted_data
+                   WHERE repo_name=? AND data_type=? AND item_key IS NOT NULL""",
+                (repo_name, data_type),
+            ).fetchall()
+        values: dict[str, str] = {}
+        for row in rows:
+            try:
+                value = json.loads(row["metadata"] or "{}").get(field)
+            except (ValueError, AttributeError):
+                continue
+            if value:
+                values[row["item_key"]] = value
+        return values
+
+    def delete_extracted_items(self, repo_name: str, item_keys: list[str]) -> int:
+        """حذف آیتم‌هایی که دیگر در مخزن نیستند (مثلاً فایل پاک‌شده)"""
+        if not item_keys:
+            return 0
+        with self._get_conn() as conn:
+            return conn.executemany(
+                "DELETE FROM extracted_data WHERE repo_name=? AND item_key=?",
+                [(repo_name, key) for key in item_keys],
+            ).rowcount
+
+    def save_rejected(
+        self,
+        full_name: str,
+        reason: str,
+        result: ValidationResult | None = None,
+    ) -> None:
+        """ذخیره مخزن رد شده همراه شمارش‌ها و زمان بررسی مجدد"""
+        now = datetime.utcnow()
+        closeness = result.closeness() if result else 0.0
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT INTO rejected_repos
+                   (full_name, reason, checked_at, has_readme, issue_count,
+                    pr_count, code_file_count, closeness, next_check_at)
+                   VALUES (?,?,?,?,?,?,?,?,?)
+                   ON CONFLICT(full_name) DO UPDATE SET
+                       reason=excluded.reason,
+                       checked_at=excluded.checked_at,
+                       has_readme=excluded.has_readme,
+                       issue_count=excluded.issue_count,
+                       pr_count=excluded.pr_count,
+                       code_file_count=excluded.code_file_count,
+                       closeness=excluded.closeness,
+                       next_check_at=excluded.next_check_at,
+                       check_count=COALESCE(check_count, 1) + 1""",
+                (
+                    full_name, reason, now.isoformat(),
+                    int(result.has_readme) if result else None,
+                    result.issue_count if result else None,
+                    result.pr_count if result else None,
+                    result.code_file_count if result else None,
+                    closeness,
+                    (now + revalidation_delay(closeness)).isoformat(),
+                ),
+            )
+        self._mark_checked(full_name)
+
+    def get_due_rejects(self, limit: int) -> list[dict]:
+        """ردشده‌هایی که زمان بررسی مجددشان رسیده — امیدوارکننده‌ترین اول"""
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                """SELECT * FROM rejected_repos
+                   WHERE next_check_at IS NULL OR next_check_at <= ?
+                   ORDER BY closeness DESC, next_check_at ASC
+                   LIMIT ?""",
+                (datetime.utcnow().isoformat(), limit),
+            ).fetchall()
+            return [dict(r) for r in rows]
+
+    def reschedule_rejected(self, full_name: str, closeness: float) -> None:
+        """تغییری نکرده — فقط زمان بررسی بعدی جلو می‌رود"""
+        now = datetime.utcnow()
+        with self._get_conn() as conn:
+            conn.execute(
+                """UPDATE rejected_repos
+                   SET checked_at=?, next_check_at=?,
+                       check_count=COALESCE(check_count, 1) + 1
+                   WHERE full_name=?""",
+                (
+                    now.isoformat(),
+                    (now + revalidation_delay(closeness or 0.0)).isoformat(),
+                    full_name,
+                ),
+            )
+
+    def remove_rejected(self, full_name: str) -> None:
+        """حذف از ردشده‌ها (بعد از قبول در بازبینی)"""
+        with self._get_conn() as conn:
+            conn.execute(
+                "DELETE FROM rejected_repos WHERE full_name=?", (full_name,)
+            )
+
+    def _checked_index(self) -> set[str]:
+        """بارگذاری یک‌باره نام همه مخازن بررسی‌شده"""
+        with self._checked_lock:
+            if self._checked is None:
+                with self._get_conn() as conn:
+                    self._checked = {
+                        r["full_name"]
+                        for r in conn.execute(
+                            """SELECT full_name FROM repositories
+                               UNION SELECT full_name FROM rejected_repos"""
+                        )
+                    }
+                log.debug(f"🗂️ ایندکس بررسی‌شده‌ها: {len(self._checked)} مخزن")
+            return self._checked
+
+    def _mark_checked(self, full_name: str) -> None:
+        with self._checked_lock:
+            if self._checked is not None:
+                self._checked.add(full_name)
+
     def is_already_checked(self, full_name: str) -> bool:
-        """آیا قبلاً بررسی شده؟"""
+        """آیا قبلاً بررسی شده؟ (ایندکس حافظه، در نبودن آنجا یک کوئری)"""
+        return full_name in self.checked_among([full_name])
+
+    def checked_among(self, full_names: list[str]) -> set[str]:
+        """
+        کدام‌یک از این مخازن قبلاً بررسی شده‌اند؟
+        ایندکس حافظه فقط تصمیم‌های همین پروسه را می‌بیند — نام‌هایی که آنجا
+        نیستند با یک کوئری از دیتابیس پرسیده می‌شوند (قبول/رد workerهای دیگر)
+        """
+        index = self._checked_index()
+        with self._checked_lock:
+            found = {name for name in full_names if name in index}
+        missing = list(dict.fromkeys(n for n in full_names if n not in found))
+        if not missing:
+            return found
+
+        marks = ",".join("?" * len(missing))
+        with self._get_conn() as conn:
+            others = {
+                r["full_name"]
+                for r in conn.execute(
+                    f"""SELECT full_name FROM repositories WHERE full_name IN ({marks})
+                        UNION SELECT full_name FROM rejected_repos
+                        WHERE full_name IN ({marks})""",
+                    missing + missing,
+                )
+            }
+        if others:
+            with self._checked_lock:
+                index.update(others)
+        return found | others
+
+    # ──────────────────────────────────────────
+    # آمار اعتبارسنجی
+    # ──────────────────────────────────────────
+
+    def get_check_stats(self) -> dict[str, dict]:
+        """
+        آمار هر بررسی: {check: {"cost", "outcomes", "fails"}}
+        cost میانگین زمان است؛ fails/outcomes نرخ رد همان بررسی در
+        اجراهایی است که واقعاً به آن رسیده‌اند (بدون سوگیری خروج زودهنگام)
+        """
+        with self._get_conn() as conn:
+            return {
+                r["check_name"]: {
+                    "cost": r["seconds"] / r["runs"],
+                    "outcomes": r["outcomes"],
+                    "fails": r["fails"],
+                }
+                for r in conn.execute(
+                    "SELECT * FROM validation_check_costs WHERE runs > 0"
+                )
+            }
+
+    def record_check_costs(self, costs: dict[str, tuple[int, int, float]]) -> None:
+        """افزودن مشاهدات جدید: {check: (runs, fails, seconds)}"""
         with self._get_conn() as conn:
-            r1 = conn.execute(
-                "SELECT 1 FROM repositories WHERE full_name=?", (full_name,)
+            conn.executemany(
+                """INSERT INTO validation_check_costs
+                   (check_name, runs, seconds, outcomes, fails)
+                   VALUES (?,?,?,?,?)
+                   ON CONFLICT(check_name) DO UPDATE SET
+                       runs = runs + excluded.runs,
+                       seconds = seconds + excluded.seconds,
+                       outcomes = outcomes + excluded.outcomes,
+                       fails = fails + excluded.fails""",
+                [
+                    (name, runs, secs, runs, fails)
+                    for name, (runs, fails, secs) in costs.items()
+                ],
+            )
+
+    def record_validation_savings(
+        self,
+        check_order: str,
+        validations: int,
+        early_exits: int,
+        calls_saved: int,
+        seconds_saved: float,
+    ) -> None:
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT INTO validation_savings
+                   (check_order, validations, early_exits, calls_saved, seconds_saved)
+                   VALUES (?,?,?,?,?)
+                   ON CONFLICT(check_order) DO UPDATE SET
+                       validations = validations + excluded.validations,
+                       early_exits = early_exits + excluded.early_exits,
+                       calls_saved = calls_saved + excluded.calls_saved,
+                       seconds_saved = seconds_saved + excluded.seconds_saved""",
+                (check_order, validations, early_exits, calls_saved, seconds_saved),
+            )
+
+    def get_validation_savings(self) -> list[dict]:
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                "SELECT * FROM validation_savings ORDER BY validations DESC"
+            ).fetchall()
+            return [dict(r) for r in rows]
+
+    # ──────────────────────────────────────────
+    # واترمارک کرول افزایشی
+    # ──────────────────────────────────────────
+
+    def get_watermark(self, keyword: str, language: str) -> dict | None:
+        with self._get_conn() as conn:
+            row = conn.execute(
+                "SELECT * FROM crawl_watermarks WHERE keyword=? AND language=?",
+                (keyword, language),
             ).fetchone()
-            r2 = conn.execute(
-                "SELECT 1 FROM rejected_repos WHERE full_name=?", (full_name,)
+            return dict(row) if row else None
+
+    def begin_watermark_pass(self, keyword: str, language: str) -> str:
+        """
+        زمان شروع پیمایش در جریان — اولین اجرا ثبتش می‌کند و اجراهای بعدی
+        (ادامه از چک‌پوینت‌ها و صف) همان را می‌گیرند تا پیمایش تمام شود
+        """
+        now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT INTO crawl_watermarks (keyword, language, pass_started_at)
+                   VALUES (?,?,?)
+                   ON CONFLICT(keyword, language) DO UPDATE SET
+                       pass_started_at=COALESCE(pass_started_at, excluded.pass_started_at)""",
+                (keyword, language, now),
+            )
+            return conn.execute(
+                """SELECT pass_started_at FROM crawl_watermarks
+                   WHERE keyword=? AND language=?""",
+                (keyword, language),
+            ).fetchone()["pass_started_at"]
+
+    def save_watermark(
+        self,
+        keyword: str,
+        language: str,
+        max_pushed_at: str | None,
+        max_created_at: str | None,
+        complete: bool,
+    ) -> None:
+        """
+        ثبت اجرای یک کلیدواژه — واترمارک فقط وقتی جلو می‌رود که
+        همه نتایج کوئری پیمایش شده باشد (complete)؛ پیمایش بعدی از نو شروع می‌شود
+        """
+        now = datetime.utcnow().isoformat()
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT INTO crawl_watermarks
+                   (keyword, language, last_run_at, max_pushed_at,
+                    max_created_at, complete)
+                   VALUES (?,?,?,?,?,?)
+                   ON CONFLICT(keyword, language) DO UPDATE SET
+                       last_run_at=excluded.last_run_at""",
+                (
+                    keyword, language, now,
+                    max_pushed_at if complete else None,
+                    max_created_at if complete else None,
+                    int(complete),
+                ),
+            )
+            if complete:
+                conn.execute(
+                    """UPDATE crawl_watermarks SET
+                           max_pushed_at=MAX(COALESCE(max_pushed_at, ''), ?),
+                           max_created_at=MAX(COALESCE(max_created_at, ''), ?),
+                           complete=1,
+                           pass_started_at=NULL
+                       WHERE keyword=? AND language=?""",
+                    (max_pushed_at or "", max_created_at or "", keyword, language),
+                )
+
+    # ──────────────────────────────────────────
+    # صف پایدار کرول (frontier)
+    # ──────────────────────────────────────────
+
+    def enqueue_frontier(
+        self, keyword: str, language: str, items: list[dict]
+    ) -> int:
+        """
+        افزودن نتایج جستجو با اولویت ستاره — تکراری‌ها (هر وضعیتی) نادیده
+        گرفته می‌شوند؛ تعداد واقعاً اضافه‌شده را برمی‌گرداند
+        """
+        now = datetime.utcnow().isoformat()
+        with self._get_conn() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                """INSERT OR IGNORE INTO crawl_frontier
+                   (full_name, keyword, language, state, priority, data,
+                    enqueued_at, updated_at)
+                   VALUES (?,?,?,'pending',?,?,?,?)""",
+                [
+                    (
+                        item["full_name"], keyword, language,
+                        item.get("stargazers_count", 0),
+                        json.dumps(item), now, now,
+                    )
+                    for item in items
+                ],
+            )
+            return conn.total_changes - before
+
+    def claim_frontier(
+        self,
+        keyword: str,
+        language: str,
+        worker: str,
+        limit: int,
+        stale_minutes: int,
+    ) -> list[dict]:
+        """
+        ادعای اتمی پرستاره‌ترین مخازن در انتظار برای یک worker
+        (BEGIN IMMEDIATE — دو پروسه هرگز یک مخزن را نمی‌گیرند)
+        ادعاهای قدیمی‌تر از stale_minutes اول به صف برمی‌گردند
+        """
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        stale = (now - timedelta(minutes=stale_minutes)).isoformat()
+
+        conn = self._get_conn()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            released = conn.execute(
+                """UPDATE crawl_frontier
+                   SET state='pending', claimed_by=NULL, claimed_at=NULL
+                   WHERE state='validating' AND claimed_at < ?""",
+                (stale,),
+            ).rowcount
+            rows = conn.execute(
+                """SELECT full_name, data FROM crawl_frontier
+                   WHERE keyword=? AND language=? AND state='pending'
+                   ORDER BY priority DESC LIMIT ?""",
+                (keyword, language, limit),
+            ).fetchall()
+            conn.executemany(
+                """UPDATE crawl_frontier
+                   SET state='validating', claimed_by=?, claimed_at=?, updated_at=?
+                   WHERE full_name=?""",
+                [
+                    (worker, now.isoformat(), now.isoformat(), r["full_name"])
+                    for r in rows
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        if released:
+            log.warning(f"   ♻️ {released} ادعای رهاشده به صف کرول برگشت")
+        return [json.loads(r["data"]) for r in rows]
+
+    def finish_frontier(self, full_name: str, state: str) -> None:
+        """ثبت نتیجه نهایی (accepted / rejected)"""
+        with self._get_conn() as conn:
+            conn.execute(
+                """UPDATE crawl_frontier
+                   SET state=?, claimed_by=NULL, updated_at=?
+                   WHERE full_name=?""",
+                (state, datetime.utcnow().isoformat(), full_name),
+            )
+
+    def release_frontier(self, full_names: list[str]) -> None:
+        """برگرداندن ادعاهای ناتمام (لغو / مازاد هدف) به صف"""
+        if not full_names:
+            return
+        now = datetime.utcnow().isoformat()
+        with self._get_conn() as conn:
+            conn.executemany(
+                """UPDATE crawl_frontier
+                   SET state='pending', claimed_by=NULL, claimed_at=NULL,
+                       updated_at=?
+                   WHERE full_name=? AND state='validating'""",
+                [(now, name) for name in full_names],
+            )
+
+    def get_frontier_counts(
+        self, keyword: str | None = None, language: str | None = None
+    ) -> dict[str, int]:
+        """تعداد مخازن صف به تفکیک وضعیت"""
+        sql = "SELECT state, COUNT(*) AS c FROM crawl_frontier"
+        params: tuple = ()
+        if keyword is not None:
+            sql += " WHERE keyword=? AND language=?"
+            params = (keyword, language)
+        with self._get_conn() as conn:
+            return {
+                r["state"]: r["c"]
+                for r in conn.execute(sql + " GROUP BY state", params)
+            }
+
+    def get_search_checkpoint(
+        self, query: str, page: int, ttl_hours: int
+    ) -> dict | None:
+        """صفحه جستجوی پیمایش‌شده در TTL (بدون آیتم‌ها — آن‌ها در صف‌اند)"""
+        fresh = (datetime.utcnow() - timedelta(hours=ttl_hours)).isoformat()
+        with self._get_conn() as conn:
+            row = conn.execute(
+                """SELECT * FROM search_checkpoints
+                   WHERE query=? AND page=? AND fetched_at >= ?""",
+                (query, page, fresh),
             ).fetchone()
-            return r1 is not None or r2 is not None
+            return dict(row) if row else None
+
+    def save_search_checkpoint(
+        self,
+        query: str,
+        page: int,
+        total_count: int,
+        item_count: int,
+        top_stars: int | None = None,
+    ) -> None:
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO search_checkpoints
+                   (query, page, total_count, item_count, top_stars, fetched_at)
+                   VALUES (?,?,?,?,?,?)""",
+                (
+                    query, page, total_count, item_count, top_stars,
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+
+    def clear_search_checkpoints(
+        self, query_prefix: str = "", ttl_hours: int | None = None
+    ) -> int:
+        """
+        حذف چک‌پوینت‌های یک کوئری پایه (بعد از پیمایش کامل)
+        یا همه چک‌پوینت‌های منقضی (ttl_hours)
+        """
+        sql = "DELETE FROM search_checkpoints WHERE 1=1"
+        params: list = []
+        if query_prefix:
+            sql += " AND substr(query, 1, ?) = ?"
+            params += [len(query_prefix), query_prefix]
+        if ttl_hours is not None:
+            sql += " AND fetched_at < ?"
+            params.append(
+                (datetime.utcnow() - timedelta(hours=ttl_hours)).isoformat()
+            )
+        with self._get_conn() as conn:
+            return conn.execute(sql, params).rowcount
 
     def mark_migrated(self, full_name: str) -> None:
         with self._get_conn() as conn:
@@ -288,6 +1194,31 @@ class RepositoryDB:
             ).fetchall()
             return [dict(r) for r in rows]
 
+    def mark_extracted(self, full_name: str) -> None:
+        """ثبت زمان آخرین استخراج کامل یک مخزن"""
+        with self._get_conn() as conn:
+            conn.execute(
+                "UPDATE repositories SET last_extracted_at=? WHERE full_name=?",
+                (datetime.utcnow().isoformat(), full_name),
+            )
+
+    def get_refresh_due(self, interval_hours: int, limit: int) -> list[dict]:
+        """
+        مخازن آماده آموزش که آخرین استخراجشان قدیمی‌تر از interval_hours است
+        (هرگز استخراج‌نشده‌ها اول، بعد قدیمی‌ترین‌ها)
+        """
+        stale = (datetime.utcnow() - timedelta(hours=interval_hours)).isoformat()
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                """SELECT * FROM repositories
+                   WHERE is_training_ready=1
+                     AND (last_extracted_at IS NULL OR last_extracted_at <= ?)
+                   ORDER BY last_extracted_at IS NOT NULL, last_extracted_at ASC
+                   LIMIT ?""",
+                (stale, limit),
+            ).fetchall()
+            return [dict(r) for r in rows]
+
     def get_all(self) -> list[dict]:
         with self._get_conn() as conn:
             rows = conn.execute(
@@ -330,4 +1261,6 @@ class RepositoryDB:
             "rejected": rejected,
             "total_extracted_records": data_count,
             "extracted_by_type": type_stats,
+            "frontier_by_state": self.get_frontier_counts(),
+            "blob_store": self.get_blob_stats(),
         }
\ No newline at end of file
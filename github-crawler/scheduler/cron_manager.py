@@ -11,21 +11,33 @@ from datetime import datetime
 
 import schedule
 
-from config.settings import CRON_INTERVAL_HOURS, PROJECTS_PER_KEYWORD, SEARCH_KEYWORDS
+from config.settings import (
+    CRON_INTERVAL_HOURS,
+    PROJECTS_PER_KEYWORD,
+    REFRESH_BATCH,
+    REFRESH_INTERVAL_HOURS,
+    SEARCH_KEYWORDS,
+)
 from core.data_extractor import DataExtractor
 from core.gitea_migrator import GiteaMigrator
 from core.github_crawler import GitHubCrawler
-from models.repository import RepositoryDB
+from core.revalidator import Revalidator
+from models.repository import RepositoryDB, RepositoryInfo
 from utils.logger import log
 
 
 class CronManager:
     """اجرای زمان‌بندی‌شده پایپلاین"""
 
-    def __init__(self):
-        self.db = RepositoryDB()
+    def __init__(self, db: RepositoryDB | None = None):
+        self.db = db or RepositoryDB()
         self.crawler = GitHubCrawler(self.db)
-        self.extractor = DataExtractor(self.db, self.crawler.rate_limiter)
+        self.extractor = DataExtractor(
+            self.db, self.crawler.rate_limiter, artifacts=self.crawler.artifacts
+        )
+        self.revalidator = Revalidator(
+            self.db, self.crawler.rate_limiter, self.crawler.validator
+        )
         self.migrator = GiteaMigrator(self.db)
         self._running = True
 
@@ -60,17 +72,29 @@ class CronManager:
             log.info("\n📡 [bold]مرحله ۱: کرول و اعتبارسنجی[/]")
             valid_repos = self.crawler.search_repositories()
 
+            # ── مرحله ۱.۵: بازبینی ردشده‌ها با سهمیه باقی‌مانده ──
+            log.info("\n♻️ [bold]بازبینی مخازن ردشده[/]")
+            valid_repos += self.revalidator.run()
+
             # ── مرحله ۲: استخراج کامل ──
             log.info("\n📥 [bold]مرحله ۲: استخراج داده‌های آموزشی[/]")
             for i, repo in enumerate(valid_repos, 1):
                 log.info(f"\n── [{i}/{len(valid_repos)}] ──")
                 self.extractor.extract_all(repo)
-                time.sleep(1)
+
+            # ── مرحله ۲.۵: تازه‌سازی مخازن قبلی (فقط فعالیت جدید) ──
+            log.info("\n🔄 [bold]تازه‌سازی مخازن قبلی[/]")
+            refreshed = self.refresh_known_repos()
 
             # ── مرحله ۳: انتقال ──
             log.info("\n🚀 [bold]مرحله ۳: انتقال به Gitea[/]")
             migration = self.migrator.migrate_all_pending()
 
+            # ── بلاب‌هایی که دیگر ارجاعی ندارند (فایل‌های حذف/تغییرکرده) ──
+            removed, freed = self.db.gc_blobs()
+            if removed:
+                log.info(f"🧹 {removed} بلاب بی‌ارجاع حذف شد ({freed / 1024 / 1024:.1f}MB)")
+
             # ── گزارش ──
             elapsed = (datetime.utcnow() - start).total_seconds()
             stats = self.db.get_stats()
@@ -79,6 +103,7 @@ class CronManager:
             log.info("📊 [bold green]گزارش نهایی[/]")
             log.info(f"   ⏱️  مدت اجرا: {elapsed:.0f} ثانیه ({elapsed/60:.1f} دقیقه)")
             log.info(f"   🔍 پروژه‌های واجد شرایط: {len(valid_repos)}")
+            log.info(f"   🔄 تازه‌سازی‌شده: {refreshed}")
             log.info(f"   ✅ انتقال موفق: {migration['success']}")
             log.info(f"   ❌ انتقال ناموفق: {migration['failed']}")
             log.info(f"   🗄️  کل در دیتابیس: {stats['total_repos']}")
@@ -92,6 +117,27 @@ class CronManager:
 
         except Exception as e:
             log.exception(f"❌ خطای پایپلاین: {e}")
+        finally:
+            # کش آرتیفکت فقط برای همین اجرا — اجرای بعدی داده تازه می‌گیرد
+            self.crawler.artifacts.summary()
+            self.crawler.artifacts.clear()
+
+    def refresh_known_repos(self, max_repos: int = REFRESH_BATCH) -> int:
+        """
+        استخراج دوباره مخازن آماده آموزش که آخرین استخراجشان قدیمی‌تر از
+        REFRESH_INTERVAL_HOURS است — مخازن قبلی در کرول رد تکراری می‌شوند و
+        جز اینجا به استخراج نمی‌رسند؛ Issues/PRs از واترمارک (since=) و
+        README/کد فقط اگر head شاخه عوض شده باشد، پس هزینه متناسب با فعالیت جدید است
+        """
+        due = self.db.get_refresh_due(REFRESH_INTERVAL_HOURS, max_repos)
+        if not due:
+            log.info("   🔄 مخزنی برای تازه‌سازی سررسید نشده")
+            return 0
+
+        for i, row in enumerate(due, 1):
+            log.info(f"\n── 🔄 [{i}/{len(due)}] ──")
+            self.extractor.extract_all(RepositoryInfo.from_db_row(row))
+        return len(due)
 
     def start_scheduler(self) -> None:
         """شروع زمان‌بند"""
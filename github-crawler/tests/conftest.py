@@ -0,0 +1,39 @@
+"""
+تنظیمات مشترک تست‌ها
+لاگ، دیتابیس و کش HTTP به پوشه موقت می‌روند تا فایل‌های data/ دست نخورند
+(قبل از import تنظیمات — load_dotenv متغیرهای موجود را بازنویسی نمی‌کند)
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_TMP = tempfile.mkdtemp(prefix="crawler-tests-")
+os.environ["LOG_FILE"] = os.path.join(_TMP, "crawler.log")
+os.environ["DB_PATH"] = os.path.join(_TMP, "repositories.db")
+os.environ["HTTP_CACHE_PATH"] = os.path.join(_TMP, "http_cache.db")
+os.environ["HTTP_CACHE_ENABLED"] = "false"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+from models.repository import RepositoryDB  # noqa: E402
+
+
+class FakeResponse:
+    """پاسخ ساده برای جایگزینی requests.Response"""
+
+    def __init__(self, status_code: int, body=None, headers: dict | None = None):
+        self.status_code = status_code
+        self._body = body if body is not None else {}
+        self.headers = headers or {}
+
+    def json(self):
+        return self._body
+
+
+@pytest.fixture
+def db(tmp_path) -> RepositoryDB:
+    return RepositoryDB(str(tmp_path / "repositories.db"))
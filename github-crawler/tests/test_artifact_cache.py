@@ -0,0 +1,107 @@
+"""کش آرتیفکت اجرا: LRU حافظه، سرریز دیسک و یک دریافت برای درخواست‌های هم‌زمان"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from core.artifact_cache import ArtifactCache
+
+
+@pytest.fixture
+def cache(tmp_path) -> ArtifactCache:
+    cache = ArtifactCache(spill_dir=str(tmp_path))
+    yield cache
+    cache.clear()
+
+
+def _value(tag: str) -> dict:
+    return {"tag": tag, "pad": "x" * 80}   # حدود ۱۰۰ بایت JSON
+
+
+def test_roundtrip_and_key_parts(cache):
+    cache.put("o/r", "tree", "main", [{"path": "a.py"}])
+    cache.put("o/r", "readme", "main", None)   # None کش نمی‌شود
+
+    assert cache.get("o/r", "tree", "main") == [{"path": "a.py"}]
+    assert cache.get("o/r", "tree", "dev") is None
+    assert cache.get("o/r", "readme", "main") is None
+
+
+def test_returned_values_are_copies(cache):
+    cache.put("o/r", "tree", "main", [{"path": "a.py"}])
+    cache.get("o/r", "tree", "main").append({"path": "b.py"})
+    assert cache.get("o/r", "tree", "main") == [{"path": "a.py"}]
+
+
+def test_least_recently_used_spills_and_comes_back(cache):
+    cache.max_bytes = 250
+    cache.put("o/r", "pr_files/1", "", _value("a"))
+    cache.put("o/r", "pr_files/2", "", _value("b"))
+    cache.get("o/r", "pr_files/1")                  # a تازه شد — b قدیمی‌ترین است
+    cache.put("o/r", "pr_files/3", "", _value("c"))
+
+    assert list(cache._disk) == [("o/r", "pr_files/2", "")]
+    spilled = cache._disk[("o/r", "pr_files/2", "")]
+    assert os.path.exists(spilled)
+
+    assert cache.get("o/r", "pr_files/2") == _value("b")
+    assert not os.path.exists(spilled)
+    assert cache.stats["disk_hits"] == 1
+    # برگشت b به حافظه، قدیمی‌ترین بعدی (a) را بیرون می‌برد
+    assert list(cache._disk) == [("o/r", "pr_files/1", "")]
+    assert cache._memory_bytes <= cache.max_bytes
+
+
+def test_clear_removes_spill_dir(cache, tmp_path):
+    cache.max_bytes = 0
+    cache.put("o/r", "tree", "main", _value("a"))
+    assert os.listdir(tmp_path)
+
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+    assert cache.get("o/r", "tree", "main") is None
+
+
+def test_concurrent_fetch_of_same_key_runs_once(cache):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=2)
+        return {"sha": "abc"}
+
+    results = []
+    first = threading.Thread(
+        target=lambda: results.append(cache.get_or_fetch("o/r", "tree", "main", fetch))
+    )
+    first.start()
+    assert started.wait(timeout=2)
+    second = threading.Thread(
+        target=lambda: results.append(cache.get_or_fetch("o/r", "tree", "main", fetch))
+    )
+    second.start()
+    time.sleep(0.05)   # دومی پشت دریافت در جریان منتظر بماند
+    release.set()
+    first.join(timeout=2)
+    second.join(timeout=2)
+
+    assert results == [{"sha": "abc"}, {"sha": "abc"}]
+    assert len(calls) == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_missing_result_is_fetched_again(cache):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_fetch("o/r", "readme", "main", fetch) is None
+    assert cache.get_or_fetch("o/r", "readme", "main", fetch) is None
+    assert len(calls) == 2
@@ -0,0 +1,64 @@
+"""موتور async: سقف هم‌زمانی از سهمیه زنده و حفظ ترتیب پاسخ‌ها در get_many"""
+
+import threading
+import time
+
+import pytest
+
+from conftest import FakeResponse
+from core.rate_limiter import GITHUB_MAX_CONCURRENCY, GitHubRateLimiter
+
+
+@pytest.fixture
+def limiter() -> GitHubRateLimiter:
+    return GitHubRateLimiter(tokens=["t1"])
+
+
+def _quota(limiter: GitHubRateLimiter, remaining: int, reset_in: float) -> None:
+    limiter.update_from_headers({
+        "X-RateLimit-Resource": "core",
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Reset": str(time.time() + reset_in),
+    })
+
+
+@pytest.mark.parametrize("remaining, reset_in, expected", [
+    (5000, 3600, GITHUB_MAX_CONCURRENCY),
+    (100, 3000, 2),     # ۹۰ درخواست در ۵۰ دقیقه → ۲ در دقیقه
+    (16, 60, 3),        # نصف بودجه باقی‌مانده
+    (10, 3600, 1),      # ذخیره — فقط یکی یکی
+    (0, -1, GITHUB_MAX_CONCURRENCY),   # پنجره بازنشانی گذشته
+])
+def test_concurrency_limit_follows_budget(limiter, remaining, reset_in, expected):
+    _quota(limiter, remaining, reset_in)
+    assert limiter.concurrency_limit() == expected
+
+
+def test_get_many_caps_in_flight_and_keeps_order(limiter, monkeypatch):
+    _quota(limiter, 14, 60)
+    assert limiter.concurrency_limit() == 2
+
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+
+    def request(method, url, params=None, json_data=None, is_search=False):
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        time.sleep(0.02)
+        with lock:
+            state["in_flight"] -= 1
+        return FakeResponse(200, {"url": url})
+
+    monkeypatch.setattr(limiter, "request", request)
+    calls = [(f"/repos/o/r{i}", None) for i in range(6)]
+
+    responses = limiter.get_many(calls)
+    assert [r.json()["url"] for r in responses] == [url for url, _ in calls]
+    assert state["peak"] == 2
+    assert limiter._in_flight == 0
+
+
+def test_get_many_empty(limiter):
+    assert limiter.get_many([]) == []
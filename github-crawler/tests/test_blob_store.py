@@ -0,0 +1,49 @@
+"""انتقال یک‌باره محتوای درون‌خطی به blobs (PRAGMA user_version)"""
+
+import models.repository as repository
+from models.repository import RepositoryDB
+from utils.helpers import git_blob_sha
+
+SHARED = "/* vendored lib */\n" * 50
+
+
+def _insert_inline(db, repo: str, content: str) -> None:
+    with db._get_conn() as conn:
+        conn.execute(
+            """INSERT INTO extracted_data
+               (repo_name, data_type, title, content, metadata, item_key)
+               VALUES (?, 'code', 'lib/x.js', ?, '{}', 'code:lib/x.js')""",
+            (repo, content),
+        )
+
+
+def _inline_rows(db) -> int:
+    with db._get_conn() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM extracted_data WHERE content IS NOT NULL"
+        ).fetchone()[0]
+
+
+def test_legacy_rows_move_in_batches(db, monkeypatch):
+    monkeypatch.setattr(repository, "_BLOB_MIGRATION_BATCH", 2)
+    for i in range(5):
+        _insert_inline(db, f"o/r{i}", SHARED if i % 2 else f"unique {i} " * 20)
+    with db._get_conn() as conn:
+        conn.execute("PRAGMA user_version = 0")  # دیتابیس قبل از انبار بلاب
+
+    db = RepositoryDB(db.db_path)
+    assert _inline_rows(db) == 0
+    with db._get_conn() as conn:
+        refs = conn.execute(
+            "SELECT refcount FROM blobs WHERE sha=?", (git_blob_sha(SHARED.encode()),)
+        ).fetchone()[0]
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    assert refs == 2
+    assert version == repository._BLOB_STORE_VERSION
+
+
+def test_migration_runs_once(db):
+    # بعد از مهاجرت، باز کردن دیتابیس ردیف‌ها را دوباره اسکن نمی‌کند
+    _insert_inline(db, "o/r", SHARED)
+    RepositoryDB(db.db_path)
+    assert _inline_rows(db) == 1
@@ -0,0 +1,35 @@
+"""ایندکس مخازن بررسی‌شده — تصمیم‌های پروسه‌های دیگر هم دیده شوند"""
+
+from models.repository import RepositoryDB, RepositoryInfo
+
+
+def _repo(name: str) -> RepositoryInfo:
+    owner, short = name.split("/")
+    return RepositoryInfo(
+        full_name=name, name=short, owner=owner,
+        html_url=f"https://github.com/{name}",
+        clone_url=f"https://github.com/{name}.git",
+    )
+
+
+def test_own_decisions_are_indexed(db):
+    assert not db.is_already_checked("o/a")
+    db.save_rejected("o/a", "❌ README ندارد")
+    db.upsert_repository(_repo("o/b"))
+
+    assert db.is_already_checked("o/a")
+    assert db.is_already_checked("o/b")
+
+
+def test_other_process_decisions_seen_after_index_load(db):
+    db.save_rejected("o/old", "❌ README ندارد")
+    assert db.is_already_checked("o/old")   # ایندکس بارگذاری شد
+
+    # worker دیگر روی همان دیتابیس
+    other = RepositoryDB(db.db_path)
+    other.save_rejected("o/x", "❌ Issues ناکافی: 0/3")
+    other.upsert_repository(_repo("o/y"))
+
+    assert db.is_already_checked("o/x")
+    assert db.checked_among(["o/old", "o/x", "o/y", "o/new"]) == {"o/old", "o/x", "o/y"}
+    assert not db.is_already_checked("o/new")
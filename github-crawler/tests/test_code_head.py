@@ -0,0 +1,76 @@
+"""ثبت head کد فقط بعد از استخراج کامل کاندیدها"""
+
+import pytest
+
+import core.data_extractor as data_extractor
+from conftest import FakeResponse
+from core.data_extractor import DataExtractor
+from models.repository import RepositoryInfo
+
+REPO = RepositoryInfo(
+    full_name="o/r", name="r", owner="o",
+    html_url="https://github.com/o/r", clone_url="https://github.com/o/r.git",
+    default_branch="main",
+)
+
+BODIES = {
+    "a.py": "def a():\n    return 'first module with enough content to keep'\n",
+    "b.py": "def b():\n    return 'second module with enough content to keep'\n",
+    "tiny.py": "x = 1\n",   # کوتاه — رد می‌شود ولی «انجام‌شده» است
+}
+
+
+class FakeContentsAPI:
+    """head، درخت و دانلود خام /contents — مسیرهای fail دانلود نمی‌شوند"""
+
+    def __init__(self, fail: set[str] = frozenset()):
+        self.fail = set(fail)
+        self.downloads: list[str] = []
+
+    def get(self, url, params=None, is_search=False):
+        if "/git/ref/heads/" in url:
+            return FakeResponse(200, {"object": {"sha": "head1"}})
+        if "/git/trees/" in url:
+            return FakeResponse(200, {"tree": [
+                {"path": p, "type": "blob", "size": len(b), "sha": f"sha-{p}"}
+                for p, b in BODIES.items()
+            ]})
+        return FakeResponse(404)
+
+    def download_raw(self, url, params=None, max_bytes=0, truncate=False):
+        path = url.split("/contents/", 1)[1]
+        self.downloads.append(path)
+        if path in self.fail:
+            return None
+        body = BODIES[path]
+        return body, len(body), f"sha-{path}"
+
+    def concurrency_limit(self) -> int:
+        return 2
+
+
+@pytest.fixture(autouse=True)
+def contents_mode(monkeypatch):
+    monkeypatch.setattr(data_extractor, "CODE_EXTRACTION_MODE", "contents")
+
+
+def test_complete_extraction_marks_head(db):
+    extractor = DataExtractor(db, rate_limiter=FakeContentsAPI(), mode="rest")
+    files = extractor.extract_code_files(REPO, max_files=10)
+
+    assert sorted(f["path"] for f in files) == ["a.py", "b.py"]
+    assert db.get_extraction_head("o/r", "code") == "head1"
+
+
+def test_failed_download_leaves_head_unset(db):
+    extractor = DataExtractor(db, rate_limiter=FakeContentsAPI(fail={"b.py"}), mode="rest")
+    extractor.extract_code_files(REPO, max_files=10)
+    assert db.get_extraction_head("o/r", "code") is None
+
+    # اجرای بعد (کش آرتیفکت تازه) فقط فایل جامانده را می‌گیرد
+    api = FakeContentsAPI()
+    extractor = DataExtractor(db, rate_limiter=api, mode="rest")
+    files = extractor.extract_code_files(REPO, max_files=10)
+    assert [f["path"] for f in files] == ["b.py"]
+    assert "a.py" not in api.downloads
+    assert db.get_extraction_head("o/r", "code") == "head1"
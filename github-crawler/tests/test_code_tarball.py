@@ -0,0 +1,125 @@
+"""استخراج کد از tarball جریانی: فقط فایل‌های خواسته‌شده، توقف زودهنگام و بازگشت به /contents"""
+
+import io
+import os
+import tarfile
+from contextlib import contextmanager
+
+import pytest
+
+import core.data_extractor as data_extractor
+from conftest import FakeResponse
+from core.data_extractor import DataExtractor
+from models.repository import RepositoryInfo
+
+REPO = RepositoryInfo(
+    full_name="o/r", name="r", owner="o",
+    html_url="https://github.com/o/r", clone_url="https://github.com/o/r.git",
+    default_branch="main",
+)
+
+
+def _code(name: str) -> bytes:
+    return f"def {name}():\n    return 'module {name} with enough content to keep'\n".encode()
+
+
+def _tarball(files: list[tuple[str, bytes]]) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for path, data in files:
+            info = tarfile.TarInfo(f"o-r-abc1234/{path}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+class FakeTarballAPI:
+    """/tarball جریانی از بایت‌های آماده + /contents برای باقی‌مانده‌ها"""
+
+    def __init__(self, archive: bytes, status: int = 200):
+        self.raw = io.BytesIO(archive)
+        self.status = status
+        self.downloads: list[str] = []
+
+    @contextmanager
+    def stream(self, url, params=None, accept=None):
+        resp = FakeResponse(self.status)
+        resp.raw = self.raw
+        yield resp
+
+    def download_raw(self, url, params=None, max_bytes=0, truncate=False):
+        path = url.split("/contents/", 1)[1]
+        self.downloads.append(path)
+        data = _code(path.replace("/", "_").removesuffix(".py")).decode()
+        return data, len(data), f"sha-{path}"
+
+    def get(self, url, params=None, is_search=False):
+        return FakeResponse(404)
+
+    def concurrency_limit(self) -> int:
+        return 2
+
+
+def _node(path: str) -> dict:
+    return {"path": path, "type": "blob", "size": 80, "sha": f"sha-{path}"}
+
+
+def _extractor(db, api) -> DataExtractor:
+    return DataExtractor(db=db, rate_limiter=api, mode="rest")
+
+
+def test_wanted_files_saved_and_missing_returned(db):
+    api = FakeTarballAPI(_tarball([
+        ("a.py", _code("a")), ("docs/x.md", b"# docs"), ("pkg/b.py", _code("b")),
+    ]))
+    saved, leftover = _extractor(db, api)._extract_code_tarball(
+        REPO, [_node("a.py"), _node("pkg/b.py"), _node("gone.py")]
+    )
+
+    assert [f["path"] for f in saved] == ["a.py", "pkg/b.py"]
+    assert saved[0]["content"] == _code("a").decode()
+    assert [n["path"] for n in leftover] == ["gone.py"]
+    assert set(db.get_stored_shas("o/r", "code")) == {"code:a.py", "code:pkg/b.py"}
+
+
+def test_stops_reading_once_all_found(db):
+    archive = _tarball([("a.py", _code("a")), ("blob.bin", os.urandom(2 * 1024 * 1024))])
+    api = FakeTarballAPI(archive)
+
+    saved, leftover = _extractor(db, api)._extract_code_tarball(REPO, [_node("a.py")])
+    assert len(saved) == 1 and leftover == []
+    assert api.raw.tell() < len(archive) // 2
+
+
+def test_size_cap_leaves_rest_to_contents(db, monkeypatch):
+    monkeypatch.setattr(data_extractor, "CODE_TARBALL_MAX_MB", 1)
+    api = FakeTarballAPI(_tarball([
+        ("blob.bin", os.urandom(2 * 1024 * 1024)), ("a.py", _code("a")),
+    ]))
+
+    saved, leftover = _extractor(db, api)._extract_code_tarball(REPO, [_node("a.py")])
+    assert saved == []
+    assert [n["path"] for n in leftover] == ["a.py"]
+
+
+@pytest.mark.parametrize("archive, status", [
+    (b"", 404),
+    (b"not a gzip stream at all", 200),
+])
+def test_unusable_tarball_returns_all_candidates(db, archive, status):
+    api = FakeTarballAPI(archive, status)
+    candidates = [_node("a.py"), _node("b.py")]
+
+    assert _extractor(db, api)._extract_code_tarball(REPO, candidates) == ([], candidates)
+
+
+def test_extract_code_files_falls_back_for_leftovers(db, monkeypatch):
+    monkeypatch.setattr(data_extractor, "CODE_EXTRACTION_MODE", "tarball")
+    api = FakeTarballAPI(_tarball([("a.py", _code("a"))]))
+    extractor = _extractor(db, api)
+    extractor.artifacts.put("o/r", "tree", "main", [_node("a.py"), _node("b.py")])
+
+    saved = extractor.extract_code_files(REPO)
+    assert sorted(f["path"] for f in saved) == ["a.py", "b.py"]
+    # فقط فایلی که در آرشیو نبود از /contents
+    assert api.downloads == ["b.py"]
@@ -0,0 +1,75 @@
+"""صف پایدار کرول: ادعای اتمی، برگشت به صف و ادعای رهاشده"""
+
+import sqlite3
+
+
+def _items(*stars: int) -> list[dict]:
+    return [
+        {"full_name": f"o/r{s}", "name": f"r{s}", "stargazers_count": s}
+        for s in stars
+    ]
+
+
+def test_enqueue_ignores_duplicates(db):
+    assert db.enqueue_frontier("kw", "python", _items(5, 9)) == 2
+    assert db.enqueue_frontier("kw", "python", _items(9, 7)) == 1
+    assert db.get_frontier_counts("kw", "python") == {"pending": 3}
+
+
+def test_claim_by_priority_and_exclusive(db):
+    db.enqueue_frontier("kw", "python", _items(1, 50, 10, 30))
+
+    first = db.claim_frontier("kw", "python", "w1", 2, stale_minutes=30)
+    second = db.claim_frontier("kw", "python", "w2", 10, stale_minutes=30)
+
+    assert [i["full_name"] for i in first] == ["o/r50", "o/r30"]
+    assert [i["full_name"] for i in second] == ["o/r10", "o/r1"]
+    assert db.claim_frontier("kw", "python", "w3", 10, stale_minutes=30) == []
+    assert db.get_frontier_counts("kw", "python") == {"validating": 4}
+
+
+def test_release_requeues_claim(db):
+    db.enqueue_frontier("kw", "python", _items(3, 2))
+    claimed = db.claim_frontier("kw", "python", "w1", 2, stale_minutes=30)
+
+    db.release_frontier([claimed[0]["full_name"]])
+    db.finish_frontier(claimed[1]["full_name"], "rejected")
+
+    again = db.claim_frontier("kw", "python", "w2", 10, stale_minutes=30)
+    assert [i["full_name"] for i in again] == [claimed[0]["full_name"]]
+    assert db.get_frontier_counts("kw", "python") == {
+        "validating": 1, "rejected": 1,
+    }
+
+
+def test_release_does_not_reopen_finished(db):
+    db.enqueue_frontier("kw", "python", _items(4))
+    db.claim_frontier("kw", "python", "w1", 1, stale_minutes=30)
+    db.finish_frontier("o/r4", "accepted")
+
+    db.release_frontier(["o/r4"])
+    assert db.get_frontier_counts("kw", "python") == {"accepted": 1}
+
+
+def test_stale_claim_returns_to_queue(db):
+    db.enqueue_frontier("kw", "python", _items(8, 6))
+    db.claim_frontier("kw", "python", "crashed", 2, stale_minutes=30)
+
+    # worker کرش کرده — ادعا قدیمی‌تر از مهلت
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute(
+            "UPDATE crawl_frontier SET claimed_at='2000-01-01T00:00:00' "
+            "WHERE full_name='o/r8'"
+        )
+
+    reclaimed = db.claim_frontier("kw", "python", "w2", 10, stale_minutes=30)
+    assert [i["full_name"] for i in reclaimed] == ["o/r8"]
+
+
+def test_claims_are_scoped_to_keyword(db):
+    db.enqueue_frontier("a", "python", _items(1))
+    db.enqueue_frontier("b", "python", _items(2))
+
+    claimed = db.claim_frontier("a", "python", "w1", 10, stale_minutes=30)
+    assert [i["full_name"] for i in claimed] == ["o/r1"]
+    assert db.get_frontier_counts("b", "python") == {"pending": 1}
@@ -0,0 +1,158 @@
+"""مرحله تازه‌سازی زمان‌بند: مخازن قبلی دوباره و فقط با فعالیت جدید استخراج می‌شوند"""
+
+import pytest
+
+import core.data_extractor as data_extractor
+import scheduler.cron_manager as cron_manager
+from conftest import FakeResponse
+from models.repository import RepositoryInfo
+
+REPO = RepositoryInfo(
+    full_name="o/r", name="r", owner="o",
+    html_url="https://github.com/o/r", clone_url="https://github.com/o/r.git",
+    default_branch="main", is_training_ready=True,
+)
+
+README = "# r\n\nA project with enough README text to keep.\n"
+CODE = {
+    "a.py": "def a():\n    return 'first module with enough content to keep'\n",
+    "b.py": "def b():\n    return 'second module with enough content to keep'\n",
+}
+
+
+def _issue(number: int, updated_at: str) -> dict:
+    return {
+        "number": number, "title": f"t{number}", "state": "open", "body": "",
+        "labels": [], "comments": 0, "user": {"login": "u"},
+        "created_at": updated_at, "updated_at": updated_at,
+        "head": {"sha": f"h{number}"},
+    }
+
+
+class FakeRepoAPI:
+    """یک مخزن روی REST — همه درخواست‌ها در calls ثبت می‌شوند"""
+
+    def __init__(self, issues: list[dict], pulls: list[dict]):
+        self.issues = issues
+        self.pulls = pulls
+        self.calls: list[tuple[str, dict]] = []
+
+    def get(self, url, params=None, is_search=False):
+        self.calls.append((url, params or {}))
+        if "/git/ref/heads/" in url:
+            return FakeResponse(200, {"object": {"sha": "head1"}})
+        if "/git/trees/" in url:
+            return FakeResponse(200, {"tree": [
+                {"path": "README.md", "type": "blob", "size": len(README), "sha": "sha-readme"},
+                *(
+                    {"path": p, "type": "blob", "size": len(b), "sha": f"sha-{p}"}
+                    for p, b in CODE.items()
+                ),
+            ]})
+        return FakeResponse(404)
+
+    def download_raw(self, url, params=None, max_bytes=0, truncate=False):
+        self.calls.append((url, params or {}))
+        if url.endswith("/readme"):
+            return README, len(README), "sha-readme"
+        path = url.split("/contents/", 1)[1]
+        return CODE[path], len(CODE[path]), f"sha-{path}"
+
+    def paginate_pages(self, url, params=None, max_items=None, prefetch=False,
+                       per_page=100, is_search=False):
+        params = params or {}
+        self.calls.append((url, params))
+        items = self.issues if url.endswith("/issues") else self.pulls
+        since = params.get("since") or ""
+        rows = sorted(
+            (it for it in items if it["updated_at"] >= since),
+            key=lambda it: it["updated_at"],
+            reverse=params.get("direction") == "desc",
+        )
+        if rows:
+            yield rows
+
+    def get_many(self, calls):
+        self.calls += [(url, params or {}) for url, params in calls]
+        return [FakeResponse(200, []) for _ in calls]
+
+    def concurrency_limit(self) -> int:
+        return 2
+
+
+@pytest.fixture
+def cron(db, monkeypatch):
+    monkeypatch.setattr(cron_manager.signal, "signal", lambda *args: None)
+    monkeypatch.setattr(data_extractor, "CODE_EXTRACTION_MODE", "contents")
+    manager = cron_manager.CronManager(db)
+    db.upsert_repository(REPO, keyword="kw")
+    return manager
+
+
+def _use(cron, api: FakeRepoAPI) -> FakeRepoAPI:
+    cron.extractor.api = api
+    # هر اجرای پایپلاین با کش آرتیفکت خالی شروع می‌شود
+    cron.extractor.artifacts.clear()
+    return api
+
+
+def _make_due(db) -> None:
+    with db._get_conn() as conn:
+        conn.execute("UPDATE repositories SET last_extracted_at='2000-01-01T00:00:00'")
+
+
+def _saved_issues(db) -> set[str]:
+    with db._get_conn() as conn:
+        return {
+            r["item_key"] for r in conn.execute(
+                "SELECT item_key FROM extracted_data WHERE data_type='issue'"
+            )
+        }
+
+
+def test_known_repo_refreshed_from_watermark(cron, db):
+    issues = [_issue(1, "2026-01-01T00:00:00Z"), _issue(2, "2026-01-02T00:00:00Z")]
+    _use(cron, FakeRepoAPI(issues, []))
+    assert cron.refresh_known_repos() == 1
+    assert _saved_issues(db) == {"issue:1", "issue:2"}
+
+    # استخراج‌شده و هنوز تازه — سررسید نیست
+    assert cron.refresh_known_repos() == 0
+
+    _make_due(db)
+    issues.append(_issue(3, "2026-02-01T00:00:00Z"))
+    api = _use(cron, FakeRepoAPI(issues, []))
+    assert cron.refresh_known_repos() == 1
+
+    listing = next(params for url, params in api.calls if url.endswith("/issues"))
+    assert listing["since"] == "2026-01-02T00:00:00Z"
+    assert listing["direction"] == "asc"
+    assert _saved_issues(db) == {"issue:1", "issue:2", "issue:3"}
+    assert db.get_extraction_watermark("o/r", "issue") == "2026-02-01T00:00:00Z"
+
+
+def test_repos_extracted_this_run_are_not_due(cron, db):
+    _use(cron, FakeRepoAPI([], []))
+    cron.extractor.extract_all(REPO)   # مرحله ۲ همین اجرا
+    assert cron.refresh_known_repos() == 0
+
+
+def test_unchanged_repo_costs_only_the_ref_request(cron, db):
+    issues = [
+        _issue(1, "2026-01-01T00:00:00Z"),
+        {**_issue(2, "2026-01-02T00:00:00Z"), "comments": 3},
+    ]
+    pulls = [_issue(7, "2026-01-03T00:00:00Z")]
+    _use(cron, FakeRepoAPI(issues, pulls))
+    assert cron.refresh_known_repos() == 1
+
+    _make_due(db)
+    api = _use(cron, FakeRepoAPI(issues, pulls))
+    assert cron.refresh_known_repos() == 1
+
+    listings = [url for url, _ in api.calls if url.endswith(("/issues", "/pulls"))]
+    others = [url for url, _ in api.calls if not url.endswith(("/issues", "/pulls"))]
+    # README و کد با head ثابت، Issue/PR روی خود واترمارک قبلاً ذخیره شده‌اند
+    assert sorted(listings) == ["/repos/o/r/issues", "/repos/o/r/pulls"]
+    assert others == ["/repos/o/r/git/ref/heads/main"]
+    assert db.get_extraction_watermark("o/r", "pull_request") == "2026-01-03T00:00:00Z"
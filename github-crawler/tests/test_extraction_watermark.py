@@ -0,0 +1,145 @@
+"""قواعد جلو رفتن واترمارک همگام‌سازی افزایشی Issues و PRها"""
+
+import pytest
+
+from conftest import FakeResponse
+from core.data_extractor import DataExtractor
+from models.repository import RepositoryInfo
+
+REPO = RepositoryInfo(
+    full_name="o/r", name="r", owner="o",
+    html_url="https://github.com/o/r", clone_url="https://github.com/o/r.git",
+)
+
+
+def _ts(i: int) -> str:
+    return f"2026-01-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+
+
+def _items(count: int, start: int = 0) -> list[dict]:
+    return [
+        {
+            "number": i, "title": f"t{i}", "state": "open", "body": "",
+            "labels": [], "comments": 0, "user": {"login": "u"},
+            "created_at": _ts(i), "updated_at": _ts(i),
+            "head": {"sha": f"h{i}"},
+        }
+        for i in range(start, start + count)
+    ]
+
+
+class FakeListAPI:
+    """
+    فهرست صفحه‌بندی‌شده /issues و /pulls (sort=updated)
+    fail_at: شماره صفحه‌ای که درخواستش شکست می‌خورد (پیمایش بی‌صدا قطع می‌شود)
+    """
+
+    def __init__(self, items: list[dict], fail_at: int | None = None):
+        self.items = items
+        self.fail_at = fail_at
+        self.params: list[dict] = []
+
+    def paginate_pages(self, url, params=None, max_items=None, prefetch=False,
+                       per_page=100, is_search=False):
+        params = params or {}
+        self.params.append(params)
+        since = params.get("since") or ""
+        rows = sorted(
+            (it for it in self.items if it["updated_at"] >= since),
+            key=lambda it: it["updated_at"],
+            reverse=params.get("direction") == "desc",
+        )
+        fetched = 0
+        for page, start in enumerate(range(0, len(rows), per_page), 1):
+            if page == self.fail_at:
+                return
+            chunk = rows[start:start + per_page]
+            fetched += len(chunk)
+            yield chunk
+            if max_items is not None and fetched >= max_items:
+                return
+
+    def get_many(self, calls):
+        return [FakeResponse(200, []) for _ in calls]
+
+
+@pytest.fixture
+def extractor(db):
+    return DataExtractor(db, rate_limiter=FakeListAPI([]), mode="rest")
+
+
+def _saved(db, data_type: str) -> set[str]:
+    with db._get_conn() as conn:
+        return {
+            r["item_key"] for r in conn.execute(
+                "SELECT item_key FROM extracted_data WHERE data_type=?",
+                (data_type,),
+            )
+        }
+
+
+# ── Issues ──
+
+def test_first_issue_sync_takes_newest(extractor, db):
+    extractor.api = FakeListAPI(_items(120))
+    extractor.extract_issues(REPO, max_count=50)
+
+    assert _saved(db, "issue") == {f"issue:{i}" for i in range(70, 120)}
+    assert db.get_extraction_watermark("o/r", "issue") == _ts(119)
+
+
+def test_capped_issue_sync_resumes_without_gap(extractor, db):
+    db.save_extraction_watermark("o/r", "issue", _ts(100))
+    extractor.api = api = FakeListAPI(_items(300))
+
+    extractor.extract_issues(REPO, max_count=80)
+    assert api.params[-1]["direction"] == "asc"
+    assert api.params[-1]["since"] == _ts(100)
+    # قدیمی‌ترین به‌روزشده‌ها بعد از واترمارک، نه جدیدترین‌ها
+    assert _saved(db, "issue") == {f"issue:{i}" for i in range(100, 180)}
+    assert db.get_extraction_watermark("o/r", "issue") == _ts(179)
+
+    extractor.extract_issues(REPO, max_count=200)
+    assert _saved(db, "issue") == {f"issue:{i}" for i in range(100, 300)}
+    assert db.get_extraction_watermark("o/r", "issue") == _ts(299)
+
+
+# ── Pull Requests ──
+
+def test_first_pr_sync_takes_newest(extractor, db):
+    extractor.api = FakeListAPI(_items(120))
+    extractor.extract_pull_requests(REPO, max_count=30)
+
+    assert _saved(db, "pull_request") == {f"pull_request:{i}" for i in range(90, 120)}
+    assert db.get_extraction_watermark("o/r", "pull_request") == _ts(119)
+
+
+def test_pr_sync_reaching_watermark_advances(extractor, db):
+    db.save_extraction_watermark("o/r", "pull_request", _ts(240))
+    extractor.api = FakeListAPI(_items(250))
+
+    extractor.extract_pull_requests(REPO, max_count=30)
+    assert _saved(db, "pull_request") == {f"pull_request:{i}" for i in range(240, 250)}
+    assert db.get_extraction_watermark("o/r", "pull_request") == _ts(249)
+
+
+def test_capped_pr_sync_resumes_without_gap(extractor, db):
+    db.save_extraction_watermark("o/r", "pull_request", _ts(50))
+    extractor.api = FakeListAPI(_items(300))
+
+    extractor.extract_pull_requests(REPO, max_count=30)
+    assert _saved(db, "pull_request") == {f"pull_request:{i}" for i in range(50, 80)}
+    assert db.get_extraction_watermark("o/r", "pull_request") == _ts(79)
+
+    for _ in range(8):
+        extractor.extract_pull_requests(REPO, max_count=30)
+    assert _saved(db, "pull_request") == {f"pull_request:{i}" for i in range(50, 300)}
+    assert db.get_extraction_watermark("o/r", "pull_request") == _ts(299)
+
+
+def test_interrupted_pr_listing_keeps_watermark(extractor, db):
+    db.save_extraction_watermark("o/r", "pull_request", _ts(50))
+    extractor.api = FakeListAPI(_items(300), fail_at=2)
+
+    extractor.extract_pull_requests(REPO, max_count=30)
+    assert db.get_extraction_watermark("o/r", "pull_request") == _ts(50)
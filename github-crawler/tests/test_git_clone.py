@@ -0,0 +1,123 @@
+"""کلون جزئی و استخراج کد از git روی یک مخزن bare محلی"""
+
+import functools
+import shutil
+import subprocess
+
+import pytest
+
+import core.data_extractor as data_extractor
+from core.data_extractor import DataExtractor
+from core.git_clone import GitCloneError, PartialClone, remote_head
+from models.repository import RepositoryInfo
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git نصب نیست")
+
+MAX_BLOB = 4096
+
+FILES = {
+    "main.py": "def main():\n    return 'hello from the partial clone test'\n",
+    "pkg/util.py": "def helper(value):\n    return value * 2  # util helper module\n",
+    "pkg/copy.py": "def main():\n    return 'hello from the partial clone test'\n",
+    "big.py": "x = 1\n" * 2000,   # بزرگ‌تر از MAX_BLOB — فیلتر می‌شود
+    "notes.txt": "not code",
+}
+
+REPO = RepositoryInfo(
+    full_name="o/r", name="r", owner="o",
+    html_url="https://github.com/o/r", clone_url="https://github.com/o/r.git",
+    default_branch="main",
+)
+
+
+def _git(*args: str, cwd=None) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """مخزن bare با allowFilter (مثل GitHub) — خروجی: (قالب آدرس، مسیر منبع)"""
+    src = tmp_path / "src"
+    for path, text in FILES.items():
+        (src / path).parent.mkdir(parents=True, exist_ok=True)
+        (src / path).write_text(text)
+    _git("init", "-q", "-b", "main", str(src))
+    _git("add", "-A", cwd=src)
+    _git("commit", "-q", "-m", "init", cwd=src)
+
+    bare = tmp_path / "mirrors" / "o" / "r.git"
+    _git("clone", "-q", "--bare", str(src), str(bare))
+    _git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    return f"file://{tmp_path}/mirrors/{{full_name}}.git", src
+
+
+def test_tree_skips_filtered_blobs(remote, tmp_path):
+    template, src = remote
+    with PartialClone(REPO, MAX_BLOB, template, str(tmp_path)) as clone:
+        tree = {node["path"]: node for node in clone.tree()}
+
+    assert set(tree) == set(FILES) - {"big.py"}
+    for path, node in tree.items():
+        assert node["sha"] == _git("hash-object", path, cwd=src)
+        assert node["size"] == len(FILES[path].encode())
+
+
+def test_read_blobs_in_order(remote, tmp_path):
+    template, _ = remote
+    with PartialClone(REPO, MAX_BLOB, template, str(tmp_path)) as clone:
+        tree = {node["path"]: node["sha"] for node in clone.tree()}
+        shas = [tree["pkg/util.py"], "0" * 40, tree["main.py"]]
+        blobs = list(clone.read_blobs(shas))
+
+    # sha غایب رد می‌شود، بقیه به ترتیب ورودی
+    assert [sha for sha, _ in blobs] == [tree["pkg/util.py"], tree["main.py"]]
+    assert blobs[1][1].decode() == FILES["main.py"]
+
+
+def test_scratch_dir_removed(remote, tmp_path):
+    template, _ = remote
+    with PartialClone(REPO, MAX_BLOB, template, str(tmp_path)) as clone:
+        path = clone.path
+    assert not (tmp_path / path).exists()
+
+
+def test_remote_head_matches_source(remote):
+    template, src = remote
+    assert remote_head(REPO, template) == _git("rev-parse", "HEAD", cwd=src)
+
+
+def test_missing_remote_raises(tmp_path):
+    with pytest.raises(GitCloneError):
+        with PartialClone(REPO, MAX_BLOB, f"file://{tmp_path}/nope.git", str(tmp_path)):
+            pass
+
+
+def test_extract_code_git_saves_and_skips_unchanged(remote, db, monkeypatch):
+    template, _ = remote
+    monkeypatch.setattr(
+        data_extractor, "PartialClone",
+        functools.partial(PartialClone, remote_template=template),
+    )
+    extractor = DataExtractor(db, rate_limiter=object(), mode="rest")
+
+    files, missing = extractor._extract_code_git(REPO, max_files=10, max_file_size=MAX_BLOB)
+    assert sorted(f["path"] for f in files) == ["main.py", "pkg/copy.py", "pkg/util.py"]
+    assert missing == []
+    assert db.get_stored_shas("o/r", "code").keys() == {
+        "code:main.py", "code:pkg/copy.py", "code:pkg/util.py",
+    }
+
+    # sha همه فایل‌ها مثل ذخیره‌شده‌هاست — چیزی دوباره خوانده نمی‌شود
+    assert extractor._extract_code_git(REPO, max_files=10, max_file_size=MAX_BLOB) == ([], [])
+
+
+def test_extract_code_git_clone_failure_falls_back(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        data_extractor, "PartialClone",
+        functools.partial(PartialClone, remote_template=f"file://{tmp_path}/nope.git"),
+    )
+    extractor = DataExtractor(db, rate_limiter=object(), mode="rest")
+    assert extractor._extract_code_git(REPO, max_files=10, max_file_size=MAX_BLOB) is None
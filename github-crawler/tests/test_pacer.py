@@ -0,0 +1,81 @@
+"""سطل توکن تطبیقی: AIMD روی پاسخ‌ها و تنظیم نرخ از سهمیه (retune)"""
+
+import time
+
+import pytest
+
+import core.pacer as pacer_module
+from core.pacer import PACER_GITHUB_MAX_RPS, Pacer, TokenBucket
+
+
+def test_server_errors_halve_and_healthy_responses_recover():
+    bucket = TokenBucket("t", rate=10)
+    bucket.observe(0.1, 502)
+    bucket.observe(0.1, 429)
+    assert bucket.health == pytest.approx(0.25)
+    assert bucket.rate == pytest.approx(2.5)
+
+    for _ in range(3):
+        bucket.observe(0.1, 200)
+    assert bucket.health == pytest.approx(0.4)
+
+    for _ in range(20):
+        bucket.observe(0.1, 200)
+    assert bucket.health == 1.0
+
+
+def test_health_floor():
+    bucket = TokenBucket("t", rate=10)
+    for _ in range(10):
+        bucket.observe(0.1, 500)
+    assert bucket.health == 0.05
+
+
+def test_slow_responses_back_off_gently():
+    bucket = TokenBucket("t", rate=10)
+    bucket.observe(0.1, 200)
+    for _ in range(5):
+        bucket.observe(5.0, 200)
+    assert 0.05 < bucket.health < 1.0
+
+
+def test_acquire_waits_only_after_burst(monkeypatch):
+    sleeps: list[float] = []
+    monkeypatch.setattr(pacer_module.time, "sleep", sleeps.append)
+    bucket = TokenBucket("t", rate=2, capacity=2)
+
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == 0.0
+    wait = bucket.acquire()
+    assert wait == pytest.approx(0.5, abs=0.01)
+    assert sleeps == [wait]
+
+
+def test_retune_full_speed_above_threshold():
+    pacer = Pacer()
+    pacer.retune("core", 4000, 5000, time.time() + 1800)
+    bucket = pacer.bucket("github_core")
+    assert bucket.base_rate == PACER_GITHUB_MAX_RPS
+    assert bucket.capacity == 5
+
+
+def test_retune_spreads_low_budget_until_reset():
+    pacer = Pacer()
+    pacer.retune("core", 600, 5000, time.time() + 600)
+    bucket = pacer.bucket("github_core")
+    assert bucket.base_rate == pytest.approx(min(1.0, PACER_GITHUB_MAX_RPS), rel=0.01)
+    assert bucket.capacity == 1
+
+
+def test_retune_search_always_spread():
+    pacer = Pacer()
+    pacer.retune("search", 30, 30, time.time() + 60)
+    bucket = pacer.bucket("github_search")
+    assert bucket.base_rate == pytest.approx(0.5, rel=0.01)
+    assert bucket.capacity == 1
+
+
+def test_retune_after_reset_uses_full_window():
+    pacer = Pacer()
+    pacer.retune("search", 0, 30, time.time() - 1)
+    assert pacer.bucket("github_search").base_rate == pytest.approx(0.5)
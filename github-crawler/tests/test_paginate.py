@@ -0,0 +1,106 @@
+"""صفحه‌بندی با هدر Link: دنبال کردن rel="next"، سقف آیتم‌ها و پیش‌واکشی صفحه بعد"""
+
+import json
+import threading
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from core.rate_limiter import GitHubRateLimiter
+
+BASE = "https://api.github.com/repos/o/r/issues"
+
+
+def _page_url(n: int) -> str:
+    return f"{BASE}?per_page=2&page={n}"
+
+
+def _response(body, next_url: str | None = None, status: int = 200) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = CaseInsensitiveDict(
+        {"Link": f'<{next_url}>; rel="next"'} if next_url else {}
+    )
+    resp._content = json.dumps(body).encode()
+    return resp
+
+
+class FakePages:
+    """سه صفحه دوتایی؛ هر صفحه با Link به صفحه بعد"""
+
+    def __init__(self, wrap: bool = False, fail_at: int | None = None):
+        self.wrap = wrap
+        self.fail_at = fail_at
+        self.calls: list[tuple[str, dict | None]] = []
+        self.fetched = {n: threading.Event() for n in (1, 2, 3)}
+
+    def get(self, url, params=None, is_search=False):
+        self.calls.append((url, params))
+        n = 1 if url == BASE else int(url.rsplit("=", 1)[1])
+        self.fetched[n].set()
+        if n == self.fail_at:
+            return _response({}, status=502)
+        items = [{"id": 2 * n - 1}, {"id": 2 * n}]
+        body = {"total_count": 6, "items": items} if self.wrap else items
+        return _response(body, _page_url(n + 1) if n < 3 else None)
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    def make(**kwargs) -> tuple[GitHubRateLimiter, FakePages]:
+        limiter = GitHubRateLimiter(tokens=["t1"])
+        pages = FakePages(**kwargs)
+        monkeypatch.setattr(limiter, "get", pages.get)
+        return limiter, pages
+    return make
+
+
+def test_follows_next_links(limiter):
+    api, pages = limiter()
+    ids = [item["id"] for item in api.paginate(BASE, params={"state": "all"})]
+
+    assert ids == [1, 2, 3, 4, 5, 6]
+    # پارامترها فقط روی درخواست اول؛ بعدی‌ها خود URL هدر Link هستند
+    assert pages.calls == [
+        (BASE, {"state": "all", "per_page": 100}),
+        (_page_url(2), None),
+        (_page_url(3), None),
+    ]
+
+
+def test_search_items_unwrapped(limiter):
+    api, _ = limiter(wrap=True)
+    assert [len(page) for page in api.paginate_pages(BASE, is_search=True)] == [2, 2, 2]
+
+
+def test_limit_stops_before_next_page(limiter):
+    api, pages = limiter()
+    ids = [item["id"] for item in api.paginate(BASE, limit=3, prefetch=True)]
+
+    assert ids == [1, 2, 3]
+    assert [url for url, _ in pages.calls] == [BASE, _page_url(2)]
+
+
+def test_prefetch_fetches_next_page_while_current_is_processed(limiter):
+    api, pages = limiter()
+    seen = []
+    for page in api.paginate_pages(BASE, prefetch=True):
+        n = page[-1]["id"] // 2
+        if n < 3:
+            # صفحه بعد پیش از پایان پردازش صفحه فعلی درخواست می‌شود
+            assert pages.fetched[n + 1].wait(timeout=2)
+        seen.append(n)
+    assert seen == [1, 2, 3]
+
+
+def test_error_page_stops_iteration(limiter):
+    api, pages = limiter(fail_at=2)
+    assert [item["id"] for item in api.paginate(BASE)] == [1, 2]
+    assert len(pages.calls) == 2
+
+
+def test_non_positive_limit_requests_nothing(limiter):
+    api, pages = limiter()
+    assert list(api.paginate(BASE, limit=0)) == []
+    assert pages.calls == []
@@ -0,0 +1,86 @@
+"""نوبت‌دهی وزن‌دار سهمیه: کلیدواژه‌ای با مصرف کمتر نسبت به کسری تا هدف اول می‌رود"""
+
+import threading
+import time
+
+from core.quota_scheduler import QuotaScheduler
+
+
+def _race(
+    scheduler: QuotaScheduler, keywords: list[str], resource: str = "search"
+) -> list[str]:
+    """
+    منبع با کلیدواژه hold گرفته می‌شود، بقیه به ترتیب keywords صف می‌گیرند
+    و بعد از آزاد شدن، ترتیب نوبت‌ها برمی‌گردد
+    """
+    order: list[str] = []
+    threads = []
+    with scheduler.turn("hold", resource):
+        for kw in keywords:
+            def run(kw=kw):
+                with scheduler.turn(kw, resource):
+                    order.append(kw)
+            thread = threading.Thread(target=run)
+            thread.start()
+            threads.append(thread)
+            while kw not in scheduler._waiting.get(resource, []):
+                time.sleep(0.001)
+    for thread in threads:
+        thread.join(timeout=2)
+    return order
+
+
+def _scheduler(targets: dict[str, int], spent: dict[str, int]) -> QuotaScheduler:
+    scheduler = QuotaScheduler({**targets, "hold": 1})
+    scheduler.spent["search"] = dict(spent)
+    return scheduler
+
+
+def test_weight_is_deficit_to_target():
+    scheduler = QuotaScheduler({"a": 100, "b": 10})
+    scheduler.found["a"] = 40
+    scheduler.found["b"] = 12
+    assert scheduler.weight("a") == 60
+    assert scheduler.weight("b") == 1
+
+
+def test_lowest_share_of_deficit_goes_first():
+    # a: ۵۰ درخواست / کسری ۱۰۰ = ۰.۵؛ b: ۱۰ / ۱۰ = ۱
+    scheduler = _scheduler({"a": 100, "b": 10}, {"a": 50, "b": 10})
+    assert _race(scheduler, ["b", "a"]) == ["a", "b"]
+
+
+def test_progress_shifts_the_turn():
+    scheduler = _scheduler({"a": 100, "b": 10}, {"a": 5, "b": 1})
+    scheduler.progress("a", found=99, scanned=300)   # کسری a به ۱ رسید
+    assert _race(scheduler, ["a", "b"]) == ["b", "a"]
+
+
+def test_tie_goes_to_earliest_queued():
+    scheduler = _scheduler({"a": 10, "b": 10}, {})
+    assert _race(scheduler, ["b", "a"]) == ["b", "a"]
+
+
+def test_turn_calls_added_to_spent():
+    scheduler = QuotaScheduler({"a": 10})
+    with scheduler.turn("a", "graphql") as turn:
+        turn.calls = 3
+    with scheduler.turn("a", "graphql") as turn:
+        turn.calls = 2
+    assert scheduler.spent == {"graphql": {"a": 5}}
+
+
+def test_resources_have_separate_slots():
+    scheduler = QuotaScheduler({"a": 10, "b": 10})
+    entered = threading.Event()
+
+    def other():
+        with scheduler.turn("b", "core"):
+            entered.set()
+
+    with scheduler.turn("a", "search"):
+        thread = threading.Thread(target=other)
+        thread.start()
+        # جستجوی a اعتبارسنجی b را مسدود نمی‌کند
+        assert entered.wait(timeout=2)
+    thread.join(timeout=2)
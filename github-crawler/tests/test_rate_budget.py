@@ -0,0 +1,68 @@
+"""بودجه به تفکیک منبع: تشخیص منبع از مسیر و به‌روزرسانی با X-RateLimit-Resource"""
+
+import time
+
+import pytest
+
+from core.rate_budget import RateBudget, resource_for
+from core.rate_limiter import GitHubRateLimiter
+
+
+@pytest.mark.parametrize("url, is_search, expected", [
+    ("https://api.github.com/repos/o/r/issues", False, "core"),
+    ("https://api.github.com/search/repositories", False, "search"),
+    ("https://api.github.com/search/code", False, "code_search"),
+    ("https://api.github.com/graphql", False, "graphql"),
+    ("https://api.github.com/graphql/", False, "graphql"),
+    ("/repos/o/r", True, "search"),
+])
+def test_resource_for(url, is_search, expected):
+    assert resource_for(url, is_search=is_search) == expected
+
+
+def test_defaults_per_resource():
+    assert RateBudget("search").limit == 30
+    assert RateBudget("code_search").limit == 10
+    assert RateBudget("unknown").limit == 5000
+
+
+def test_update_from_headers_and_consume():
+    budget = RateBudget("core")
+    reset = time.time() + 600
+    budget.update_from_headers({
+        "X-RateLimit-Remaining": "42",
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Reset": str(reset),
+    })
+    assert (budget.remaining, budget.used, budget.reset) == (42, 4958, reset)
+
+    budget.consume(time.time())
+    assert (budget.remaining, budget.used) == (41, 4959)
+
+
+def test_consume_after_reset_starts_new_window():
+    budget = RateBudget("search")
+    budget.update_from_headers({
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(time.time() - 1),
+    })
+    now = time.time()
+    assert budget.available(now) == 30
+
+    budget.consume(now)
+    assert (budget.remaining, budget.used, budget.reset) == (29, 1, 0)
+
+
+def test_limiter_routes_headers_by_resource():
+    limiter = GitHubRateLimiter(tokens=["t1"])
+    limiter.update_from_headers(
+        {"X-RateLimit-Resource": "graphql", "X-RateLimit-Remaining": "4321"},
+        resource="core",
+    )
+    assert limiter.budget("graphql")["remaining"] == 4321
+    assert limiter.remaining == 5000
+
+    # بدون هدر منبع — منبع حدس‌زده‌شده از مسیر
+    limiter.update_from_headers({"X-RateLimit-Remaining": "7"}, resource="search")
+    assert limiter.search_remaining == 7
+    assert limiter.remaining == 5000
@@ -0,0 +1,135 @@
+"""اعتبارسنجی دسته‌ای GraphQL: شمارش کد، بازگشت به درخت بازگشتی REST"""
+
+import pytest
+
+import core.data_extractor as data_extractor
+from conftest import FakeResponse
+from core.data_extractor import DataExtractor
+from core.repo_validator import RepoValidator
+from models.repository import RepositoryInfo
+
+REPO = RepositoryInfo(
+    full_name="o/r", name="r", owner="o",
+    html_url="https://github.com/o/r", clone_url="https://github.com/o/r.git",
+    default_branch="main",
+)
+
+
+def _blob(name: str, size: int = 100) -> dict:
+    return {"name": name, "type": "blob", "object": {"byteSize": size}}
+
+
+def _tree(name: str, entries: list[dict]) -> dict:
+    # GraphQL فقط دو سطح برمی‌گرداند — entries سطح سوم خالی است
+    return {"name": name, "type": "tree", "object": {"entries": entries}}
+
+
+README = "# r\n\nA project with enough README text to keep.\n"
+
+
+def _node(entries: list[dict], **extra) -> dict:
+    return {
+        **extra,
+        "issues": {"totalCount": 10},
+        "pullRequests": {"totalCount": 10},
+        "object": {"entries": entries},
+    }
+
+
+class FakeValidationAPI:
+    """کوئری دسته‌ای GraphQL و درخت بازگشتی REST"""
+
+    def __init__(self, node: dict, tree: list[dict] | None = None):
+        self.node = node
+        self.tree = tree or []
+        self.gets: list[str] = []
+
+    def graphql(self, query, variables=None):
+        return {"data": {"r0": self.node}}
+
+    def get(self, url, params=None, is_search=False):
+        self.gets.append(url)
+        if "/git/trees/" in url:
+            return FakeResponse(200, {"tree": self.tree})
+        return FakeResponse(404)
+
+    def download_raw(self, url, params=None, max_bytes=0, truncate=False):
+        self.gets.append(url)
+        return None
+
+
+def _validator(db, api) -> RepoValidator:
+    return RepoValidator(rate_limiter=api, mode="graphql", db=db)
+
+
+def test_code_nested_below_two_levels_uses_rest_tree(db):
+    api = FakeValidationAPI(
+        _node([_blob("README.md"), _tree("src", [_tree("pkg", [])])]),
+        tree=[
+            {"path": f"src/pkg/{name}.py", "type": "blob", "size": 200}
+            for name in ("a", "b", "sub/c")
+        ],
+    )
+    validator = _validator(db, api)
+
+    result = validator.validate(REPO)
+    assert result.is_valid
+    assert result.code_file_count == 3
+    assert api.gets == ["/repos/o/r/git/trees/main"]
+    # درخت برای استخراج کد کش شده است
+    assert len(validator.artifacts.get("o/r", "tree", "main")) == 3
+
+
+def test_shallow_code_skips_rest_tree(db):
+    api = FakeValidationAPI(_node([
+        _blob("README.md"), _blob("main.py"),
+        _tree("pkg", [_blob("a.py"), _blob("b.py"), _tree("deep", [])]),
+    ]))
+
+    result = _validator(db, api).validate(REPO)
+    assert result.is_valid
+    assert api.gets == []
+
+
+def test_few_files_without_deeper_levels_rejected(db):
+    api = FakeValidationAPI(_node([_blob("README.md"), _tree("pkg", [_blob("a.py")])]))
+
+    result = _validator(db, api).validate(REPO)
+    assert not result.is_valid
+    assert result.code_file_count == 1
+    assert api.gets == []
+
+
+@pytest.mark.parametrize("size, counted", [(100_000, 3), (100_001, 0)])
+def test_large_files_not_counted(db, size, counted):
+    api = FakeValidationAPI(_node([
+        _blob("README.md"), *(_blob(f"m{i}.py", size) for i in range(3)),
+    ]))
+
+    assert _validator(db, api).validate(REPO).code_file_count == counted
+
+
+def test_graphql_readme_shared_with_extractor(db, monkeypatch):
+    monkeypatch.setattr(data_extractor, "CODE_EXTRACTION_MODE", "contents")
+    blob = {
+        "text": README, "byteSize": len(README), "oid": "sha-readme", "isTruncated": False,
+    }
+    api = FakeValidationAPI(_node([_blob("README.md"), _blob("a.py")], readme0=blob))
+    validator = _validator(db, api)
+    validator.validate(REPO)
+
+    extractor = DataExtractor(db=db, rate_limiter=api, artifacts=validator.artifacts)
+    assert extractor.extract_readme(REPO) == README
+    # فقط درخواست ref برای head — بدون /readme دوباره
+    assert not any(url.endswith("/readme") for url in api.gets)
+
+
+def test_graphql_readme_over_raw_limit_has_no_content(db):
+    blob = {"text": None, "byteSize": 10 ** 7, "oid": "sha-readme", "isTruncated": True}
+    validator = _validator(db, FakeValidationAPI(_node([_blob("README.md")], readme0=blob)))
+    validator.validate(REPO)
+
+    readme = validator.artifacts.get("o/r", "readme", "main")
+    assert readme["content"] is None
+    assert readme["size"] == 10 ** 7
+    assert (readme["sha"], readme["path"]) == ("sha-readme", "README.md")
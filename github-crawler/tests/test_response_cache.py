@@ -0,0 +1,107 @@
+"""کش ETag: کلید به تفکیک توکن و چسبندگی درخواست شرطی به توکن صاحب مدخل"""
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from core.rate_limiter import GitHubRateLimiter
+from core.response_cache import ResponseCache
+
+URL = "https://api.github.com/repos/o/r"
+
+
+def _response(status: int, headers: dict, body: bytes = b"") -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = body
+    resp.url = URL
+    return resp
+
+
+class FakeGitHub:
+    """
+    ETag هر توکن جداست (Vary: Authorization) — If-None-Match درست جواب 304 می‌گیرد
+    فقط پاسخ 200 از سهمیه کم می‌کند
+    """
+
+    def __init__(self, tokens: list[str]):
+        self.remaining = {f"Bearer {t}": 5000 for t in tokens}
+        self.calls: list[tuple[str, int]] = []
+
+    def request(self, method, url, params=None, json=None, timeout=None, headers=None):
+        auth = headers["Authorization"]
+        etag = f'"{auth[-1]}-v1"'
+        if headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        else:
+            self.remaining[auth] -= 1
+            status, body = 200, b'{"full_name": "o/r"}'
+        self.calls.append((auth, status))
+        return _response(status, {
+            "ETag": etag,
+            "Content-Type": "application/json",
+            "X-RateLimit-Resource": "core",
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": str(self.remaining[auth]),
+        }, body)
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    rl = GitHubRateLimiter(
+        cache=ResponseCache(str(tmp_path / "http_cache.db")),
+        tokens=["tok-a", "tok-b"],
+    )
+    rl._session = FakeGitHub(["tok-a", "tok-b"])
+    return rl
+
+
+def test_key_depends_on_scope():
+    assert ResponseCache.make_key(URL, scope="a") != ResponseCache.make_key(URL, scope="b")
+    assert ResponseCache.make_key(URL, {"x": 1, "y": 2}) == ResponseCache.make_key(
+        URL, {"y": 2, "x": 1}
+    )
+
+
+def test_repeated_get_sticks_to_etag_owner(limiter):
+    for _ in range(6):
+        resp = limiter.get(URL)
+        assert resp.status_code == 200
+        assert resp.json() == {"full_name": "o/r"}
+
+    calls = limiter._session.calls
+    assert [status for _, status in calls] == [200] + [304] * 5
+    assert len({auth for auth, _ in calls}) == 1
+    assert limiter.cache.get_stats()["hits"] == 5
+
+
+def test_owner_without_quota_falls_back_to_other_token(limiter):
+    limiter.get(URL)
+    owner = limiter._session.calls[0][0]
+    token = next(t for t in limiter.pool.tokens if f"Bearer {t.token}" == owner)
+    limiter.pool.update(token, "core", {"remaining": 5, "limit": 5000})
+
+    limiter.get(URL)
+    auth, status = limiter._session.calls[-1]
+    assert auth != owner
+    assert status == 200
+
+    # مدخل توکن دوم هم ذخیره شده — درخواست بعدی با همان توکن 304 است
+    limiter.get(URL)
+    assert limiter._session.calls[-1] == (auth, 304)
+
+
+def test_size_total_tracks_store_and_replace(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c.db"), max_bytes=1000)
+    key = cache.make_key(URL)
+    cache.store(key, _response(200, {"ETag": '"1"'}, b"x" * 300))
+    cache.store(key, _response(200, {"ETag": '"2"'}, b"x" * 400))
+    assert cache._total_size == 400
+
+    for i in range(3):
+        cache.store(cache.make_key(f"{URL}/{i}"), _response(200, {"ETag": '"e"'}, b"y" * 400))
+    # زیر سقف ماند و قدیمی‌ترین‌ها حذف شدند
+    assert cache._total_size <= 1000
+    assert cache.lookup(key) is None
+    assert ResponseCache(str(tmp_path / "c.db"))._total_size == cache._total_size
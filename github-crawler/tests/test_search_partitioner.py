@@ -0,0 +1,123 @@
+"""برش‌بندی جستجو: شکستن بازه ستاره و سپس تاریخ تا هر برش زیر سقف 1000 باشد"""
+
+from datetime import date, timedelta
+
+from conftest import FakeResponse
+from core.search_partitioner import SEARCH_RESULT_CAP, SearchPartitioner
+
+
+def _repo(i: int, stars: int, created: date) -> dict:
+    return {
+        "id": i, "full_name": f"o/r{i}", "stargazers_count": stars,
+        "created_at": created.isoformat(), "pushed_at": created.isoformat(),
+    }
+
+
+def _matches(repo: dict, qualifier: str) -> bool:
+    field, _, value = qualifier.partition(":")
+    if field == "stars":
+        stars = repo["stargazers_count"]
+        if value.startswith(">="):
+            return stars >= int(value[2:])
+        lo, hi = value.split("..")
+        return int(lo) <= stars <= int(hi)
+    lo, hi = value.split("..")
+    return lo <= repo[f"{field}_at"] <= hi
+
+
+class FakeSearchAPI:
+    """/search/repositories روی یک جمعیت ثابت — فقط 1000 نتیجه اول قابل دریافت است"""
+
+    def __init__(self, repos: list[dict], fail: str | None = None):
+        self.repos = repos
+        self.fail = fail
+        self.queries: list[str] = []
+
+    def get(self, url, params=None, is_search=False):
+        query = params["q"]
+        self.queries.append(query)
+        if self.fail and self.fail in query:
+            return FakeResponse(502)
+        qualifiers = [q for q in query.split() if ":" in q]
+        found = sorted(
+            (r for r in self.repos if all(_matches(r, q) for q in qualifiers)),
+            key=lambda r: -r["stargazers_count"],
+        )[:SEARCH_RESULT_CAP]
+        start = (params["page"] - 1) * params["per_page"]
+        return FakeResponse(200, {
+            "total_count": len(found),
+            "items": found[start:start + params["per_page"]],
+        })
+
+    def get_many(self, calls):
+        return [self.get(url, params) for url, params in calls]
+
+
+def _population() -> list[dict]:
+    day = date(2015, 1, 1)
+    # ۳۰۰۰ مخزن با ستاره‌های پخش + ۱۲۰۰ مخزن با دقیقاً ۷ ستاره در روزهای مختلف
+    repos = [_repo(i, 10 + i % 500, day + timedelta(days=i % 900)) for i in range(3000)]
+    repos += [
+        _repo(3000 + i, 7, day + timedelta(days=i)) for i in range(1200)
+    ]
+    return repos
+
+
+def _crawl(api: FakeSearchAPI, min_stars: int = 5) -> tuple[SearchPartitioner, list[int]]:
+    partitioner = SearchPartitioner(rate_limiter=api, concurrency=3)
+    ids = [
+        item["id"]
+        for _, _, items, _ in partitioner.pages("kw", min_stars)
+        for item in items
+    ]
+    return partitioner, ids
+
+
+def test_small_query_is_one_slice():
+    api = FakeSearchAPI([_repo(i, 10, date(2020, 1, 1)) for i in range(250)])
+    partitioner, ids = _crawl(api)
+
+    assert sorted(ids) == list(range(250))
+    assert api.queries[0] == "kw stars:>=5"
+    assert partitioner.probes == 1
+    assert partitioner.requests == 3   # کاوش + صفحه ۲ و ۳
+
+
+def test_split_covers_every_repo_once_under_cap():
+    repos = _population()
+    api = FakeSearchAPI(repos)
+    partitioner, ids = _crawl(api)
+
+    assert sorted(ids) == sorted(r["id"] for r in repos)
+    assert not partitioner.failed
+    assert partitioner.last_total == SEARCH_RESULT_CAP
+    assert any(" stars:" in q and ".." in q for q in api.queries)
+
+
+def test_single_star_value_splits_by_created_date():
+    repos = _population()
+    api = FakeSearchAPI(repos)
+    partitioner = SearchPartitioner(rate_limiter=api)
+
+    slices = list(partitioner.slices("kw", 7))
+    seven = [q for q, _ in slices if "stars:7..7" in q]
+    assert seven and all(" created:" in q for q in seven)
+    for _, data in slices:
+        assert data["total_count"] < SEARCH_RESULT_CAP
+
+
+def test_slices_ordered_by_stars_desc():
+    api = FakeSearchAPI(_population())
+    lows = [
+        int(q.split("stars:")[1].split("..")[0])
+        for q, _ in SearchPartitioner(rate_limiter=api).slices("kw", 5)
+    ]
+    assert lows == sorted(lows, reverse=True)
+
+
+def test_failed_probe_marks_partial():
+    api = FakeSearchAPI(_population(), fail="stars:7..7")
+    partitioner, ids = _crawl(api)
+
+    assert partitioner.failed
+    assert len(ids) == 3000
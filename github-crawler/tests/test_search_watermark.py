@@ -0,0 +1,192 @@
+"""قواعد جلو رفتن واترمارک کرول جستجو"""
+
+from datetime import datetime
+
+import pytest
+
+from conftest import FakeResponse
+from core.github_crawler import GitHubCrawler
+from models.repository import ValidationResult
+
+
+def _repo(i: int) -> dict:
+    return {
+        "full_name": f"o/r{i}",
+        "name": f"r{i}",
+        "owner": {"login": "o"},
+        "html_url": f"https://github.com/o/r{i}",
+        "clone_url": f"https://github.com/o/r{i}.git",
+        "stargazers_count": 1000 - i,
+        "open_issues_count": 5,
+        "pushed_at": f"2026-01-{1 + i % 28:02d}T00:00:00Z",
+        "created_at": "2020-01-01T00:00:00Z",
+    }
+
+
+class FakeSearchAPI:
+    """جستجوی مخازن با total_count ثابت — صفحات fail_pages خطای 502 می‌دهند"""
+
+    def __init__(self, total: int = 250, fail_pages: tuple[int, ...] = ()):
+        self.repos = [_repo(i) for i in range(total)]
+        self.fail_pages = set(fail_pages)
+        self.queries: list[str] = []
+        self.pages: list[int] = []
+
+    def get(self, url, params=None, is_search=False):
+        self.queries.append(params["q"])
+        page, per_page = params["page"], params["per_page"]
+        self.pages.append(page)
+        if page in self.fail_pages:
+            return FakeResponse(502)
+        return FakeResponse(200, {
+            "total_count": len(self.repos),
+            "items": self.repos[(page - 1) * per_page:page * per_page],
+        })
+
+    def get_many(self, calls):
+        return [self.get(url, params, is_search=True) for url, params in calls]
+
+    def concurrency_limit(self) -> int:
+        return 1
+
+
+class FakeValidator:
+    """همه مخازن رد می‌شوند — هدف هرگز پر نمی‌شود"""
+
+    mode = "graphql"
+    batch_size = 50
+    calls_per_repo = 0.1
+
+    def validate_many(self, repos, cancel=None):
+        return [
+            ValidationResult(full_name=r.full_name, rejection_reasons=["❌ README ندارد"])
+            for r in repos
+        ]
+
+    def flush_stats(self) -> None:
+        pass
+
+
+@pytest.fixture
+def crawler(db):
+    c = GitHubCrawler(db)
+    c.validator = FakeValidator()
+    return c
+
+
+def _run(crawler, api, target=1000, scan=1000):
+    crawler.rate_limiter = api
+    return crawler._search_keyword_with_validation(
+        keyword="kw", language="python", min_stars=10,
+        target_count=target, scan_limit=scan,
+    )
+
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _checkpoints(db) -> int:
+    with db._get_conn() as conn:
+        return conn.execute("SELECT COUNT(*) AS c FROM search_checkpoints").fetchone()["c"]
+
+
+def test_full_pass_advances_watermark(crawler, db):
+    started = _now()
+    _run(crawler, FakeSearchAPI())
+
+    wm = db.get_watermark("kw", "python")
+    assert wm["complete"] == 1
+    # زمان شروع پیمایش، نه بیشترین pushed_at دیده‌شده
+    assert started <= wm["max_pushed_at"] <= _now()
+    assert wm["pass_started_at"] is None
+    # پیمایش بعدی از ابتدا — چک‌پوینت‌های این کوئری پاک شده‌اند
+    assert _checkpoints(db) == 0
+
+
+def test_failed_page_keeps_watermark_and_checkpoints(crawler, db):
+    _run(crawler, FakeSearchAPI(fail_pages=(2,)))
+
+    wm = db.get_watermark("kw", "python")
+    assert not wm["complete"]
+    assert wm["max_pushed_at"] is None
+    assert _checkpoints(db) > 0
+
+
+def test_failed_probe_keeps_watermark(crawler, db):
+    _run(crawler, FakeSearchAPI(fail_pages=(1,)))
+
+    wm = db.get_watermark("kw", "python")
+    assert not wm["complete"]
+    assert wm["max_pushed_at"] is None
+
+
+def test_failed_page_does_not_move_existing_watermark(crawler, db):
+    _run(crawler, FakeSearchAPI(total=50))
+    before = db.get_watermark("kw", "python")
+
+    api = FakeSearchAPI(fail_pages=(2,))
+    _run(crawler, api)
+
+    after = db.get_watermark("kw", "python")
+    assert after["max_pushed_at"] == before["max_pushed_at"]
+    assert f"pushed:>{before['max_pushed_at']}" in api.queries[0]
+
+
+def test_scan_limit_keeps_watermark(crawler, db):
+    _run(crawler, FakeSearchAPI(), scan=100)
+
+    assert not db.get_watermark("kw", "python")["complete"]
+
+
+def test_capped_backfill_completes_across_runs(crawler, db):
+    started = _now()
+    api = FakeSearchAPI(total=250)
+    _run(crawler, api, scan=100)
+    pass_started = db.get_watermark("kw", "python")["pass_started_at"]
+    assert started <= pass_started <= _now()
+
+    # اجرای دوم: صفحه 1 از چک‌پوینت، فقط صفحه 2 درخواست می‌شود
+    api = FakeSearchAPI(total=250)
+    _run(crawler, api, scan=100)
+    assert api.pages == [2]
+    wm = db.get_watermark("kw", "python")
+    assert not wm["complete"]
+    assert wm["pass_started_at"] == pass_started
+
+    # اجرای سوم باقی‌مانده را تمام می‌کند — هدف/سقف اسکن مانع کامل شدن نیست
+    api = FakeSearchAPI(total=250)
+    _run(crawler, api, scan=100)
+    assert api.pages == [3]
+    wm = db.get_watermark("kw", "python")
+    assert wm["complete"] == 1
+    assert wm["max_pushed_at"] == pass_started
+
+    # از اینجا فقط مخازن push‌شده بعد از شروع پیمایش
+    api = FakeSearchAPI(total=10)
+    _run(crawler, api, scan=100)
+    assert f"pushed:>{pass_started}" in api.queries[0]
+
+
+def test_frontier_backlog_completes_in_later_runs(crawler, db):
+    class AcceptAll(FakeValidator):
+        def validate_many(self, repos, cancel=None):
+            return [
+                ValidationResult(full_name=r.full_name, is_valid=True) for r in repos
+            ]
+
+    crawler.validator = AcceptAll()
+    # هر اجرا 10 تا از صف برمی‌دارد؛ مازاد هدف در صف برای اجرای بعدی می‌ماند
+    for run in range(4):
+        api = FakeSearchAPI(total=40)
+        assert len(_run(crawler, api, target=10)) == 10
+        assert not db.get_watermark("kw", "python")["complete"]
+        # بعد از اجرای اول صف خالی نشده بود — جستجوی تازه‌ای لازم نشد
+        assert api.pages == ([1] if run == 0 else [])
+
+    # صف خالی است و تنها صفحه از چک‌پوینت — پیمایش بدون درخواست جستجو کامل می‌شود
+    api = FakeSearchAPI(total=40)
+    assert _run(crawler, api, target=10) == []
+    assert api.pages == []
+    assert db.get_watermark("kw", "python")["complete"] == 1
+    assert db.get_frontier_counts("kw", "python") == {"accepted": 40}
@@ -0,0 +1,78 @@
+"""استخر توکن: چرخش به توکن با بیشترین سهمیه و حد ذخیره"""
+
+import time
+
+from core.token_pool import TokenPool
+
+
+def _set(pool: TokenPool, index: int, remaining: int, resource: str = "core",
+         reset_in: float = 3600) -> None:
+    pool.update_from_headers(pool.tokens[index], {
+        "X-RateLimit-Resource": resource,
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Reset": str(time.time() + reset_in),
+    })
+
+
+def test_acquire_picks_most_remaining():
+    pool = TokenPool(["aaaa1111", "bbbb2222"])
+    _set(pool, 0, 100)
+    _set(pool, 1, 3000)
+
+    assert pool.acquire("core") is pool.tokens[1]
+    assert pool.tokens[1].quota("core").remaining == 2999
+
+
+def test_optimistic_consume_spreads_requests():
+    pool = TokenPool(["aaaa1111", "bbbb2222"])
+    _set(pool, 0, 50)
+    _set(pool, 1, 51)
+
+    picked = [pool.acquire("core").token for _ in range(4)]
+    assert picked == ["bbbb2222", "aaaa1111", "bbbb2222", "aaaa1111"]
+
+
+def test_reserve_exhausted_returns_none():
+    pool = TokenPool(["aaaa1111", "bbbb2222"])
+    _set(pool, 0, 10)
+    _set(pool, 1, 8)
+
+    assert pool.acquire("core", reserve=10) is None
+    assert pool.acquire("core", reserve=5) is pool.tokens[0]
+
+
+def test_prefer_kept_above_reserve_only():
+    pool = TokenPool(["aaaa1111", "bbbb2222"])
+    _set(pool, 0, 20)
+    _set(pool, 1, 4000)
+    owner = pool.tokens[0]
+
+    assert pool.acquire("core", reserve=10, prefer=owner) is owner
+    _set(pool, 0, 10)
+    assert pool.acquire("core", reserve=10, prefer=owner) is pool.tokens[1]
+
+
+def test_resources_tracked_separately():
+    pool = TokenPool(["aaaa1111", "bbbb2222"])
+    _set(pool, 0, 0, resource="search", reset_in=60)
+    _set(pool, 1, 4000)
+
+    assert pool.acquire("search") is pool.tokens[1]
+    assert pool.total_remaining("search") == 29
+    assert pool.total_remaining("core") == 5000 + 4000   # search از core کم نمی‌کند
+
+
+def test_expired_reset_restores_full_limit():
+    pool = TokenPool(["aaaa1111"])
+    _set(pool, 0, 0, reset_in=-1)
+
+    assert pool.total_remaining("core") == 5000
+    assert pool.acquire("core", reserve=10) is pool.tokens[0]
+    assert pool.next_reset("core") == 0
+
+
+def test_label_hides_token():
+    pool = TokenPool(["ghp_secretvalue1234"])
+    assert pool.tokens[0].label == "ghp_…1234"
+    assert TokenPool([]).tokens[0].label == "anonymous"
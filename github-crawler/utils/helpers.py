@@ -3,6 +3,7 @@
 """
 
 import base64
+import hashlib
 from datetime import datetime
 
 
@@ -14,6 +15,13 @@ def decode_base64_content(encoded: str) -> str:
         return ""
 
 
+def git_blob_sha(data: bytes | bytearray) -> str:
+    """شناسه blob گیت (همان sha درخت و /contents) برای محتوای خام"""
+    digest = hashlib.sha1(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
 def format_timestamp(iso_string: str | None) -> str:
     """تبدیل تاریخ ISO به فرمت خوانا"""
     if not iso_string: